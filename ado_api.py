@@ -1,9 +1,22 @@
 import os
+import contextvars
+import datetime
 import json
 import math
+import random
+import re
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
 from dotenv import load_dotenv
+import call_metrics
+from work_item_store import WorkItemStore
 
 # Load environment variables from a .env file if present
 load_dotenv()
@@ -22,6 +35,453 @@ pat_token = get_env("ADO_PAT_TOKEN")
 # Configuration
 organization = get_env("ADO_ORGANIZATION", required=False, default="spglobal")
 project = get_env("ADO_PROJECT", required=False, default="Platts")
+# Point at another host (e.g. mock_ado_server.py) for load tests
+base_url = get_env(
+    "ADO_BASE_URL", required=False, default="https://dev.azure.com"
+).rstrip("/")
+
+# HTTP connection pool / timeout settings shared by every ADO call
+pool_connections = int(get_env("ADO_POOL_CONNECTIONS", required=False, default="4"))
+pool_maxsize = int(get_env("ADO_POOL_MAXSIZE", required=False, default="16"))
+connect_timeout = float(get_env("ADO_CONNECT_TIMEOUT", required=False, default="10"))
+read_timeout = float(get_env("ADO_READ_TIMEOUT", required=False, default="60"))
+
+# ADO rejects workitems?ids= calls with more than 200 IDs
+batch_id_limit = 200
+# ADO $batch accepts at most 200 sub-requests per call
+batch_request_limit = 200
+batch_max_workers = int(get_env("ADO_BATCH_MAX_WORKERS", required=False, default="4"))
+
+# Throttling (TSTU) retry settings
+max_retries = int(get_env("ADO_MAX_RETRIES", required=False, default="5"))
+backoff_base = float(get_env("ADO_BACKOFF_BASE", required=False, default="1"))
+backoff_max = float(get_env("ADO_BACKOFF_MAX", required=False, default="60"))
+
+# Status codes ADO uses when a caller exceeds its throughput (TSTU) budget
+RETRY_STATUS_CODES = (429, 503)
+
+
+def get_header_seconds(headers, name):
+    """
+    Reads a numeric header (e.g. Retry-After) case-insensitively.
+    Returns None when the header is absent or not a number.
+    """
+    for key, value in (headers or {}).items():
+        if key.lower() == name.lower():
+            try:
+                return max(float(value), 0.0)
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+class RetryPolicy:
+    """
+    Decides how long to back off when ADO throttles us.
+    Waits for Retry-After / X-RateLimit-Delay when ADO sends them, otherwise
+    backs off exponentially with jitter. A throttle also pauses every other
+    caller sharing the policy, so bulk runs slow down together only when ADO
+    asks and run at full speed otherwise.
+    """
+
+    def __init__(
+        self,
+        max_retries=max_retries,
+        backoff_base=backoff_base,
+        backoff_max=backoff_max,
+        jitter=0.25,
+    ):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self._lock = threading.Lock()
+        self._resume_at = 0.0
+        self._counters = {
+            "throttled_responses": 0,
+            "retries": 0,
+            "retry_wait_seconds": 0.0,
+            "paced_requests": 0,
+            "gave_up": 0,
+        }
+
+    def _pause_all(self, seconds):
+        with self._lock:
+            self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+    def pacing_delay(self):
+        """
+        Seconds the caller should wait before sending its next request.
+        """
+        with self._lock:
+            delay = self._resume_at - time.monotonic()
+            if delay > 0:
+                self._counters["paced_requests"] += 1
+                return delay
+        return 0.0
+
+    def retry_delay(self, status_code, headers, attempt):
+        """
+        Seconds to wait before retrying attempt number `attempt` (0-based),
+        or None when the response should be returned to the caller as-is.
+        """
+        if status_code not in RETRY_STATUS_CODES:
+            return None
+        with self._lock:
+            self._counters["throttled_responses"] += 1
+            if attempt >= self.max_retries:
+                self._counters["gave_up"] += 1
+                return None
+
+        delay = get_header_seconds(headers, "Retry-After")
+        if delay is None:
+            delay = get_header_seconds(headers, "X-RateLimit-Delay")
+        if delay is None:
+            delay = self.backoff_base * (2**attempt)
+        delay = min(delay, self.backoff_max)
+        # Jitter spreads retries from concurrent workers apart
+        delay += random.uniform(0, delay * self.jitter)
+
+        with self._lock:
+            self._counters["retries"] += 1
+            self._counters["retry_wait_seconds"] += delay
+        self._pause_all(delay)
+        return delay
+
+    def observe(self, headers):
+        """
+        Inspects the rate-limit headers of a successful response. ADO sends
+        Retry-After (or X-RateLimit-Remaining of 0 with X-RateLimit-Delay)
+        shortly before it starts rejecting calls, so pause until then.
+        """
+        delay = get_header_seconds(headers, "Retry-After")
+        if delay is None:
+            remaining = get_header_seconds(headers, "X-RateLimit-Remaining")
+            if remaining is not None and remaining <= 0:
+                delay = get_header_seconds(headers, "X-RateLimit-Delay")
+        if delay:
+            self._pause_all(min(delay, self.backoff_max))
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        stats["retry_wait_seconds"] = round(stats["retry_wait_seconds"], 2)
+        return stats
+
+
+# Shared by the sync and async clients so a throttle slows every caller down
+retry_policy = RetryPolicy()
+
+# In-process work item cache (see WorkItemCache); a TTL of 0 disables it
+cache_ttl = float(get_env("ADO_CACHE_TTL", required=False, default="300"))
+cache_max_entries = int(get_env("ADO_CACHE_MAX_ENTRIES", required=False, default="5000"))
+
+# Persistent SQLite store under the cache; an empty path disables it
+store_path = get_env("ADO_STORE_PATH", required=False, default=".ado_cache/work_items.sqlite")
+store_max_age_days = float(get_env("ADO_STORE_MAX_AGE_DAYS", required=False, default="14"))
+store_max_mb = float(get_env("ADO_STORE_MAX_MB", required=False, default="200"))
+
+# Project iteration tree cache (see IterationTree)
+iteration_depth = int(get_env("ADO_ITERATION_DEPTH", required=False, default="10"))
+iteration_cache_ttl = float(get_env("ADO_ITERATION_TTL", required=False, default="3600"))
+
+
+class WorkItemCache:
+    """
+    Bounded LRU cache of parsed work items with a TTL.
+    Entries are keyed by work item ID plus the fetch shape (profile /
+    relations), and remember the System.Rev they were fetched at. Fresh
+    entries are served from memory; stale entries are revalidated with a
+    cheap Rev-only fetch and only re-downloaded when the Rev changed.
+    Memory misses fall through to the optional persistent store, so a
+    restarted server only revalidates instead of re-downloading.
+    """
+
+    def __init__(self, max_entries=cache_max_entries, ttl=cache_ttl, store=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.store = store
+        self._entries = OrderedDict()  # (id, shape) -> (stored_at, item)
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "store_hits": 0,
+            "misses": 0,
+            "revalidated": 0,
+            "invalidations": 0,
+            "evictions": 0,
+        }
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and self.max_entries > 0
+
+    def _remember(self, key, stored_at, item):
+        # Caller holds self._lock
+        self._entries[key] = (stored_at, item)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def lookup(self, ids, shape):
+        """
+        Returns (fresh, stale, missing): fresh/stale map ID -> item copy,
+        missing lists IDs found in neither memory nor the store.
+        """
+        fresh, stale, not_in_memory = {}, {}, []
+        now = time.monotonic()
+        with self._lock:
+            for work_item_id in ids:
+                key = (work_item_id, shape)
+                entry = self._entries.get(key)
+                if entry is None:
+                    not_in_memory.append(work_item_id)
+                    continue
+                self._entries.move_to_end(key)
+                stored_at, item = entry
+                if now - stored_at < self.ttl:
+                    fresh[work_item_id] = item.copy()
+                    self._counters["hits"] += 1
+                else:
+                    stale[work_item_id] = item.copy()
+
+        missing = not_in_memory
+        if self.store is not None and not_in_memory:
+            try:
+                found = self.store.get_many(not_in_memory, shape)
+            except Exception:
+                # A locked or corrupt store must never break a fetch
+                found = {}
+            missing = [i for i in not_in_memory if i not in found]
+            with self._lock:
+                for work_item_id, (fetched_at, data) in found.items():
+                    item = WorkItemRecord.from_dict(data)
+                    age = time.time() - fetched_at
+                    self._remember((work_item_id, shape), now - age, item)
+                    self._counters["store_hits"] += 1
+                    if age < self.ttl:
+                        fresh[work_item_id] = item.copy()
+                    else:
+                        stale[work_item_id] = item.copy()
+        with self._lock:
+            self._counters["misses"] += len(missing)
+        return fresh, stale, missing
+
+    def get(self, work_item_id, shape):
+        """
+        Returns (item, is_fresh); item is a copy, or None when not cached.
+        """
+        fresh, stale, _ = self.lookup([work_item_id], shape)
+        if work_item_id in fresh:
+            return fresh[work_item_id], True
+        return stale.get(work_item_id), False
+
+    def put_many(self, shape, items):
+        now = time.monotonic()
+        with self._lock:
+            for item in items:
+                self._remember((item["ID"], shape), now, item.copy())
+        if self.store is not None and items:
+            try:
+                self.store.put_many(shape, items)
+            except Exception:
+                pass
+
+    def put(self, work_item_id, shape, item):
+        self.put_many(shape, [item])
+
+    def refresh(self, work_item_id, shape):
+        """
+        Marks an entry fresh again after its Rev was confirmed unchanged.
+        """
+        key = (work_item_id, shape)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries[key] = (time.monotonic(), entry[1])
+            self._counters["revalidated"] += 1
+            item = entry[1]
+        if self.store is not None:
+            try:
+                self.store.put_many(shape, [item])
+            except Exception:
+                pass
+        return item.copy()
+
+    def invalidate(self, work_item_ids):
+        ids = set()
+        for work_item_id in work_item_ids:
+            try:
+                ids.add(int(work_item_id))
+            except (TypeError, ValueError):
+                continue
+        with self._lock:
+            for key in [k for k in self._entries if k[0] in ids]:
+                del self._entries[key]
+                self._counters["invalidations"] += 1
+        if self.store is not None and ids:
+            try:
+                self.store.delete(ids)
+            except Exception:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.store is not None:
+            try:
+                self.store.clear()
+            except Exception:
+                pass
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["store_hits"] + stats["misses"]
+        served = stats["hits"] + stats["store_hits"]
+        stats["hit_rate"] = round(served / lookups, 3) if lookups else 0.0
+        if self.store is not None:
+            try:
+                stats["store"] = self.store.stats()
+            except Exception as e:
+                stats["store"] = f"unavailable: {e}"
+        return stats
+
+
+def _open_store():
+    if not store_path:
+        return None
+    try:
+        return WorkItemStore(
+            store_path,
+            max_age=store_max_age_days * 24 * 3600,
+            max_bytes=int(store_max_mb * 1024 * 1024),
+        )
+    except Exception:
+        # Read-only or locked disk: keep working with the memory cache only
+        return None
+
+
+work_item_cache = WorkItemCache(store=_open_store())
+
+
+class ADOClient:
+    """
+    Shared, thread-safe HTTP client for Azure DevOps.
+    Wraps a keep-alive requests.Session with a bounded connection pool so
+    repeated calls reuse TCP/TLS connections instead of opening new ones.
+    """
+
+    def __init__(
+        self,
+        pat=None,
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        timeout=(connect_timeout, read_timeout),
+        retry_policy=retry_policy,
+    ):
+        self.timeout = timeout
+        self.retry_policy = retry_policy
+        self.pool_maxsize = pool_maxsize
+        self.session = requests.Session()
+        self.session.auth = HTTPBasicAuth("", pat if pat is not None else pat_token)
+        # pool_block makes extra threads wait for a free connection rather than
+        # opening throwaway ones that are discarded after a single request
+        self.adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=True,
+        )
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+        self._lock = threading.Lock()
+        self._request_count = 0
+
+    def request(self, method, url, item_count=0, **kwargs):
+        """
+        item_count: work items or $batch sub-requests carried, for
+        call_metrics.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        attempt = 0
+        # One metrics entry per logical call; retries and their waits included
+        with call_metrics.metrics.timed("ado", endpoint_label(url), method) as call:
+            while True:
+                pause = self.retry_policy.pacing_delay()
+                if pause:
+                    time.sleep(pause)
+                response = self.session.request(method, url, **kwargs)
+                with self._lock:
+                    self._request_count += 1
+                delay = self.retry_policy.retry_delay(
+                    response.status_code, response.headers, attempt
+                )
+                if delay is None:
+                    self.retry_policy.observe(response.headers)
+                    call["status"] = response.status_code
+                    call["sent"] = call_metrics.body_size(response.request.body)
+                    call["received"] = len(response.content)
+                    call["retries"] = attempt
+                    call["items"] = item_count
+                    return response
+                time.sleep(delay)
+                attempt += 1
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request("PATCH", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+    def stats(self):
+        """
+        Returns connection reuse counters, e.g.
+        {"requests": 300, "connections_opened": 4, "connections_reused": 296, ...}
+        """
+        opened = 0
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            try:
+                opened += pools[key].num_connections
+            except KeyError:
+                # Pool was evicted between keys() and lookup
+                pass
+        with self._lock:
+            request_count = self._request_count
+        return {
+            "requests": request_count,
+            "connections_opened": opened,
+            "connections_reused": max(request_count - opened, 0),
+            "pool_maxsize": self.pool_maxsize,
+        }
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Returns the process-wide ADOClient, creating it on first use.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ADOClient()
+    return _client
 
 
 # Define a custom exception for Authentication errors
@@ -33,16 +493,18 @@ class ADOAuthenticationError(Exception):
 def check_response(response, action_desc):
     if response.status_code == 200:
         return response.json()
-    elif response.status_code == 401:
+    raise_for_ado_status(response.status_code, response.text, action_desc)
+
+
+# Shared by the sync and async clients; only called for non-200 responses
+def raise_for_ado_status(status_code, text, action_desc):
+    if status_code == 401:
         # Check specific content if needed, but 401 is generally Auth Error
         raise ADOAuthenticationError(
             "Access Denied2: Your Azure DevOps Personal Access Token (PAT) has expired or is invalid. "
             "Please update the ADO_PAT_TOKEN in your .env file."
         )
-    else:
-        raise Exception(
-            f"Failed to {action_desc}: {response.status_code} - {response.text}"
-        )
+    raise Exception(f"Failed to {action_desc}: {status_code} - {text}")
 
 
 def is_missing_value(value):
@@ -55,190 +517,1023 @@ def is_missing_value(value):
     return False
 
 
-def get_work_item(work_item_id):
+# Named field projections. Passing a profile to get_work_item/get_work_items_batch
+# sends ADO's fields= parameter so only these fields are returned.
+# "list": table views (Story Sorter, Planning Revision)
+# "full": everything the generators and replicator read (Task Generator etc.)
+LIST_FIELDS = [
+    "System.Id",
+    "System.WorkItemType",
+    "System.Title",
+    "System.State",
+    "System.AssignedTo",
+    "System.AreaPath",
+    "System.IterationPath",
+    "System.ChangedDate",
+    "Microsoft.VSTS.Scheduling.StoryPoints",
+    "Microsoft.VSTS.Common.StackRank",
+    "Microsoft.VSTS.Common.BacklogPriority",
+    "Custom.CMDBAppName",
+    "Custom.FoundbyTestCase",
+    "Custom.IdentifiedBy",
+]
+
+FULL_FIELDS = LIST_FIELDS + [
+    "System.Description",
+    "System.Tags",
+    "System.CreatedBy",
+    "System.CreatedDate",
+    "System.ChangedBy",
+    "Microsoft.VSTS.Common.AcceptanceCriteria",
+    "Microsoft.VSTS.Scheduling.OriginalEstimate",
+    "Microsoft.VSTS.Scheduling.RemainingWork",
+    "Microsoft.VSTS.Common.Activity",
+    "Custom.ExternalDependencies",
+    "Custom.NonFunctionalRequirements_MI",
+]
+
+FIELD_PROFILES = {
+    "list": LIST_FIELDS,
+    "full": FULL_FIELDS,
+}
+
+
+def get_profile_fields(profile):
+    """
+    Returns the field list for a profile name (None means all fields).
+    """
+    if profile is None:
+        return None
+    if profile not in FIELD_PROFILES:
+        raise ValueError(
+            f"Unknown field profile '{profile}'. Expected one of: {', '.join(FIELD_PROFILES)}"
+        )
+    return FIELD_PROFILES[profile]
+
+
+def get_web_url(work_item_details):
+    # _links is only returned when fields are not projected, so fall back to the edit URL
+    href = work_item_details.get("_links", {}).get("html", {}).get("href", "")
+    if href:
+        return href
+    return f"{base_url}/{organization}/{project}/_workitems/edit/{work_item_details['id']}"
+
+
+# --- URL builders and response parsers shared by ado_api and ado_async ---
+
+
+def endpoint_label(url):
+    """
+    Groups URLs by endpoint for call_metrics, e.g.
+    ".../_apis/wit/workitems/123?fields=..." -> "wit/workitems/{id}".
+    """
+    path, _, query = url.partition("?")
+    path = urllib.parse.unquote(path.split("/_apis/", 1)[-1])
+    path = re.sub(r"/\d+(?=/|$)", "/{id}", path)
+    path = re.sub(r"(workitems)/\$[^/]+$", r"\1/${type}", path)
+    path = re.sub(r"(wiql)/[^/]+$", r"\1/{query}", path)
+    path = re.sub(r"(classificationnodes/[^/]+)/.*$", r"\1/{path}", path)
+    if query.startswith("ids=") or "&ids=" in query:
+        path += "?ids="
+    return path
+
+
+def work_item_url(work_item_id, profile=None, expand_relations=False):
     # Azure DevOps REST API URL
-    url = f"https://dev.azure.com/{organization}/{project}/_apis/wit/workitems/{work_item_id}?$expand=relations&api-version=6.0"
+    url = f"{base_url}/{organization}/{project}/_apis/wit/workitems/{work_item_id}?api-version=6.0"
+    if expand_relations:
+        url += "&$expand=relations"
+    elif profile is not None:
+        url += "&fields=" + ",".join(get_profile_fields(profile))
+    return url
 
-    # Make the request
-    response = requests.get(url, auth=HTTPBasicAuth("", pat_token))
-
-    work_item_details = check_response(response, "retrieve work item")
-    # Build a display string for Assigned To that includes email when available
-    _assigned_field = work_item_details["fields"].get("System.AssignedTo", {})
-    _assigned_display = _assigned_field.get("displayName", "Unassigned")
-    _assigned_email = (
-        _assigned_field.get("uniqueName")
-        or _assigned_field.get("mail")
-        or _assigned_field.get("email")
+
+def work_items_batch_url(ids, fields=None):
+    ids_str = ",".join(map(str, ids))
+    # errorPolicy=omit returns null entries for missing items instead of failing the call
+    url = f"{base_url}/{organization}/{project}/_apis/wit/workitems?ids={ids_str}&errorPolicy=omit&api-version=6.0"
+    if fields:
+        url += "&fields=" + ",".join(fields)
+    return url
+
+
+def query_url(query_id, top=None):
+    url = f"{base_url}/{organization}/{project}/_apis/wit/wiql/{query_id}?api-version=6.0"
+    if top:
+        url += f"&$top={int(top)}"
+    return url
+
+
+def wiql_url(top=None, time_precision=False):
+    url = f"{base_url}/{organization}/{project}/_apis/wit/wiql?api-version=6.0"
+    if top:
+        url += f"&$top={int(top)}"
+    if time_precision:
+        # Compare [System.ChangedDate] to the second instead of the day
+        url += "&timePrecision=true"
+    return url
+
+
+def work_item_api_url(work_item_id):
+    return f"{base_url}/{organization}/_apis/wit/workItems/{work_item_id}"
+
+
+def create_work_item_url(work_item_type):
+    # work_item_type should be 'Task' or 'User Story' etc.
+    # The API expects $Task or $User%20Story
+    type_encoded = work_item_type.replace(" ", "%20")
+    return f"{base_url}/{organization}/{project}/_apis/wit/workitems/${type_encoded}?api-version=6.0"
+
+
+def update_work_item_url(work_item_id):
+    return f"{base_url}/{organization}/{project}/_apis/wit/workitems/{work_item_id}?api-version=6.0"
+
+
+def batch_endpoint_url():
+    return f"{base_url}/{organization}/_apis/wit/$batch?api-version=6.0"
+
+
+def _display_name(identity):
+    return (identity or {}).get("displayName", "")
+
+
+def _display_name_with_email(identity):
+    # Display string for Assigned To that includes the email when available
+    identity = identity or {}
+    display = identity.get("displayName", "Unassigned")
+    email = identity.get("uniqueName") or identity.get("mail") or identity.get("email")
+    return f"{display} <{email}>" if email else display
+
+
+def _stack_rank(details, fields):
+    return fields.get(
+        "Microsoft.VSTS.Common.StackRank",
+        fields.get("Microsoft.VSTS.Common.BacklogPriority", 0),
     )
-    if _assigned_email:
-        _assigned_value = f"{_assigned_display} <{_assigned_email}>"
-    else:
-        _assigned_value = _assigned_display
-
-    work_item = {
-        "ID": work_item_details["id"],
-        "Work Item Type": work_item_details["fields"]["System.WorkItemType"],
-        "Description": work_item_details["fields"].get("System.Description", ""),
-        "Title": work_item_details["fields"]["System.Title"],
-        "Assigned To": _assigned_value,
-        "State": work_item_details["fields"]["System.State"],
-        "Tags": work_item_details["fields"].get("System.Tags", "").split("; "),
-        "Created By": work_item_details["fields"]["System.CreatedBy"]["displayName"],
-        "Created Date": work_item_details["fields"]["System.CreatedDate"],
-        "Changed By": work_item_details["fields"]
-        .get("System.ChangedBy", {})
-        .get("displayName", ""),
-        "Changed Date": work_item_details["fields"]["System.ChangedDate"],
-        "Acceptance Criteria": work_item_details["fields"].get(
-            "Microsoft.VSTS.Common.AcceptanceCriteria", ""
-        ),
-        "External Dependencies": work_item_details["fields"].get(
-            "Custom.ExternalDependencies", ""
-        ),
-        "Non Functional Requirements": work_item_details["fields"].get(
-            "Custom.NonFunctionalRequirements_MI", ""
-        ),
-        "Get Story Points": work_item_details["fields"].get(
-            "Microsoft.VSTS.Scheduling.StoryPoints", 0
-        ),
-        "Story Points": work_item_details["fields"].get(
-            "Microsoft.VSTS.Scheduling.StoryPoints", 0
-        ),
-        "Stack Rank": work_item_details["fields"].get(
-            "Microsoft.VSTS.Common.StackRank",
-            work_item_details["fields"].get("Microsoft.VSTS.Common.BacklogPriority", 0),
-        ),
-        "Stack Rank Field": (
-            "Microsoft.VSTS.Common.StackRank"
-            if "Microsoft.VSTS.Common.StackRank" in work_item_details["fields"]
-            else "Microsoft.VSTS.Common.BacklogPriority"
-        ),
-        "Area Path": work_item_details["fields"]["System.AreaPath"],
-        "Iteration Path": work_item_details["fields"]["System.IterationPath"],
-        "url": work_item_details["url"],
-        "Web URL": work_item_details.get("_links", {}).get("html", {}).get("href", ""),
-        "Relations": work_item_details.get("relations", []),
-        "Original Estimate": work_item_details["fields"].get(
-            "Microsoft.VSTS.Scheduling.OriginalEstimate", 0
-        ),
-        "Activity": work_item_details["fields"].get(
-            "Microsoft.VSTS.Common.Activity", "Development"
-        ),
-        "CMDB App Name": work_item_details["fields"].get("Custom.CMDBAppName", ""),
+
+
+def _stack_rank_field(details, fields):
+    if "Microsoft.VSTS.Common.StackRank" in fields:
+        return "Microsoft.VSTS.Common.StackRank"
+    return "Microsoft.VSTS.Common.BacklogPriority"
+
+
+# Work item record layout: (record key, source, default, converter).
+# source is an ADO field reference, or a callable(details, fields) for values
+# that are not a single field. Compiled once into WorkItemRecord below.
+WORK_ITEM_FIELD_MAP = [
+    ("ID", lambda details, fields: details["id"], None, None),
+    ("Rev", lambda details, fields: details.get("rev", 0), 0, None),
+    ("Work Item Type", "System.WorkItemType", "", None),
+    ("Title", "System.Title", "", None),
+    ("State", "System.State", "", None),
+    ("Description", "System.Description", "", None),
+    ("Acceptance Criteria", "Microsoft.VSTS.Common.AcceptanceCriteria", "", None),
+    ("Assigned To", "System.AssignedTo", "Unassigned", _display_name_with_email),
+    ("Tags", "System.Tags", [""], lambda tags: (tags or "").split("; ")),
+    ("Created By", "System.CreatedBy", "", _display_name),
+    ("Created Date", "System.CreatedDate", "", None),
+    ("Changed By", "System.ChangedBy", "", _display_name),
+    ("Changed Date", "System.ChangedDate", "", None),
+    ("External Dependencies", "Custom.ExternalDependencies", "", None),
+    ("Non Functional Requirements", "Custom.NonFunctionalRequirements_MI", "", None),
+    ("Story Points", "Microsoft.VSTS.Scheduling.StoryPoints", 0, None),
+    ("Get Story Points", "Microsoft.VSTS.Scheduling.StoryPoints", 0, None),
+    ("Stack Rank", _stack_rank, 0, None),
+    (
+        "Stack Rank Field",
+        _stack_rank_field,
+        "Microsoft.VSTS.Common.BacklogPriority",
+        None,
+    ),
+    ("Area Path", "System.AreaPath", "", None),
+    ("Iteration Path", "System.IterationPath", "", None),
+    ("Original Estimate", "Microsoft.VSTS.Scheduling.OriginalEstimate", 0, None),
+    ("Activity", "Microsoft.VSTS.Common.Activity", "Development", None),
+    ("CMDB App Name", "Custom.CMDBAppName", "", None),
+    ("Found by Test Case", "Custom.FoundbyTestCase", 0, None),
+    ("Identified By", "Custom.IdentifiedBy", "", None),
+    (
+        "url",
+        lambda details, fields: details.get("url") or work_item_api_url(details["id"]),
+        "",
+        None,
+    ),
+    ("Web URL", lambda details, fields: get_web_url(details), "", None),
+    ("Relations", lambda details, fields: details.get("relations", []), [], None),
+]
+
+
+def _compile_getter(source, default, convert):
+    if callable(source):
+        return source
+    if convert is None:
+        return lambda details, fields: fields.get(source, default)
+    # Converters get None for a missing field and return the record default
+    return lambda details, fields: convert(fields.get(source))
+
+
+RECORD_KEYS = tuple(entry[0] for entry in WORK_ITEM_FIELD_MAP)
+_RECORD_INDEX = {key: i for i, key in enumerate(RECORD_KEYS)}
+_RECORD_DEFAULTS = tuple(entry[2] for entry in WORK_ITEM_FIELD_MAP)
+_RECORD_GETTERS = tuple(_compile_getter(*entry[1:]) for entry in WORK_ITEM_FIELD_MAP)
+# ADO field reference -> record key, for fields that map one to one (the
+# first key wins where two share a field)
+FIELD_RECORD_KEYS = {
+    entry[1]: entry[0]
+    for entry in reversed(WORK_ITEM_FIELD_MAP)
+    if isinstance(entry[1], str) and entry[3] is None
+}
+
+
+class WorkItemRecord(Mapping):
+    """
+    Work item returned by get_work_item / get_work_items_batch.
+    Reads and writes like a dict keyed by RECORD_KEYS, but keeps the values
+    in one slotted list instead of a dict per item. Keys outside the map can
+    still be set; they go to a small overflow dict.
+    """
+
+    __slots__ = ("_values", "_extra")
+
+    def __init__(self, values, extra=None):
+        self._values = values
+        self._extra = extra
+
+    @classmethod
+    def from_payload(cls, work_item_details):
+        fields = work_item_details.get("fields", {})
+        return cls([getter(work_item_details, fields) for getter in _RECORD_GETTERS])
+
+    @classmethod
+    def from_dict(cls, data):
+        values = [
+            data.get(key, default) for key, default in zip(RECORD_KEYS, _RECORD_DEFAULTS)
+        ]
+        extra = {k: v for k, v in data.items() if k not in _RECORD_INDEX} or None
+        return cls(values, extra)
+
+    def __getitem__(self, key):
+        index = _RECORD_INDEX.get(key)
+        if index is not None:
+            return self._values[index]
+        if self._extra and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        index = _RECORD_INDEX.get(key)
+        if index is not None:
+            self._values[index] = value
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __iter__(self):
+        yield from RECORD_KEYS
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return len(RECORD_KEYS) + len(self._extra or ())
+
+    def __contains__(self, key):
+        return key in _RECORD_INDEX or bool(self._extra and key in self._extra)
+
+    def __reduce__(self):
+        return (WorkItemRecord, (self._values, self._extra))
+
+    def __repr__(self):
+        return f"WorkItemRecord({self.to_dict()!r})"
+
+    def copy(self):
+        extra = dict(self._extra) if self._extra else None
+        return WorkItemRecord(list(self._values), extra)
+
+    def to_dict(self):
+        return dict(self.items())
+
+
+def parse_work_item(work_item_details):
+    """
+    Builds the WorkItemRecord for one work item payload (single or batch
+    fetch; fields that were not requested get their defaults).
+    """
+    return WorkItemRecord.from_payload(work_item_details)
+
+
+# Column types for DataFrame / Arrow output; other columns are left to inference
+FRAME_DTYPES = {
+    "ID": "int64",
+    "Rev": "int64",
+    "Story Points": "float64",
+    "Get Story Points": "float64",
+    "Stack Rank": "float64",
+    "Original Estimate": "float64",
+}
+
+# Default frame columns; Relations is nested and only useful per item
+FRAME_COLUMNS = [key for key in RECORD_KEYS if key != "Relations"]
+
+FRAME_OUTPUTS = ("frame", "arrow")
+
+
+def columns_to_frame(data, output="frame", missing_ids=()):
+    """
+    Turns {column: values} into a pandas DataFrame ("frame") or a pyarrow
+    Table ("arrow") with FRAME_DTYPES applied. IDs that were not returned
+    go to frame.attrs["missing_ids"] / the table's "missing_ids" metadata.
+    """
+    if output == "arrow":
+        import pyarrow as pa
+
+        arrays = {}
+        for key, values in data.items():
+            dtype = FRAME_DTYPES.get(key)
+            arrays[key] = pa.array(values, type=pa.type_for_alias(dtype) if dtype else None)
+        table = pa.table(arrays)
+        return table.replace_schema_metadata(
+            {"missing_ids": json.dumps(list(missing_ids))}
+        )
+
+    import pandas as pd
+
+    frame = pd.DataFrame(data, columns=list(data))
+    dtypes = {key: dtype for key, dtype in FRAME_DTYPES.items() if key in data}
+    if dtypes and len(frame):
+        frame = frame.astype(dtypes)
+    frame.attrs["missing_ids"] = list(missing_ids)
+    return frame
+
+
+def records_to_frame(records, columns=None, output="frame", missing_ids=()):
+    """
+    Builds a DataFrame (or Arrow table, see columns_to_frame) column by
+    column from work item records.
+    columns: keys to include (default: FRAME_COLUMNS plus any extra keys);
+    keys missing from a record come out as None.
+    """
+    records = list(records)
+    if columns is None:
+        columns = list(FRAME_COLUMNS)
+        for record in records:
+            for key in record:
+                if key not in _RECORD_INDEX and key not in columns:
+                    columns.append(key)
+    data = {}
+    for key in columns:
+        index = _RECORD_INDEX.get(key)
+        data[key] = [
+            record._values[index]
+            if index is not None and isinstance(record, WorkItemRecord)
+            else record.get(key)
+            for record in records
+        ]
+    return columns_to_frame(data, output, missing_ids)
+
+
+def payloads_to_frame(payloads, columns=None, output="frame", missing_ids=()):
+    """
+    Same as records_to_frame, but reads raw ADO payloads through the
+    compiled field getters without building a record per item.
+    """
+    columns = columns or FRAME_COLUMNS
+    data = {}
+    for key in columns:
+        getter = _RECORD_GETTERS[_RECORD_INDEX[key]]
+        data[key] = [getter(payload, payload.get("fields", {})) for payload in payloads]
+    return columns_to_frame(data, output, missing_ids)
+
+
+def rows_to_frame(rows, column_defaults):
+    """
+    DataFrame for an editable table of plain dict rows.
+    column_defaults maps the required columns, in display order, to the
+    value used when a row lacks them; other keys follow in first-seen order.
+    """
+    import pandas as pd
+
+    columns = list(column_defaults)
+    for row in rows:
+        for key in row:
+            if key not in column_defaults and key not in columns:
+                columns.append(key)
+    data = {
+        key: [row.get(key, column_defaults.get(key)) for row in rows]
+        for key in columns
     }
+    return pd.DataFrame(data, columns=columns)
+
+
+@call_metrics.traced
+def get_work_item(work_item_id, profile=None, expand_relations=False, use_cache=True):
+    """
+    Fetches a single work item.
+    profile: optional FIELD_PROFILES name to only download those fields.
+    expand_relations: include "Relations" (parent/child links).
+    ADO does not allow fields= together with $expand, so expanding
+    relations always returns the full field set.
+    use_cache: serve from work_item_cache when the cached Rev is current.
+    """
+    shape = ("item", profile, expand_relations)
+    try:
+        cache_id = int(str(work_item_id).strip())
+    except ValueError:
+        cache_id = None
+    if use_cache and work_item_cache.enabled and cache_id is not None:
+        cached, is_fresh = work_item_cache.get(cache_id, shape)
+        if cached is not None:
+            if is_fresh:
+                return cached
+            if fetch_revisions([cache_id]).get(cache_id) == cached["Rev"]:
+                return work_item_cache.refresh(cache_id, shape) or cached
+
+    url = work_item_url(work_item_id, profile, expand_relations)
+
+    # Make the request
+    response = get_client().get(url)
+
+    work_item = parse_work_item(check_response(response, "retrieve work item"))
+    if work_item_cache.enabled:
+        work_item_cache.put(work_item["ID"], shape, work_item)
     return work_item
 
 
-def get_work_items_batch(ids):
-    if not ids:
-        return []
+class WorkItemList(list):
+    """
+    A list of work item dicts that also carries the requested IDs ADO did not
+    return (deleted, missing or not permitted for the current PAT).
+    """
+
+    def __init__(self, items=(), missing_ids=()):
+        super().__init__(items)
+        self.missing_ids = list(missing_ids)
 
-    ids_str = ",".join(map(str, ids))
-    url = f"https://dev.azure.com/{organization}/{project}/_apis/wit/workitems?ids={ids_str}&api-version=6.0"
 
-    response = requests.get(url, auth=HTTPBasicAuth("", pat_token))
+def chunked(seq, size):
+    seq = list(seq)
+    return [seq[i : i + size] for i in range(0, len(seq), size)]
+
+
+def run_concurrently(func, args_list, max_workers=batch_max_workers, on_result=None):
+    """
+    Calls func(args) for each entry in args_list with at most max_workers in
+    flight and returns the results in the same order as args_list.
+    on_result(index, result) is called from the calling thread as each call
+    finishes, so it is safe to update Streamlit elements from it.
+    """
+    results = [None] * len(args_list)
+    if len(args_list) <= 1 or max_workers <= 1:
+        for i, args in enumerate(args_list):
+            results[i] = func(args)
+            if on_result:
+                on_result(i, results[i])
+        return results
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(args_list))) as pool:
+        # Workers carry the caller's call_metrics tags (function, tab)
+        futures = {
+            pool.submit(contextvars.copy_context().run, func, args): i
+            for i, args in enumerate(args_list)
+        }
+        for future in as_completed(futures):
+            i = futures[future]
+            results[i] = future.result()
+            if on_result:
+                on_result(i, results[i])
+    return results
+
+
+def _fetch_work_items_chunk(ids, fields=None):
+    response = get_client().get(work_items_batch_url(ids, fields), item_count=len(ids))
 
     data = check_response(response, "retrieve work items batch")
+    return [item for item in data.get("value", []) if item]
 
-    items = []
-    for work_item_details in data["value"]:
-        # Build Assigned To string including email/uniqueName when available
-        _af = work_item_details["fields"].get("System.AssignedTo", {})
-        _ad = _af.get("displayName", "Unassigned")
-        _ae = _af.get("uniqueName") or _af.get("mail") or _af.get("email")
-        _assigned = f"{_ad} <{_ae}>" if _ae else _ad
 
-        items.append(
-            {
-                "ID": work_item_details["id"],
-                "Work Item Type": work_item_details["fields"]["System.WorkItemType"],
-                "Description": work_item_details["fields"].get(
-                    "System.Description", ""
-                ),
-                "Title": work_item_details["fields"]["System.Title"],
-                "Assigned To": _assigned,
-                "State": work_item_details["fields"]["System.State"],
-                "Story Points": work_item_details["fields"].get(
-                    "Microsoft.VSTS.Scheduling.StoryPoints", 0
-                ),
-                "Stack Rank": work_item_details["fields"].get(
-                    "Microsoft.VSTS.Common.StackRank",
-                    work_item_details["fields"].get(
-                        "Microsoft.VSTS.Common.BacklogPriority", 0
-                    ),
-                ),
-                "Stack Rank Field": (
-                    "Microsoft.VSTS.Common.StackRank"
-                    if "Microsoft.VSTS.Common.StackRank" in work_item_details["fields"]
-                    else "Microsoft.VSTS.Common.BacklogPriority"
-                ),
-                "Acceptance Criteria": work_item_details["fields"].get(
-                    "Microsoft.VSTS.Common.AcceptanceCriteria", ""
-                ),
-                "Iteration Path": work_item_details["fields"].get(
-                    "System.IterationPath", ""
-                ),
-                "Area Path": work_item_details["fields"].get("System.AreaPath", ""),
-                "url": work_item_details["url"],
-                "Web URL": work_item_details.get("_links", {})
-                .get("html", {})
-                .get("href", ""),
-                "Original Estimate": work_item_details["fields"].get(
-                    "Microsoft.VSTS.Scheduling.OriginalEstimate", 0
-                ),
-                "Activity": work_item_details["fields"].get(
-                    "Microsoft.VSTS.Common.Activity", "Development"
-                ),
-                "CMDB App Name": work_item_details["fields"].get(
-                    "Custom.CMDBAppName", ""
-                ),
-                "Found by Test Case": work_item_details["fields"].get(
-                    "Custom.FoundbyTestCase", 0
-                ),
-                "Identified By": work_item_details["fields"].get(
-                    "Custom.IdentifiedBy", ""
-                ),
-            }
+def normalize_ids(ids):
+    """
+    Returns (ordered_ids, invalid_ids): unique integer IDs in input order and
+    the raw values that are not valid IDs.
+    """
+    ordered_ids = []
+    invalid_ids = []
+    seen = set()
+    for raw_id in ids:
+        try:
+            item_id = int(str(raw_id).strip())
+        except ValueError:
+            invalid_ids.append(raw_id)
+            continue
+        if item_id not in seen:
+            seen.add(item_id)
+            ordered_ids.append(item_id)
+    return ordered_ids, invalid_ids
+
+
+def order_batch_results(ordered_ids, invalid_ids, chunk_results, cached=None):
+    """
+    Returns (ordered, missing_ids): raw payloads (or already-parsed cached
+    items keyed by ID) in ordered_ids order, and the IDs nothing came back for.
+    """
+    cached = cached or {}
+    details_by_id = {}
+    for chunk in chunk_results:
+        for work_item_details in chunk:
+            details_by_id[work_item_details["id"]] = work_item_details
+
+    ordered = []
+    missing_ids = list(invalid_ids)
+    for item_id in ordered_ids:
+        if item_id in details_by_id:
+            ordered.append(details_by_id[item_id])
+        elif item_id in cached:
+            ordered.append(cached[item_id])
+        else:
+            missing_ids.append(item_id)
+    return ordered, missing_ids
+
+
+def assemble_work_item_list(ordered_ids, invalid_ids, chunk_results, cached=None):
+    """
+    Merges per-chunk batch payloads (and already-parsed cached items keyed
+    by ID) into a WorkItemList in ordered_ids order.
+    """
+    ordered, missing_ids = order_batch_results(
+        ordered_ids, invalid_ids, chunk_results, cached
+    )
+    return WorkItemList(
+        [
+            item if isinstance(item, WorkItemRecord) else parse_work_item(item)
+            for item in ordered
+        ],
+        missing_ids,
+    )
+
+
+@call_metrics.traced
+def fetch_revisions(ids, max_workers=batch_max_workers):
+    """
+    Returns {id: System.Rev} for ids using a minimal batch fetch; deleted or
+    inaccessible IDs are left out.
+    """
+    chunk_results = run_concurrently(
+        lambda chunk: _fetch_work_items_chunk(chunk, ["System.Id"]),
+        chunked(ids, batch_id_limit),
+        max_workers,
+    )
+    return {item["id"]: item.get("rev") for chunk in chunk_results for item in chunk}
+
+
+@call_metrics.traced
+def get_work_items_batch(
+    ids,
+    profile=None,
+    max_workers=batch_max_workers,
+    use_cache=True,
+    output="records",
+    columns=None,
+):
+    """
+    Fetches work items by ID, splitting the IDs into chunks under the ADO
+    limit and fetching the chunks concurrently.
+    profile: optional FIELD_PROFILES name to only download those fields.
+    use_cache: serve items from work_item_cache when their Rev is current;
+    stale entries are revalidated with one Rev-only batch fetch.
+    output: "records" returns a WorkItemList in the original ID order
+    (duplicates dropped) with unreturned IDs in .missing_ids; "frame" /
+    "arrow" return a typed DataFrame / Arrow table of `columns` (default
+    FRAME_COLUMNS) instead, see columns_to_frame.
+    """
+    if output != "records" and output not in FRAME_OUTPUTS:
+        raise ValueError(
+            f"Unknown output '{output}'. Expected 'records', 'frame' or 'arrow'."
+        )
+    fields = get_profile_fields(profile)
+    if not ids:
+        if output == "records":
+            return WorkItemList()
+        return payloads_to_frame([], columns, output)
+
+    ordered_ids, invalid_ids = normalize_ids(ids)
+    shape = ("batch", profile)
+    use_cache = use_cache and work_item_cache.enabled
+
+    cached = {}
+    to_fetch = ordered_ids
+    if use_cache:
+        cached, stale, to_fetch = work_item_cache.lookup(ordered_ids, shape)
+        if stale:
+            current_revs = fetch_revisions(list(stale), max_workers)
+            for item_id, item in stale.items():
+                if current_revs.get(item_id) == item["Rev"]:
+                    cached[item_id] = work_item_cache.refresh(item_id, shape) or item
+                else:
+                    to_fetch.append(item_id)
+
+    chunk_results = run_concurrently(
+        lambda chunk: _fetch_work_items_chunk(chunk, fields),
+        chunked(to_fetch, batch_id_limit),
+        max_workers,
+    )
+    if output != "records" and not use_cache:
+        # Nothing to cache, so go from payloads to columns directly
+        payloads, missing_ids = order_batch_results(
+            ordered_ids, invalid_ids, chunk_results
+        )
+        return payloads_to_frame(payloads, columns, output, missing_ids)
+
+    items = assemble_work_item_list(ordered_ids, invalid_ids, chunk_results, cached)
+    if use_cache:
+        work_item_cache.put_many(
+            shape, [item for item in items if item["ID"] not in cached]
+        )
+    if output != "records":
+        return records_to_frame(
+            items, columns or FRAME_COLUMNS, output, items.missing_ids
         )
     return items
 
 
-def execute_query(query_id):
+@call_metrics.traced
+def execute_query(query_id, top=None):
     """
     Executes a stored query by ID and returns a list of Work Item IDs.
+    top: optional server-side cap on the number of results.
     """
-    url = f"https://dev.azure.com/{organization}/{project}/_apis/wit/wiql/{query_id}?api-version=6.0"
-    response = requests.get(url, auth=HTTPBasicAuth("", pat_token))
+    response = get_client().get(query_url(query_id, top))
+
+    return parse_query_ids(check_response(response, "execute query"))
+
+
+@call_metrics.traced
+def run_wiql(query, top=None, time_precision=False):
+    """
+    Runs an ad-hoc WIQL query and returns the raw response
+    ({"workItems": [...]} or {"workItemRelations": [...]}).
+    """
+    response = get_client().post(
+        wiql_url(top, time_precision), json={"query": query}
+    )
+    return check_response(response, "run WIQL query")
+
+
+def wiql_quote(value):
+    # WIQL string literals are single-quoted; embedded quotes are doubled
+    return "'" + str(value).replace("'", "''") + "'"
 
-    data = check_response(response, "execute query")
 
-    ids = []
+def iter_query_ids(data):
+    """
+    Yields the unique work item IDs of a WIQL response in result order.
+    For tree queries both ends of each link are included.
+    """
+    seen = set()
     if "workItems" in data:
         # Flat query
-        ids = [item["id"] for item in data["workItems"]]
-    elif "workItemRelations" in data:
-        # Tree query - extract targets (usually the items we want)
-        # or sources depending on what the user wants.
-        # For a general "list of stories", we might just take all unique IDs found.
-        ids = set()
-        for rel in data["workItemRelations"]:
-            if rel.get("target"):
-                ids.add(rel["target"]["id"])
-            if rel.get("source"):
-                ids.add(rel["source"]["id"])
-        ids = list(ids)
+        candidates = (item["id"] for item in data["workItems"])
+    else:
+        # Tree query - take every ID found, sources before their targets
+        candidates = (
+            end["id"]
+            for rel in data.get("workItemRelations", [])
+            for end in (rel.get("source"), rel.get("target"))
+            if end
+        )
+    for item_id in candidates:
+        if item_id not in seen:
+            seen.add(item_id)
+            yield item_id
 
-    return ids
 
+def parse_query_ids(data):
+    return list(iter_query_ids(data))
 
-def create_child_work_item(parent_work_item, item_data, work_item_type="Task"):
-    # work_item_type should be 'Task' or 'User Story' etc.
-    # The API expects $Task or $User%20Story
-    type_encoded = work_item_type.replace(" ", "%20")
-    url = f"https://dev.azure.com/{organization}/{project}/_apis/wit/workitems/${type_encoded}?api-version=6.0"
 
-    # Construct the JSON Patch document
+def iter_id_chunks(ids, first_chunk_size=25, chunk_size=batch_id_limit):
+    """
+    Groups an ID iterable into lists lazily. The first chunk is small so the
+    first items reach the caller quickly.
+    """
+    chunk = []
+    size = min(first_chunk_size, chunk_size) or chunk_size
+    for item_id in ids:
+        chunk.append(item_id)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+            size = chunk_size
+    if chunk:
+        yield chunk
+
+
+def stream_work_items(
+    ids,
+    profile=None,
+    first_chunk_size=25,
+    max_workers=batch_max_workers,
+    stats=None,
+    started=None,
+):
+    """
+    Generator that hydrates an ID iterable in batch chunks and yields the
+    work items in ID order as each chunk arrives. Up to max_workers chunks
+    are in flight at once, so the next chunks download while the caller
+    handles the current one.
+    stats: optional dict filled with timings (seconds) and counts:
+    first_item_seconds, total_seconds, items, hydrated, chunks, missing_ids.
+    """
+    stats = stats if stats is not None else {}
+    started = started if started is not None else time.monotonic()
+    stats.update(
+        {
+            "first_item_seconds": None,
+            "total_seconds": None,
+            "items": 0,
+            "hydrated": 0,
+            "chunks": 0,
+            "missing_ids": [],
+        }
+    )
+    pending = []
+    with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as pool:
+        chunks = iter_id_chunks(ids, first_chunk_size)
+        while True:
+            # Keep the pipeline full before waiting on the oldest chunk
+            for chunk in chunks:
+                pending.append(
+                    pool.submit(
+                        contextvars.copy_context().run,
+                        get_work_items_batch,
+                        chunk,
+                        profile,
+                        1,
+                    )
+                )
+                if len(pending) >= max_workers:
+                    break
+            if not pending:
+                break
+            items = pending.pop(0).result()
+            stats["chunks"] += 1
+            stats["hydrated"] += len(items)
+            stats["missing_ids"].extend(items.missing_ids)
+            for item in items:
+                if stats["first_item_seconds"] is None:
+                    stats["first_item_seconds"] = time.monotonic() - started
+                stats["items"] += 1
+                yield item
+    stats["total_seconds"] = time.monotonic() - started
+
+
+def stream_query_work_items(
+    query_id, profile=None, top=None, max_workers=batch_max_workers, stats=None
+):
+    """
+    Runs a stored query and streams its work items (see stream_work_items).
+    stats also gets query_seconds and results (rows returned by the query).
+    """
+    stats = stats if stats is not None else {}
+    started = time.monotonic()
+    response = get_client().get(query_url(query_id, top))
+    data = check_response(response, "execute query")
+    stats["query_seconds"] = time.monotonic() - started
+    stats["results"] = len(data.get("workItems", data.get("workItemRelations", [])))
+    yield from stream_work_items(
+        iter_query_ids(data),
+        profile,
+        max_workers=max_workers,
+        stats=stats,
+        started=started,
+    )
+
+
+CHILD_LINK_TYPE = "System.LinkTypes.Hierarchy-Forward"
+PARENT_LINK_TYPE = "System.LinkTypes.Hierarchy-Reverse"
+
+
+def child_links_query(
+    parent_ids,
+    child_types=None,
+    exclude_states=None,
+    mode="MustContain",
+    link_type=CHILD_LINK_TYPE,
+):
+    """
+    WIQL WorkItemLinks query for the items linked from parent_ids (one ID or
+    a list), with the type and state filters applied by ADO.
+    mode="Recursive" follows the hierarchy down to every level.
+    """
+    if isinstance(parent_ids, (list, tuple, set)):
+        sources = ", ".join(str(int(str(i).strip())) for i in parent_ids)
+        source_clause = f"[Source].[System.Id] IN ({sources})"
+    else:
+        source_clause = f"[Source].[System.Id] = {int(str(parent_ids).strip())}"
+    clauses = [source_clause, f"[System.Links.LinkType] = {wiql_quote(link_type)}"]
+    if child_types:
+        types = ", ".join(wiql_quote(t) for t in child_types)
+        clauses.append(f"[Target].[System.WorkItemType] IN ({types})")
+    if exclude_states:
+        states = ", ".join(wiql_quote(s) for s in exclude_states)
+        clauses.append(f"[Target].[System.State] NOT IN ({states})")
+    return (
+        "SELECT [System.Id] FROM WorkItemLinks WHERE "
+        + " AND ".join(clauses)
+        + f" MODE ({mode})"
+    )
+
+
+def parse_links(data):
+    # The root rows have no rel/source; every other row is a source -> target link
+    return [
+        (rel["source"]["id"], rel["target"]["id"])
+        for rel in data.get("workItemRelations", [])
+        if rel.get("rel") and rel.get("source") and rel.get("target")
+    ]
+
+
+def parse_child_link_ids(data):
+    return [target for _, target in parse_links(data)]
+
+
+@call_metrics.traced
+def get_feature_with_children(
+    feature_id,
+    child_types=("User Story",),
+    exclude_states=("Removed",),
+    child_profile="list",
+    feature_profile=None,
+):
+    """
+    Loads a work item and its matching direct children.
+    The feature fetch and the child link query run in parallel, then only
+    the children that pass the type/state filters are hydrated in batches.
+    child_types / exclude_states: None to skip that filter.
+    Returns (feature, children) where children is a WorkItemList.
+    """
+    feature, link_data = run_concurrently(
+        lambda task: task(),
+        [
+            lambda: get_work_item(feature_id, profile=feature_profile),
+            lambda: run_wiql(
+                child_links_query(feature_id, child_types, exclude_states)
+            ),
+        ],
+        max_workers=2,
+    )
+    child_ids = parse_child_link_ids(link_data)
+    children = get_work_items_batch(child_ids, profile=child_profile)
+    return feature, children
+
+
+class WorkItemTree:
+    """
+    Indexed in-memory hierarchy returned by prefetch_tree.
+    Items are the dicts from get_work_items_batch, keyed by ID.
+    """
+
+    def __init__(self, root_ids, items, links, missing_ids=()):
+        self.root_ids = list(root_ids)
+        self.items = {item["ID"]: item for item in items}
+        self.missing_ids = list(missing_ids)
+        self._children = {}
+        self._parent = {}
+        for parent_id, child_id in links:
+            if parent_id in self.items and child_id in self.items:
+                self._children.setdefault(parent_id, []).append(child_id)
+                self._parent[child_id] = parent_id
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, work_item_id):
+        return work_item_id in self.items
+
+    def __getitem__(self, work_item_id):
+        return self.items[work_item_id]
+
+    def get(self, work_item_id, default=None):
+        return self.items.get(work_item_id, default)
+
+    def roots(self):
+        """
+        Root items in the requested order; IDs ADO did not return are in
+        .missing_ids, as with get_work_items_batch.
+        """
+        return WorkItemList(
+            [self.items[i] for i in self.root_ids if i in self.items],
+            self.missing_ids,
+        )
+
+    def children(self, work_item_id, types=None):
+        return [
+            self.items[i]
+            for i in self._children.get(work_item_id, [])
+            if types is None or self.items[i]["Work Item Type"] in types
+        ]
+
+    def parent(self, work_item_id):
+        parent_id = self._parent.get(work_item_id)
+        return self.items.get(parent_id) if parent_id is not None else None
+
+    def descendants(self, work_item_id):
+        found = []
+        pending = list(self._children.get(work_item_id, []))
+        while pending:
+            child_id = pending.pop(0)
+            found.append(self.items[child_id])
+            pending.extend(self._children.get(child_id, []))
+        return found
+
+
+def _limit_depth(root_ids, links, depth):
+    children = {}
+    for parent_id, child_id in links:
+        children.setdefault(parent_id, []).append(child_id)
+    kept = []
+    level = list(root_ids)
+    seen = set(root_ids)
+    for _ in range(depth):
+        next_level = []
+        for parent_id in level:
+            for child_id in children.get(parent_id, []):
+                if child_id not in seen:
+                    seen.add(child_id)
+                    kept.append((parent_id, child_id))
+                    next_level.append(child_id)
+        level = next_level
+    return kept
+
+
+@call_metrics.traced
+def prefetch_tree(
+    root_ids,
+    depth=2,
+    include_parents=False,
+    child_types=None,
+    exclude_states=("Removed",),
+    profile="full",
+    max_workers=batch_max_workers,
+    known_items=(),
+):
+    """
+    Loads the subtree under root_ids (e.g. Feature -> Story -> Task) down to
+    depth levels, plus each root's parent when include_parents is set.
+    known_items are records already loaded (e.g. streamed query results);
+    they are used as-is instead of being fetched again.
+    Uses a fixed number of round trips regardless of tree size: one stage of
+    recursive WorkItemLinks queries (and parent lookups) run in parallel,
+    then one stage of concurrent batch hydration.
+    child_types / exclude_states filter descendants in ADO; a filtered item
+    also prunes its own subtree.
+    Returns a WorkItemTree.
+    """
+    ordered_ids, invalid_ids = normalize_ids(root_ids)
+    if not ordered_ids:
+        return WorkItemTree([], [], [], invalid_ids)
+
+    queries = []  # (is_parent_query, wiql)
+    for chunk in chunked(ordered_ids, batch_id_limit):
+        if depth > 0:
+            mode = "Recursive" if depth > 1 else "MustContain"
+            queries.append(
+                (False, child_links_query(chunk, child_types, exclude_states, mode=mode))
+            )
+        if include_parents:
+            queries.append(
+                (True, child_links_query(chunk, link_type=PARENT_LINK_TYPE))
+            )
+    results = run_concurrently(
+        lambda query: run_wiql(query[1]), queries, max_workers
+    )
+
+    child_links = []
+    parent_links = []
+    for (is_parent_query, _), data in zip(queries, results):
+        if is_parent_query:
+            # Reverse links read child -> parent
+            parent_links.extend((parent, child) for child, parent in parse_links(data))
+        else:
+            child_links.extend(parse_links(data))
+    links = _limit_depth(ordered_ids, child_links, depth) + parent_links
+
+    known = {item["ID"]: item for item in known_items}
+    all_ids = [i for i in ordered_ids if i not in known]
+    for parent_id, child_id in links:
+        all_ids.extend(i for i in (parent_id, child_id) if i not in known)
+    items = get_work_items_batch(all_ids, profile=profile, max_workers=max_workers)
+    missing = set(items.missing_ids)
+    root_missing = invalid_ids + [i for i in ordered_ids if i in missing]
+    return WorkItemTree(
+        ordered_ids, list(known.values()) + list(items), links, root_missing
+    )
+
+
+def build_create_patch_document(parent_work_item, item_data, work_item_type="Task"):
+    """
+    Builds the JSON Patch document used to create a work item of
+    work_item_type under parent_work_item.
+    """
     area_path = item_data.get("Area Path")
     if is_missing_value(area_path) and parent_work_item:
         area_path = parent_work_item.get("Area Path")
@@ -376,32 +1671,199 @@ def create_child_work_item(parent_work_item, item_data, work_item_type="Task"):
             }
         )
 
-    response = requests.post(
+    return patch_document
+
+
+@call_metrics.traced
+def create_child_work_item(parent_work_item, item_data, work_item_type="Task"):
+    url = create_work_item_url(work_item_type)
+
+    # Construct the JSON Patch document
+    patch_document = build_create_patch_document(
+        parent_work_item, item_data, work_item_type
+    )
+
+    response = get_client().post(
         url,
         json=patch_document,
         headers={"Content-Type": "application/json-patch+json"},
-        auth=HTTPBasicAuth("", pat_token),
     )
 
-    return check_response(response, f"create {work_item_type}")
+    created = check_response(response, f"create {work_item_type}")
+    # The parent gained a child link (and a new Rev)
+    if parent_work_item and "ID" in parent_work_item:
+        work_item_cache.invalidate([parent_work_item["ID"]])
+    return created
 
 
 def create_task(parent_work_item, task_data):
     return create_child_work_item(parent_work_item, task_data, "Task")
 
 
-def update_work_item(work_item_id, updates):
+def _post_batch(batch_requests, action_desc):
     """
-    Updates a work item with the given fields.
-    updates: dict of field_name -> new_value
-    Example updates:
-    {
-        "System.Description": "New description...",
-        "Microsoft.VSTS.Common.AcceptanceCriteria": "New AC..."
-    }
+    Sends up to batch_request_limit sub-requests to the ADO $batch endpoint.
+    Returns the list of sub-responses ({"code", "headers", "body"}) in request order.
+    """
+    response = get_client().post(
+        batch_endpoint_url(), json=batch_requests, item_count=len(batch_requests)
+    )
+    data = check_response(response, action_desc)
+    return data.get("value", [])
+
+
+def _parse_batch_sub_response(sub_response):
+    """
+    Returns (work_item, error) for a single $batch sub-response.
     """
-    url = f"https://dev.azure.com/{organization}/{project}/_apis/wit/workitems/{work_item_id}?api-version=6.0"
+    body = sub_response.get("body")
+    if isinstance(body, str):
+        try:
+            body = json.loads(body)
+        except ValueError:
+            pass
+    if sub_response.get("code") == 200:
+        return body, None
+    if isinstance(body, dict):
+        message = body.get("message") or body.get("value", {}).get("Message")
+        if message:
+            return None, f"{sub_response.get('code')} - {message}"
+    return None, f"{sub_response.get('code')} - {body}"
 
+
+def _run_batch(
+    batch_requests, action_desc, max_workers, on_progress=None, on_result=None
+):
+    """
+    Splits batch_requests into $batch calls, sends them concurrently and
+    returns one result dict per sub-request, in input order:
+    {"index": i, "ok": bool, "id": created/updated ID or None,
+     "work_item": response body or None, "error": message or None}
+    Sub-requests ADO throttles (429/503) are resubmitted according to
+    retry_policy; nothing is delayed otherwise.
+    on_result(result) is called from the calling thread for each final
+    result as soon as its $batch call returns.
+    """
+    results = [None] * len(batch_requests)
+    done_count = [0]
+    pending = list(range(len(batch_requests)))
+
+    def send_chunk(indexes):
+        try:
+            return _post_batch([batch_requests[i] for i in indexes], action_desc)
+        except ADOAuthenticationError:
+            raise
+        except Exception as e:
+            # Whole call failed (network, 5xx): every sub-request in it failed
+            return [{"code": None, "body": str(e)} for _ in indexes]
+
+    attempt = 0
+    while pending:
+        chunks = chunked(pending, batch_request_limit)
+        throttled = []
+
+        def collect(chunk_index, sub_responses):
+            indexes = chunks[chunk_index]
+            sub_responses = [
+                sub_responses[position]
+                if position < len(sub_responses)
+                else {"code": None, "body": "No response returned"}
+                for position in range(len(indexes))
+            ]
+            # One throttled $batch call is one retry, however many of its
+            # sub-requests ADO rejected; wait for the longest delay it asked for
+            throttled_responses = [
+                r for r in sub_responses if r.get("code") in RETRY_STATUS_CODES
+            ]
+            retrying = False
+            if throttled_responses:
+                slowest = max(
+                    throttled_responses,
+                    key=lambda r: get_header_seconds(r.get("headers"), "Retry-After")
+                    or get_header_seconds(r.get("headers"), "X-RateLimit-Delay")
+                    or 0,
+                )
+                # retry_delay also pauses the shared client, so the resubmitted
+                # $batch call waits for ADO's Retry-After automatically
+                retrying = (
+                    retry_policy.retry_delay(
+                        slowest.get("code"), slowest.get("headers"), attempt
+                    )
+                    is not None
+                )
+            for i, sub_response in zip(indexes, sub_responses):
+                if retrying and sub_response.get("code") in RETRY_STATUS_CODES:
+                    throttled.append(i)
+                    continue
+                work_item, error = _parse_batch_sub_response(sub_response)
+                results[i] = {
+                    "index": i,
+                    "ok": error is None,
+                    "id": work_item.get("id") if isinstance(work_item, dict) else None,
+                    "work_item": work_item,
+                    "error": error,
+                }
+                done_count[0] += 1
+                if on_result:
+                    on_result(results[i])
+            if on_progress:
+                on_progress(done_count[0], len(batch_requests))
+
+        run_concurrently(send_chunk, chunks, max_workers, on_result=collect)
+        pending = sorted(throttled)
+        attempt += 1
+
+    return results
+
+
+@call_metrics.traced
+def create_work_items_bulk(
+    items, max_workers=batch_max_workers, on_progress=None, on_result=None
+):
+    """
+    Creates many work items through the ADO $batch endpoint (200 per call).
+    items: list of (parent_work_item, item_data, work_item_type) tuples,
+    i.e. the same arguments create_child_work_item takes.
+    Returns one result dict per input item, in input order; result["index"]
+    is the position in items and result["id"] the created work item ID.
+    ADO batches are not transactional, so check result["ok"] per item.
+    on_progress(done, total) is called from the calling thread after each call,
+    on_result(result) for each item as soon as it is known.
+    """
+    batch_requests = []
+    for parent_work_item, item_data, work_item_type in items:
+        batch_requests.append(
+            {
+                "method": "PATCH",
+                "uri": f"/{urllib.parse.quote(project)}/_apis/wit/workitems/${urllib.parse.quote(work_item_type)}?api-version=6.0",
+                "headers": {"Content-Type": "application/json-patch+json"},
+                "body": build_create_patch_document(
+                    parent_work_item, item_data, work_item_type
+                ),
+            }
+        )
+    results = _run_batch(
+        batch_requests, "create work items", max_workers, on_progress, on_result
+    )
+    # Parents gained child links (and a new Rev)
+    work_item_cache.invalidate(
+        [parent["ID"] for parent, _, _ in items if parent and "ID" in parent]
+    )
+    return results
+
+
+@call_metrics.traced
+def delete_work_item(work_item_id):
+    """
+    Deletes a work item (it goes to the project's recycle bin and can be
+    restored from there).
+    """
+    response = get_client().delete(update_work_item_url(work_item_id))
+    check_response(response, f"delete work item {work_item_id}")
+    work_item_cache.invalidate([work_item_id])
+
+
+def build_update_patch_document(updates):
     patch_document = []
     for field, value in updates.items():
         patch_document.append(
@@ -411,22 +1873,117 @@ def update_work_item(work_item_id, updates):
                 "value": value,
             }
         )
+    return patch_document
+
 
-    response = requests.patch(
+_TAG_WHITESPACE_RE = re.compile(r"\s*(<[^>]*>)\s*")
+_WHITESPACE_RE = re.compile(r"\s+")
+# What rich text editors save for an empty field
+_EMPTY_HTML_RE = re.compile(r"^(<(p|div)><br/?></\2>|<p></p>|<br/?>)*$", re.IGNORECASE)
+
+
+def normalize_field_value(value):
+    """
+    Canonical form of a field value for change detection: missing values
+    become "", numbers compare numerically and HTML that differs only in
+    whitespace (including &nbsp; and empty editor paragraphs) compares equal.
+    """
+    if is_missing_value(value):
+        return ""
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = value.replace("&nbsp;", " ").replace("\xa0", " ")
+    text = _WHITESPACE_RE.sub(" ", text).strip()
+    text = _TAG_WHITESPACE_RE.sub(r"\1", text)
+    text = re.sub(r"<br\s*/?>", "<br/>", text, flags=re.IGNORECASE)
+    if _EMPTY_HTML_RE.match(text):
+        return ""
+    return text
+
+
+def changed_fields(current, updates):
+    """
+    Returns the entries of updates that differ from current (see
+    normalize_field_value). current is the last fetched WorkItemRecord or a
+    raw {field reference: value} dict; fields it does not hold count as
+    changed.
+    """
+    changes = {}
+    for field, value in updates.items():
+        if field in current:
+            old = current[field]
+        elif FIELD_RECORD_KEYS.get(field) in current:
+            old = current[FIELD_RECORD_KEYS[field]]
+        else:
+            changes[field] = value
+            continue
+        if normalize_field_value(old) != normalize_field_value(value):
+            changes[field] = value
+    return changes
+
+
+@call_metrics.traced
+def update_work_item(work_item_id, updates, current=None):
+    """
+    Updates a work item with the given fields.
+    updates: dict of field_name -> new_value
+    Example updates:
+    {
+        "System.Description": "New description...",
+        "Microsoft.VSTS.Common.AcceptanceCriteria": "New AC..."
+    }
+    current: the last fetched values (see changed_fields). When given, only
+    fields that changed are sent, and nothing is sent (None is returned)
+    when none did.
+    """
+    if current is not None:
+        updates = changed_fields(current, updates)
+        if not updates:
+            return None
+
+    url = update_work_item_url(work_item_id)
+
+    patch_document = build_update_patch_document(updates)
+
+    response = get_client().patch(
         url,
         json=patch_document,
         headers={"Content-Type": "application/json-patch+json"},
-        auth=HTTPBasicAuth("", pat_token),
     )
 
+    work_item_cache.invalidate([work_item_id])
     return check_response(response, f"update work item {work_item_id}")
 
 
-def get_iterations_by_path(path_str):
+@call_metrics.traced
+def update_work_items_bulk(
+    updates, max_workers=batch_max_workers, on_progress=None, on_result=None
+):
     """
-    Fetches children iterations for a given path string (e.g. "Platts\\Scrum\\26.02")
-    Returns a list of iteration node objects with keys: Name, Path, ID.
+    Updates many work items through the ADO $batch endpoint (200 per call).
+    updates: list of (work_item_id, {field_name: new_value}) tuples.
+    Returns one result dict per input entry, in input order (see _run_batch).
     """
+    batch_requests = []
+    for work_item_id, fields in updates:
+        batch_requests.append(
+            {
+                "method": "PATCH",
+                "uri": f"/_apis/wit/workitems/{work_item_id}?api-version=6.0",
+                "headers": {"Content-Type": "application/json-patch+json"},
+                "body": build_update_patch_document(fields),
+            }
+        )
+    results = _run_batch(
+        batch_requests, "update work items", max_workers, on_progress, on_result
+    )
+    work_item_cache.invalidate([work_item_id for work_item_id, _ in updates])
+    return results
+
+
+def iterations_url(path_str):
     # Remove project name from path if present at start (Classification Nodes API expects path relative to project)
     normalized_path = path_str.replace("\\", "/")
     if normalized_path.startswith(f"{project}/"):
@@ -434,15 +1991,10 @@ def get_iterations_by_path(path_str):
     else:
         relative_path = normalized_path
 
-    url = f"https://dev.azure.com/{organization}/{project}/_apis/wit/classificationnodes/Iterations/{relative_path}?$depth=1&api-version=6.0"
+    return f"{base_url}/{organization}/{project}/_apis/wit/classificationnodes/Iterations/{relative_path}?$depth=1&api-version=6.0"
 
-    response = requests.get(url, auth=HTTPBasicAuth("", pat_token))
-
-    if response.status_code == 404:
-        return []
-
-    data = check_response(response, "fetch iterations")
 
+def parse_iterations(data, path_str):
     children = []
     if "children" in data:
         for child in data["children"]:
@@ -453,3 +2005,249 @@ def get_iterations_by_path(path_str):
             )
 
     return children
+
+
+def iteration_tree_url(depth=None):
+    depth = depth or iteration_depth
+    return f"{base_url}/{organization}/{project}/_apis/wit/classificationnodes/Iterations?$depth={depth}&api-version=6.0"
+
+
+def normalize_iteration_path(path_str):
+    return (path_str or "").replace("/", "\\").strip("\\").lower()
+
+
+def _cycle_from_name(path_str):
+    # "Platts\Scrum\26.02\Sprint 1" -> "Platts\Scrum\26.02"
+    if "Sprint" in path_str or "Iter" in path_str:
+        parts = path_str.split("\\")
+        if len(parts) > 1:
+            return "\\".join(parts[:-1])
+    return path_str
+
+
+def _parse_node_date(value):
+    # Classification node dates look like "2026-02-04T00:00:00Z"
+    if not value:
+        return None
+    try:
+        return datetime.date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+class IterationTree:
+    """
+    The project's iteration hierarchy, indexed by normalized path, by node
+    ID and by date. Paths are System.IterationPath values, e.g.
+    "Platts\\Scrum\\26.02\\Sprint 1".
+    Each node is a dict with Name, Path, ID, Start Date, Finish Date, Parent
+    (path or None) and Children (paths, in iteration order).
+    Nodes at the depth limit come back without their children; those are
+    kept as unknown rather than as leaves.
+    """
+
+    def __init__(self, root_data):
+        self.loaded_at = time.monotonic()
+        self._truncated = set()
+        self._by_path = {}
+        self._by_id = {}
+        self._order = {}
+        self.root = self._add(root_data, None)
+        self._dated = sorted(
+            (
+                node
+                for node in self._by_path.values()
+                if node["Start Date"] and node["Finish Date"]
+            ),
+            key=lambda node: (node["Start Date"], node["Finish Date"]),
+        )
+
+    def _add(self, data, parent):
+        name = data["name"]
+        path = f"{parent['Path']}\\{name}" if parent else name
+        node = {
+            "Name": name,
+            "Path": path,
+            "ID": data.get("id"),
+            "Start Date": _parse_node_date(data.get("attributes", {}).get("startDate")),
+            "Finish Date": _parse_node_date(
+                data.get("attributes", {}).get("finishDate")
+            ),
+            "Parent": parent["Path"] if parent else None,
+            "Children": [],
+        }
+        self._order[normalize_iteration_path(path)] = len(self._order)
+        self._by_path[normalize_iteration_path(path)] = node
+        if node["ID"] is not None:
+            self._by_id[node["ID"]] = node
+        if data.get("hasChildren") and "children" not in data:
+            self._truncated.add(normalize_iteration_path(path))
+        # Dated children in date order, undated ones after them by name
+        children = sorted(
+            data.get("children", []),
+            key=lambda child: (
+                _parse_node_date(child.get("attributes", {}).get("startDate"))
+                or datetime.date.max,
+                child["name"],
+            ),
+        )
+        for child in children:
+            node["Children"].append(self._add(child, node)["Path"])
+        return node
+
+    def __len__(self):
+        return len(self._by_path)
+
+    def get(self, path_str):
+        return self._by_path.get(normalize_iteration_path(path_str))
+
+    def by_id(self, node_id):
+        return self._by_id.get(node_id)
+
+    def children(self, path_str):
+        """
+        Direct children of path_str as {"Name", "Path", "ID", "Start Date",
+        "Finish Date"} dicts, or None when the path is not in the tree or its
+        children are below the loaded depth.
+        """
+        node = self.get(path_str)
+        if node is None or normalize_iteration_path(path_str) in self._truncated:
+            return None
+        keys = ("Name", "Path", "ID", "Start Date", "Finish Date")
+        return [
+            {key: child[key] for key in keys}
+            for child in (self.get(path) for path in node["Children"])
+        ]
+
+    def containing(self, day):
+        """
+        Dated iterations whose start/finish range includes day, innermost
+        (shortest) first.
+        """
+        found = [
+            node
+            for node in self._dated
+            if node["Start Date"] <= day <= node["Finish Date"]
+        ]
+        return sorted(found, key=lambda node: node["Finish Date"] - node["Start Date"])
+
+    def overlapping(self, start, finish):
+        return [
+            node
+            for node in self._dated
+            if node["Start Date"] <= finish and node["Finish Date"] >= start
+        ]
+
+    def infer_cycle(self, path_str):
+        """
+        The cycle (parent path) a sprint belongs to; a non-leaf iteration is
+        already a cycle. Falls back to the naming heuristic for paths the
+        tree does not know.
+        """
+        node = self.get(path_str)
+        if node is not None:
+            has_children = (
+                node["Children"] or normalize_iteration_path(path_str) in self._truncated
+            )
+            if has_children or not node["Parent"]:
+                return node["Path"]
+            return node["Parent"]
+        return _cycle_from_name(path_str)
+
+    def sort_key(self, path_str):
+        """
+        Sort key placing iteration paths in tree (date) order; unknown paths
+        sort after known ones, by name with IP Iterations last.
+        """
+        index = self._order.get(normalize_iteration_path(path_str))
+        if index is not None:
+            return (0, index, "")
+        return (1, 0, (path_str or "").replace("IP Iteration", "~IP Iteration"))
+
+
+_iteration_tree = None
+_iteration_tree_lock = threading.Lock()
+# (monotonic time, error) of the last failed load; callers look up many
+# paths in a row, so a failing endpoint is not asked again for a while
+_iteration_tree_failure = None
+ITERATION_FAILURE_TTL = 60
+
+
+@call_metrics.traced
+def get_iteration_tree(refresh=False):
+    """
+    Returns the cached IterationTree, loading the whole project tree (down
+    to iteration_depth levels) in one call when it is missing, older than
+    iteration_cache_ttl, or refresh is set. A failed load is re-raised
+    without a new request for ITERATION_FAILURE_TTL seconds.
+    """
+    global _iteration_tree, _iteration_tree_failure
+    with _iteration_tree_lock:
+        tree = _iteration_tree
+        if (
+            refresh
+            or tree is None
+            or time.monotonic() - tree.loaded_at > iteration_cache_ttl
+        ):
+            failure = _iteration_tree_failure
+            if (
+                not refresh
+                and failure is not None
+                and time.monotonic() - failure[0] < ITERATION_FAILURE_TTL
+            ):
+                raise failure[1]
+            try:
+                response = get_client().get(iteration_tree_url())
+                tree = IterationTree(check_response(response, "fetch iteration tree"))
+            except Exception as e:
+                _iteration_tree_failure = (time.monotonic(), e)
+                raise
+            _iteration_tree = tree
+            _iteration_tree_failure = None
+        return tree
+
+
+def iteration_sort_key(path_str):
+    """
+    Sort key for Iteration Path values in iteration order; falls back to
+    sorting by name when the iteration tree cannot be loaded.
+    """
+    try:
+        return get_iteration_tree().sort_key(path_str)
+    except Exception:
+        return (1, 0, (path_str or "").replace("IP Iteration", "~IP Iteration"))
+
+
+def infer_iteration_cycle(path_str):
+    """
+    Cycle path for a sprint's Iteration Path; uses the naming heuristic
+    when the iteration tree cannot be loaded.
+    """
+    try:
+        return get_iteration_tree().infer_cycle(path_str)
+    except Exception:
+        return _cycle_from_name(path_str)
+
+
+@call_metrics.traced
+def get_iterations_by_path(path_str, refresh=False):
+    """
+    Fetches children iterations for a given path string (e.g. "Platts\\Scrum\\26.02")
+    Returns a list of iteration node objects with keys: Name, Path, ID
+    (plus Start Date / Finish Date when served from the iteration tree).
+    Served from the cached IterationTree; paths deeper than the cached tree,
+    or every path when the tree cannot be loaded, are looked up directly.
+    """
+    try:
+        children = get_iteration_tree(refresh).children(path_str)
+    except Exception:
+        children = None
+    if children is not None:
+        return children
+
+    response = get_client().get(iterations_url(path_str))
+
+    if response.status_code == 404:
+        return []
+
+    return parse_iterations(check_response(response, "fetch iterations"), path_str)
@@ -0,0 +1,173 @@
+"""
+Asyncio client for the Azure DevOps calls in ado_api.
+
+URL building, response parsing and settings are shared with ado_api, so the
+synchronous functions used by the tabs and this client stay in step.
+
+Example:
+    async with AsyncADOClient(concurrency=16) as client:
+        items = await asyncio.gather(*(client.get_work_item(i) for i in ids))
+"""
+
+import asyncio
+import json
+
+import aiohttp
+
+import ado_api
+import call_metrics
+
+
+class AsyncADOClient:
+    """
+    Async counterpart of the ado_api functions.
+    One aiohttp session (keep-alive connection pool) is shared by every call
+    and at most `concurrency` requests are in flight at once, so callers can
+    safely gather hundreds of calls.
+    """
+
+    def __init__(self, concurrency=ado_api.pool_maxsize, pat=None):
+        self.concurrency = concurrency
+        self._pat = pat if pat is not None else ado_api.pat_token
+        self._session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def open(self):
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.concurrency)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                auth=aiohttp.BasicAuth("", self._pat),
+                timeout=aiohttp.ClientTimeout(
+                    sock_connect=ado_api.connect_timeout,
+                    sock_read=ado_api.read_timeout,
+                ),
+            )
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _request(self, method, url, action_desc, body=None, allow_404=False):
+        await self.open()
+        headers = {}
+        data = None
+        if body is not None:
+            headers["Content-Type"] = "application/json-patch+json"
+            data = json.dumps(body)
+        policy = ado_api.retry_policy
+        attempt = 0
+        with call_metrics.metrics.timed(
+            "ado", ado_api.endpoint_label(url), method
+        ) as call:
+            call["sent"] = call_metrics.body_size(data)
+            while True:
+                pause = policy.pacing_delay()
+                if pause:
+                    await asyncio.sleep(pause)
+                async with self._semaphore:
+                    async with self._session.request(
+                        method, url, data=data, headers=headers
+                    ) as response:
+                        status = response.status
+                        response_headers = response.headers
+                        text = await response.text()
+                delay = policy.retry_delay(status, response_headers, attempt)
+                if delay is None:
+                    policy.observe(response_headers)
+                    break
+                await asyncio.sleep(delay)
+                attempt += 1
+            call["status"] = status
+            call["received"] = call_metrics.body_size(text)
+            call["retries"] = attempt
+        if allow_404 and status == 404:
+            return None
+        if status != 200:
+            ado_api.raise_for_ado_status(status, text, action_desc)
+        return json.loads(text)
+
+    async def get_work_item(self, work_item_id, profile=None, expand_relations=False):
+        data = await self._request(
+            "GET",
+            ado_api.work_item_url(work_item_id, profile, expand_relations),
+            "retrieve work item",
+        )
+        return ado_api.parse_work_item(data)
+
+    async def _fetch_work_items_chunk(self, ids, fields):
+        data = await self._request(
+            "GET",
+            ado_api.work_items_batch_url(ids, fields),
+            "retrieve work items batch",
+        )
+        return [item for item in data.get("value", []) if item]
+
+    async def get_work_items_batch(self, ids, profile=None):
+        """
+        Same contract as ado_api.get_work_items_batch: a WorkItemList in the
+        original ID order with .missing_ids for IDs ADO did not return.
+        """
+        fields = ado_api.get_profile_fields(profile)
+        if not ids:
+            return ado_api.WorkItemList()
+
+        ordered_ids, invalid_ids = ado_api.normalize_ids(ids)
+        chunk_results = await asyncio.gather(
+            *(
+                self._fetch_work_items_chunk(chunk, fields)
+                for chunk in ado_api.chunked(ordered_ids, ado_api.batch_id_limit)
+            )
+        )
+        return ado_api.assemble_work_item_list(ordered_ids, invalid_ids, chunk_results)
+
+    async def execute_query(self, query_id):
+        data = await self._request("GET", ado_api.query_url(query_id), "execute query")
+        return ado_api.parse_query_ids(data)
+
+    async def create_child_work_item(
+        self, parent_work_item, item_data, work_item_type="Task"
+    ):
+        created = await self._request(
+            "POST",
+            ado_api.create_work_item_url(work_item_type),
+            f"create {work_item_type}",
+            body=ado_api.build_create_patch_document(
+                parent_work_item, item_data, work_item_type
+            ),
+        )
+        # The parent gained a child link (and a new Rev)
+        if parent_work_item and "ID" in parent_work_item:
+            ado_api.work_item_cache.invalidate([parent_work_item["ID"]])
+        return created
+
+    async def update_work_item(self, work_item_id, updates):
+        try:
+            return await self._request(
+                "PATCH",
+                ado_api.update_work_item_url(work_item_id),
+                f"update work item {work_item_id}",
+                body=ado_api.build_update_patch_document(updates),
+            )
+        finally:
+            ado_api.work_item_cache.invalidate([work_item_id])
+
+    async def get_iterations_by_path(self, path_str):
+        data = await self._request(
+            "GET",
+            ado_api.iterations_url(path_str),
+            "fetch iterations",
+            allow_404=True,
+        )
+        if data is None:
+            return []
+        return ado_api.parse_iterations(data, path_str)
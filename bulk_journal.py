@@ -0,0 +1,359 @@
+"""
+Append-only journal for bulk work item creates and updates.
+
+Each run writes one JSONL file: a "begin" line with every intended
+operation, then one "result" line per operation as soon as ADO answers, and
+an "end" line when the run is over. If the Streamlit script dies half way,
+the file still says what was created, and resume() carries on with only the
+operations that have no result yet. Journals carry an owner (the user or
+session that started the run) so a shared server only offers each user
+their own unfinished runs.
+"""
+
+import datetime
+import glob
+import json
+import os
+import threading
+import uuid
+
+import ado_api
+import call_metrics
+import jobs
+
+journal_dir = ado_api.get_env(
+    "ADO_JOURNAL_DIR", required=False, default=".ado_cache/journal"
+)
+
+# Parent fields build_create_patch_document reads; enough to replay a create
+PARENT_KEYS = ("ID", "url", "Area Path", "Iteration Path", "CMDB App Name")
+
+
+def _utc_now():
+    return datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _json_default(value):
+    # DataFrame rows carry numpy scalars
+    if hasattr(value, "item"):
+        return value.item()
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def _slim_parent(parent):
+    if not parent:
+        return None
+    return {key: parent[key] for key in PARENT_KEYS if key in parent}
+
+
+class BulkJournal:
+    """
+    One bulk run's journal file.
+    kind is "create" (operations are [parent, item_data, work_item_type]) or
+    "update" (operations are [work_item_id, fields]).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.run_id = None
+        self.label = None
+        self.owner = None
+        self.job_id = None
+        self.kind = None
+        self.started_at = None
+        self.operations = []
+        self.results = {}  # operation index -> result record
+        self.ended = False
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A line cut short by a crash; everything before it is intact
+                    continue
+                if record["type"] == "begin":
+                    self.run_id = record["run_id"]
+                    self.label = record["label"]
+                    self.owner = record.get("owner")
+                    self.job_id = record.get("job_id")
+                    self.kind = record["kind"]
+                    self.started_at = record["started_at"]
+                    self.operations = record["operations"]
+                elif record["type"] == "result":
+                    self.results[record["index"]] = record
+                elif record["type"] == "end":
+                    self.ended = True
+
+    @classmethod
+    def start(cls, label, kind, operations, directory=None, owner=None, job_id=None):
+        """
+        Creates the journal file for a new run and records every intended
+        operation before anything is sent. job_id is the background job
+        (see jobs) sending them, if any.
+        """
+        if kind == "create":
+            operations = [
+                [_slim_parent(parent), item_data, work_item_type]
+                for parent, item_data, work_item_type in operations
+            ]
+        else:
+            operations = [[item_id, fields] for item_id, fields in operations]
+        directory = directory or journal_dir
+        os.makedirs(directory, exist_ok=True)
+        run_id = uuid.uuid4().hex[:12]
+        started_at = _utc_now()
+        path = os.path.join(
+            directory, f"{label}-{started_at.replace(':', '')}-{run_id}.jsonl"
+        )
+        _append_line(
+            path,
+            {
+                "type": "begin",
+                "run_id": run_id,
+                "label": label,
+                "owner": owner,
+                "job_id": job_id,
+                "kind": kind,
+                "started_at": started_at,
+                "operations": operations,
+            },
+        )
+        return cls(path)
+
+    def record_result(self, index, result):
+        record = {
+            "type": "result",
+            "index": index,
+            "ok": result["ok"],
+            "id": result.get("id"),
+            "error": result.get("error"),
+            "at": _utc_now(),
+        }
+        if result.get("reconciled"):
+            record["reconciled"] = True
+        with self._lock:
+            _append_line(self.path, record)
+            self.results[index] = record
+
+    def finish(self, discarded=False):
+        """
+        Closes the run; operations that still failed are listed on the end
+        line so the journal keeps them once it is no longer offered.
+        """
+        with self._lock:
+            _append_line(
+                self.path,
+                {
+                    "type": "end",
+                    "at": _utc_now(),
+                    "discarded": discarded,
+                    "failed": [
+                        i
+                        for i in range(len(self.operations))
+                        if not self.results.get(i, {}).get("ok")
+                    ],
+                },
+            )
+            self.ended = True
+
+    def pending_indexes(self):
+        """
+        Operations without a successful result (never sent, in flight when
+        the run died, or failed).
+        """
+        return [
+            i
+            for i in range(len(self.operations))
+            if not self.results.get(i, {}).get("ok")
+        ]
+
+    def summary(self):
+        done = sum(1 for r in self.results.values() if r["ok"])
+        return {
+            "label": self.label,
+            "kind": self.kind,
+            "started_at": self.started_at,
+            "total": len(self.operations),
+            "done": done,
+            "failed": sum(1 for r in self.results.values() if not r["ok"]),
+            "pending": len(self.operations) - done,
+            "created_ids": [
+                r["id"] for r in self.results.values() if r["ok"] and r["id"]
+            ],
+        }
+
+
+def _append_line(path, record):
+    line = json.dumps(record, default=_json_default) + "\n"
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(line)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def find_unfinished(label, owner=None, directory=None):
+    """
+    Returns owner's most recent journal for label that never reached its end
+    line, or None. Journals of background jobs still running are skipped:
+    their run is in progress, not interrupted.
+    """
+    pattern = os.path.join(directory or journal_dir, f"{label}-*.jsonl")
+    for path in sorted(glob.glob(pattern), reverse=True):
+        try:
+            journal = BulkJournal(path)
+        except (OSError, KeyError, ValueError):
+            continue
+        if not journal.run_id or journal.ended or journal.owner != owner:
+            continue
+        job = jobs.get(journal.job_id)
+        if job is not None and not job.finished:
+            continue
+        return journal
+    return None
+
+
+def _reconcile_creates(journal, indexes):
+    """
+    A create that was in flight when the run died may exist in ADO without
+    a result line. Match such operations against children their parent
+    gained since the run started (same type and title) so resuming does not
+    create them twice.
+    Returns the indexes that still need to be sent.
+    """
+    unresolved = [i for i in indexes if i not in journal.results]
+    by_parent = {}
+    for i in unresolved:
+        parent = journal.operations[i][0]
+        if parent and parent.get("ID"):
+            by_parent.setdefault(parent["ID"], []).append(i)
+
+    started = journal.started_at[:19]
+    already_journaled = set(journal.summary()["created_ids"])
+    for parent_id, parent_indexes in by_parent.items():
+        types = sorted({journal.operations[i][2] for i in parent_indexes})
+        child_ids = ado_api.parse_child_link_ids(
+            ado_api.run_wiql(ado_api.child_links_query(parent_id, types))
+        )
+        children = ado_api.get_work_items_batch(
+            child_ids, profile="full", use_cache=False
+        )
+        candidates = [
+            child
+            for child in children
+            if str(child["Created Date"])[:19] >= started
+            and child["ID"] not in already_journaled
+        ]
+        for i in parent_indexes:
+            _, item_data, work_item_type = journal.operations[i]
+            for child in candidates:
+                if (
+                    child["Work Item Type"] == work_item_type
+                    and child["Title"] == (item_data.get("Title") or "")
+                ):
+                    candidates.remove(child)
+                    journal.record_result(
+                        i, {"ok": True, "id": child["ID"], "reconciled": True}
+                    )
+                    break
+    return [i for i in indexes if not journal.results.get(i, {}).get("ok")]
+
+
+@call_metrics.traced
+def run(
+    journal, max_workers=ado_api.batch_max_workers, on_progress=None, resuming=False
+):
+    """
+    Sends the journal's pending operations and records each result as it
+    arrives. Returns one result per operation of the whole run, in order;
+    operations completed by an earlier attempt come back with
+    "resumed": True. The journal is closed once the run completes, failures
+    included; only a run cut short stays open for resume().
+    """
+    pending = journal.pending_indexes()
+    if resuming and pending and journal.kind == "create":
+        pending = _reconcile_creates(journal, pending)
+
+    def on_result(result):
+        journal.record_result(pending[result["index"]], result)
+
+    if journal.kind == "create":
+        ado_api.create_work_items_bulk(
+            [tuple(journal.operations[i]) for i in pending],
+            max_workers=max_workers,
+            on_progress=on_progress,
+            on_result=on_result,
+        )
+    else:
+        ado_api.update_work_items_bulk(
+            [tuple(journal.operations[i]) for i in pending],
+            max_workers=max_workers,
+            on_progress=on_progress,
+            on_result=on_result,
+        )
+
+    pending_set = set(pending)
+    results = []
+    for i in range(len(journal.operations)):
+        record = journal.results.get(
+            i, {"ok": False, "id": None, "error": "No result"}
+        )
+        results.append(
+            {
+                "index": i,
+                "ok": record["ok"],
+                "id": record["id"],
+                "work_item": None,
+                "error": record["error"],
+                "resumed": i not in pending_set,
+            }
+        )
+    journal.finish()
+    return results
+
+
+def resume(journal, max_workers=ado_api.batch_max_workers, on_progress=None):
+    """
+    Continues an interrupted run (see find_unfinished), skipping everything
+    it already completed.
+    """
+    return run(journal, max_workers, on_progress, resuming=True)
+
+
+def create_work_items(
+    label,
+    items,
+    max_workers=ado_api.batch_max_workers,
+    on_progress=None,
+    owner=None,
+    job_id=None,
+):
+    """
+    Journaled ado_api.create_work_items_bulk; label names the kind of run
+    (e.g. "t1_create_tasks") so find_unfinished can offer owner to resume it.
+    """
+    journal = BulkJournal.start(label, "create", items, owner=owner, job_id=job_id)
+    return run(journal, max_workers, on_progress)
+
+
+def update_work_items(
+    label,
+    updates,
+    max_workers=ado_api.batch_max_workers,
+    on_progress=None,
+    owner=None,
+    job_id=None,
+):
+    """
+    Journaled ado_api.update_work_items_bulk (see create_work_items).
+    """
+    journal = BulkJournal.start(label, "update", updates, owner=owner, job_id=job_id)
+    return run(journal, max_workers, on_progress)
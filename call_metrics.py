@@ -0,0 +1,380 @@
+"""
+Latency, payload-size and error metrics for outbound ADO and Spark calls.
+
+ado_api.ADOClient, ado_async and spark_api record one entry per logical call
+(retries included) with the service, endpoint, status, bytes sent/received
+and retry count, tagged with the calling function and Streamlit tab. Tags
+are context variables: set them with tagged() / set_tags() and they follow
+the call into worker threads started by ado_api.run_concurrently.
+"""
+
+import collections
+import contextlib
+import contextvars
+import functools
+import math
+import threading
+import time
+import uuid
+
+# Latency histogram bucket upper bounds, in milliseconds
+LATENCY_BUCKETS_MS = (
+    10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, math.inf
+)
+# Raw latencies kept per series for percentiles
+SAMPLES_PER_SERIES = 1000
+# Individual calls kept for the "slowest recent calls" view
+RECENT_CALLS = 500
+# Script runs tracked at once (one per active Streamlit session, roughly)
+MAX_OPEN_RUNS = 100
+
+_tags = contextvars.ContextVar("call_metrics_tags", default={})
+
+
+def current_tags():
+    return _tags.get()
+
+
+def set_tags(**tags):
+    """
+    Adds tags for the rest of the current context (e.g. the Streamlit tab
+    whose code is running).
+    """
+    _tags.set({**_tags.get(), **tags})
+
+
+@contextlib.contextmanager
+def tagged(**tags):
+    token = _tags.set({**_tags.get(), **tags})
+    try:
+        yield
+    finally:
+        _tags.reset(token)
+
+
+def traced(func):
+    """
+    Tags calls made inside func with function="module.name", unless an
+    outer traced function already did (so get_feature_with_children's
+    fetches are attributed to it, not to get_work_item).
+    """
+    name = f"{func.__module__}.{func.__name__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if "function" in _tags.get():
+            return func(*args, **kwargs)
+        with tagged(function=name):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def body_size(body):
+    if body is None:
+        return 0
+    if isinstance(body, str):
+        return len(body.encode("utf-8"))
+    try:
+        return len(body)
+    except TypeError:
+        return 0
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = int(math.ceil(fraction * len(sorted_values))) - 1
+    return sorted_values[min(max(index, 0), len(sorted_values) - 1)]
+
+
+class _Series:
+    __slots__ = (
+        "calls",
+        "errors",
+        "retries",
+        "items",
+        "sent",
+        "received",
+        "total_seconds",
+        "max_seconds",
+        "statuses",
+        "buckets",
+        "samples",
+    )
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.items = 0
+        self.sent = 0
+        self.received = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.statuses = collections.Counter()
+        self.buckets = [0] * len(LATENCY_BUCKETS_MS)
+        # (seconds, items) per call
+        self.samples = collections.deque(maxlen=SAMPLES_PER_SERIES)
+
+
+class CallMetrics:
+    """
+    Thread-safe in-process metrics store. Series are keyed by
+    (service, function, tab, endpoint).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+        self._recent = collections.deque(maxlen=RECENT_CALLS)
+        # run ID -> {service: seconds}; runs cut short by st.rerun() never
+        # finish, so only the latest few are kept
+        self._runs = collections.OrderedDict()
+
+    def record(
+        self,
+        service,
+        endpoint,
+        seconds,
+        status=None,
+        sent=0,
+        received=0,
+        retries=0,
+        error=None,
+        method=None,
+        items=0,
+    ):
+        """
+        items: work items (or $batch sub-requests) the call carried, so
+        latency_model can tell fixed from per-item cost.
+        """
+        tags = _tags.get()
+        function = tags.get("function", "")
+        tab = tags.get("tab", "")
+        failed = error is not None or (status is not None and status >= 400)
+        bucket = next(
+            i for i, bound in enumerate(LATENCY_BUCKETS_MS) if seconds * 1000 <= bound
+        )
+        with self._lock:
+            series = self._series.get((service, function, tab, endpoint))
+            if series is None:
+                series = self._series[(service, function, tab, endpoint)] = _Series()
+            series.calls += 1
+            series.errors += failed
+            series.retries += retries
+            series.items += items
+            series.sent += sent
+            series.received += received
+            series.total_seconds += seconds
+            series.max_seconds = max(series.max_seconds, seconds)
+            if status is not None or error is not None:
+                series.statuses[status if status is not None else "error"] += 1
+            series.buckets[bucket] += 1
+            series.samples.append((seconds, items))
+            self._recent.append(
+                {
+                    "at": time.time(),
+                    "service": service,
+                    "function": function,
+                    "tab": tab,
+                    "endpoint": f"{method} {endpoint}" if method else endpoint,
+                    "status": status,
+                    "seconds": round(seconds, 3),
+                    "sent": sent,
+                    "received": received,
+                    "retries": retries,
+                    "items": items,
+                    "error": error,
+                }
+            )
+            run_id = tags.get("run")
+            if run_id in self._runs:
+                self._runs[run_id][service] = (
+                    self._runs[run_id].get(service, 0.0) + seconds
+                )
+
+    @contextlib.contextmanager
+    def timed(self, service, endpoint, method=None):
+        """
+        Times the block and records it; the block can fill in the yielded
+        dict's status / sent / received / retries / items. Exceptions are
+        recorded as errors and re-raised.
+        """
+        call = {"status": None, "sent": 0, "received": 0, "retries": 0, "items": 0}
+        started = time.perf_counter()
+        error = None
+        try:
+            yield call
+        except BaseException as e:
+            error = f"{type(e).__name__}: {e}"[:200]
+            raise
+        finally:
+            self.record(
+                service,
+                endpoint,
+                time.perf_counter() - started,
+                status=call["status"],
+                sent=call["sent"],
+                received=call["received"],
+                retries=call["retries"],
+                error=error,
+                method=method,
+                items=call["items"],
+            )
+
+    def start_run(self, **tags):
+        """
+        Marks the start of a Streamlit script run; calls made during it are
+        summed per service so finish_run can split the run's wall time.
+        """
+        run_id = uuid.uuid4().hex[:8]
+        with self._lock:
+            self._runs[run_id] = {}
+            while len(self._runs) > MAX_OPEN_RUNS:
+                self._runs.popitem(last=False)
+        _tags.set({"run": run_id, **tags})
+        return run_id, time.perf_counter()
+
+    def finish_run(self, run):
+        """
+        Records the script run as service "streamlit" and returns
+        {"seconds", "ado", "spark", "other"} for it.
+        """
+        run_id, started = run
+        seconds = time.perf_counter() - started
+        with self._lock:
+            by_service = self._runs.pop(run_id, {})
+        with tagged(function="script run", tab=""):
+            self.record("streamlit", "script run", seconds)
+        # Concurrent calls can add up to more than the run's wall time
+        ado = by_service.get("ado", 0.0)
+        spark = by_service.get("spark", 0.0)
+        return {
+            "seconds": round(seconds, 3),
+            "ado": round(ado, 3),
+            "spark": round(spark, 3),
+            "other": round(max(seconds - ado - spark, 0.0), 3),
+        }
+
+    def summary(self, group_by=("service", "function")):
+        """
+        One row per group with call, error, retry and byte totals and
+        p50/p95/p99/max latency in milliseconds, slowest p95 first.
+        group_by: any of "service", "function", "tab", "endpoint".
+        """
+        fields = ("service", "function", "tab", "endpoint")
+        groups = {}
+        with self._lock:
+            for key, series in self._series.items():
+                tags = dict(zip(fields, key))
+                group = tuple(tags[name] for name in group_by)
+                groups.setdefault(group, []).append(series)
+
+            rows = []
+            for group, members in groups.items():
+                samples = sorted(
+                    seconds for series in members for seconds, _ in series.samples
+                )
+                statuses = collections.Counter()
+                for series in members:
+                    statuses.update(series.statuses)
+                calls = sum(series.calls for series in members)
+                row = dict(zip(group_by, group))
+                row.update(
+                    {
+                        "calls": calls,
+                        "errors": sum(series.errors for series in members),
+                        "retries": sum(series.retries for series in members),
+                        "p50_ms": _ms(_percentile(samples, 0.50)),
+                        "p95_ms": _ms(_percentile(samples, 0.95)),
+                        "p99_ms": _ms(_percentile(samples, 0.99)),
+                        "max_ms": _ms(max(s.max_seconds for s in members)),
+                        "total_s": round(sum(s.total_seconds for s in members), 2),
+                        "sent_kb": round(sum(s.sent for s in members) / 1024, 1),
+                        "received_kb": round(
+                            sum(s.received for s in members) / 1024, 1
+                        ),
+                        "statuses": ", ".join(
+                            f"{status}: {count}"
+                            for status, count in sorted(
+                                statuses.items(), key=lambda kv: str(kv[0])
+                            )
+                        ),
+                    }
+                )
+                rows.append(row)
+        rows.sort(key=lambda row: row["p95_ms"] or 0, reverse=True)
+        return rows
+
+    def histogram(self, service=None):
+        """
+        Call counts per latency bucket, as [(upper bound label, count)].
+        """
+        counts = [0] * len(LATENCY_BUCKETS_MS)
+        with self._lock:
+            for key, series in self._series.items():
+                if service is None or key[0] == service:
+                    counts = [a + b for a, b in zip(counts, series.buckets)]
+        labels = [
+            f"<= {bound:g} ms" if bound != math.inf else "> 60000 ms"
+            for bound in LATENCY_BUCKETS_MS
+        ]
+        return list(zip(labels, counts))
+
+    def latency_model(self, endpoint, service="ado"):
+        """
+        Fits seconds = fixed + per_item * items (least squares) over the
+        recent calls to endpoint, throttle waits included. Returns (fixed,
+        per_item, samples), or None when nothing has been measured yet.
+        """
+        with self._lock:
+            samples = [
+                sample
+                for key, series in self._series.items()
+                if key[0] == service and key[3] == endpoint
+                for sample in series.samples
+            ]
+        if not samples:
+            return None
+        count = len(samples)
+        mean_items = sum(items for _, items in samples) / count
+        mean_seconds = sum(seconds for seconds, _ in samples) / count
+        spread = sum((items - mean_items) ** 2 for _, items in samples)
+        if spread == 0:
+            # Every call carried the same number of items
+            if mean_items:
+                return 0.0, mean_seconds / mean_items, count
+            return mean_seconds, 0.0, count
+        per_item = (
+            sum(
+                (items - mean_items) * (seconds - mean_seconds)
+                for seconds, items in samples
+            )
+            / spread
+        )
+        per_item = max(per_item, 0.0)
+        fixed = max(mean_seconds - per_item * mean_items, 0.0)
+        return fixed, per_item, count
+
+    def slowest(self, limit=10, service=None):
+        with self._lock:
+            calls = [
+                call
+                for call in self._recent
+                if service is None or call["service"] == service
+            ]
+        return sorted(calls, key=lambda call: call["seconds"], reverse=True)[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+            self._recent.clear()
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+# Process-wide store shared by every client and Streamlit session
+metrics = CallMetrics()
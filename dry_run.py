@@ -0,0 +1,277 @@
+"""
+Dry runs for the bulk create / update buttons.
+
+Builds the exact JSON Patch documents the real run would send, validates
+them locally and predicts the API calls, $batch chunks and wall time the
+real run needs, from the latencies call_metrics has measured in this process
+(or rough ADO defaults before anything was measured). Nothing is sent, so a
+dry run of thousands of items is instant and doubles as a capacity plan.
+"""
+
+import json
+import math
+
+import ado_api
+import call_metrics
+import replicator
+
+# (fixed seconds per call, seconds per item / sub-request) used until
+# call_metrics has measured the endpoint
+DEFAULT_LATENCY = {
+    "wit/$batch": (0.5, 0.15),
+    "wit/workitems/${type}": (0.6, 0.0),
+    "wit/workitems/{id}": (0.4, 0.0),
+}
+
+TITLE_MAX_LENGTH = 255
+NUMERIC_FIELDS = (
+    "Microsoft.VSTS.Scheduling.StoryPoints",
+    "Microsoft.VSTS.Scheduling.OriginalEstimate",
+    "Microsoft.VSTS.Scheduling.RemainingWork",
+    "Microsoft.VSTS.Common.StackRank",
+    "Microsoft.VSTS.Common.BacklogPriority",
+)
+PATCH_OPS = ("add", "replace", "remove", "test")
+
+
+def latency_model(endpoint):
+    """
+    Returns (fixed seconds, seconds per item, "measured" or "default").
+    """
+    measured = call_metrics.metrics.latency_model(endpoint)
+    if measured:
+        return measured[0], measured[1], "measured"
+    fixed, per_item = DEFAULT_LATENCY[endpoint]
+    return fixed, per_item, "default"
+
+
+def load_iteration_tree():
+    # Path checks are skipped when the tree cannot be loaded
+    try:
+        return ado_api.get_iteration_tree()
+    except Exception:
+        return None
+
+
+def _is_number(value):
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, (int, float)):
+        return not math.isnan(value)
+    try:
+        float(str(value))
+        return True
+    except ValueError:
+        return False
+
+
+def validate_patch_document(patch_document, creating=True, iteration_tree=None):
+    """
+    Checks a JSON Patch document the way ADO would reject it and returns
+    the problems found as messages (an empty list means it looks valid).
+    """
+    issues = []
+    fields = {}
+    for op in patch_document:
+        path = op.get("path", "")
+        if op.get("op") not in PATCH_OPS:
+            issues.append(f"Unknown patch op '{op.get('op')}' for {path}")
+        if path.startswith("/fields/"):
+            fields[path[len("/fields/") :]] = op.get("value")
+        elif path.startswith("/relations/"):
+            relation = op.get("value") or {}
+            if not relation.get("rel") or not relation.get("url"):
+                issues.append("Relation without rel/url")
+        else:
+            issues.append(f"Unsupported patch path '{path}'")
+        try:
+            json.dumps(op.get("value"), allow_nan=False)
+        except (TypeError, ValueError):
+            issues.append(f"{path} is not a valid JSON value")
+
+    title = fields.get("System.Title")
+    if creating and ado_api.is_missing_value(title):
+        issues.append("Title is required")
+    elif title is not None and len(str(title)) > TITLE_MAX_LENGTH:
+        issues.append(f"Title is longer than {TITLE_MAX_LENGTH} characters")
+
+    for field in NUMERIC_FIELDS:
+        value = fields.get(field)
+        if value is None or value == "":
+            continue
+        if not _is_number(value):
+            issues.append(f"{field} must be a number (got {value!r})")
+        elif float(value) < 0:
+            issues.append(f"{field} cannot be negative")
+
+    area_path = fields.get("System.AreaPath")
+    if area_path and not (
+        str(area_path).lower() == ado_api.project.lower()
+        or str(area_path).lower().startswith(ado_api.project.lower() + "\\")
+    ):
+        issues.append(f"Area Path '{area_path}' is not in project {ado_api.project}")
+    iteration_path = fields.get("System.IterationPath")
+    if iteration_path and iteration_tree is not None:
+        if iteration_tree.get(str(iteration_path)) is None:
+            issues.append(f"Iteration Path '{iteration_path}' does not exist")
+    return issues
+
+
+def _operation(index, work_item_type, title, patch_document, creating, tree):
+    return {
+        "index": index,
+        "work_item_type": work_item_type,
+        "title": title,
+        "patch": patch_document,
+        "issues": validate_patch_document(patch_document, creating, tree),
+    }
+
+
+def _batch_seconds(batch_sizes, max_workers):
+    # Batches run max_workers at a time; each wave lasts as long as its largest
+    fixed, per_item, source = latency_model("wit/$batch")
+    seconds = 0.0
+    for wave in ado_api.chunked(sorted(batch_sizes, reverse=True), max(max_workers, 1)):
+        seconds += fixed + per_item * max(wave)
+    return seconds, source
+
+
+def _plan(operations, api_calls, batches, seconds, latency):
+    invalid = sum(1 for op in operations if op["issues"])
+    return {
+        "operations": operations,
+        "valid": len(operations) - invalid,
+        "invalid": invalid,
+        "api_calls": api_calls,
+        "batches": batches,
+        "estimated_seconds": round(seconds, 1),
+        "latency": latency,
+    }
+
+
+def simulate_creates(items, max_workers=ado_api.batch_max_workers, check_paths=True):
+    """
+    Dry run of create_work_items_bulk(items): items are the same
+    (parent_work_item, item_data, work_item_type) tuples.
+    Returns {"operations", "valid", "invalid", "api_calls", "batches",
+    "estimated_seconds", "latency"}; each operation holds its index, type,
+    title, patch document and validation issues.
+    """
+    tree = load_iteration_tree() if check_paths else None
+    operations = [
+        _operation(
+            i,
+            work_item_type,
+            item_data.get("Title") or "",
+            ado_api.build_create_patch_document(parent, item_data, work_item_type),
+            True,
+            tree,
+        )
+        for i, (parent, item_data, work_item_type) in enumerate(items)
+    ]
+    batch_sizes = [
+        len(chunk) for chunk in ado_api.chunked(operations, ado_api.batch_request_limit)
+    ]
+    seconds, latency = _batch_seconds(batch_sizes, max_workers)
+    return _plan(operations, len(batch_sizes), len(batch_sizes), seconds, latency)
+
+
+def simulate_updates(updates, bulk=True, max_workers=ado_api.batch_max_workers):
+    """
+    Dry run of update_work_items_bulk(updates) or, with bulk=False, of one
+    update_work_item call per entry in turn (see simulate_creates).
+    """
+    operations = [
+        _operation(
+            i,
+            None,
+            str(work_item_id),
+            ado_api.build_update_patch_document(fields),
+            False,
+            None,
+        )
+        for i, (work_item_id, fields) in enumerate(updates)
+    ]
+    if bulk:
+        batch_sizes = [
+            len(chunk)
+            for chunk in ado_api.chunked(operations, ado_api.batch_request_limit)
+        ]
+        seconds, latency = _batch_seconds(batch_sizes, max_workers)
+        return _plan(operations, len(batch_sizes), len(batch_sizes), seconds, latency)
+    fixed, per_item, latency = latency_model("wit/workitems/{id}")
+    seconds = len(operations) * (fixed + per_item)
+    return _plan(operations, len(operations), 0, seconds, latency)
+
+
+def simulate_replication(
+    source_story,
+    source_tasks,
+    parent,
+    targets,
+    max_workers=ado_api.batch_max_workers,
+    check_paths=True,
+):
+    """
+    Dry run of replicator.replicate_story: per sprint, one story create and
+    then its tasks in $batch calls, max_workers sprints at a time.
+    Task patch documents link to a placeholder URL for the story the real
+    run creates first. A missing parent is an issue on every story.
+    """
+    tree = load_iteration_tree() if check_paths else None
+    plan = replicator.build_replication_plan(source_story, source_tasks, targets)
+    story_fixed, story_per_item, story_latency = latency_model(
+        "wit/workitems/${type}"
+    )
+    batch_latency = latency_model("wit/$batch")[2]
+    operations = []
+    api_calls = 0
+    batches = 0
+    unit_seconds = []
+    for unit in plan:
+        story_operation = _operation(
+            len(operations),
+            "User Story",
+            unit["story"]["Title"],
+            ado_api.build_create_patch_document(parent, unit["story"], "User Story"),
+            True,
+            tree,
+        )
+        # replicate_story refuses to run without one
+        if not parent:
+            story_operation["issues"].append("No Parent Feature to attach to")
+        operations.append(story_operation)
+        new_story = {
+            "url": f"(new story in {unit['sprint']})",
+            "Area Path": unit["story"]["Area Path"],
+            "Iteration Path": unit["path"],
+            "CMDB App Name": unit["story"].get("CMDB App Name"),
+        }
+        for task_data in unit["tasks"]:
+            operations.append(
+                _operation(
+                    len(operations),
+                    "Task",
+                    task_data["Title"],
+                    ado_api.build_create_patch_document(new_story, task_data, "Task"),
+                    True,
+                    tree,
+                )
+            )
+        # replicate_unit sends a sprint's task batches one after another
+        task_batches = [
+            len(chunk)
+            for chunk in ado_api.chunked(unit["tasks"], ado_api.batch_request_limit)
+        ]
+        seconds, _ = _batch_seconds(task_batches, 1)
+        unit_seconds.append(story_fixed + story_per_item + seconds)
+        api_calls += 1 + len(task_batches)
+        batches += len(task_batches)
+
+    total = sum(
+        max(wave) for wave in ado_api.chunked(unit_seconds, max(max_workers, 1))
+    )
+    latency = (
+        story_latency if story_latency == batch_latency else "partly measured"
+    )
+    return _plan(operations, api_calls, batches, total, latency)
@@ -8,9 +8,10 @@ load_dotenv()
 pat_token = os.getenv("ADO_PAT_TOKEN")
 organization = "spglobal"
 project = "Platts"
+base_url = os.getenv("ADO_BASE_URL") or "https://dev.azure.com"
 work_item_id = "9988957"
 
-url = f"https://dev.azure.com/{organization}/{project}/_apis/wit/workitems/{work_item_id}?api-version=6.0"
+url = f"{base_url}/{organization}/{project}/_apis/wit/workitems/{work_item_id}?api-version=6.0"
 response = requests.get(url, auth=HTTPBasicAuth("", pat_token))
 
 if response.status_code == 200:
@@ -0,0 +1,285 @@
+"""
+Background jobs for long bulk operations.
+
+Streamlit reruns the whole script on every widget interaction, which aborts
+work done inline in a tab. submit() runs such work on a process-wide thread
+pool instead: a job outlives reruns, reports progress that the tab polls
+from a fragment, stops at its next check once cancelled and keeps its
+result until the tab collects it. Status and progress are also written to
+ADO_JOB_DIR, so a job cut short by a server restart is listed as
+interrupted instead of vanishing.
+
+Job functions run outside the Streamlit script thread and must not call
+st.*; they take the Job as their first argument to report progress.
+"""
+
+import contextvars
+import datetime
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import ado_api
+
+job_dir = ado_api.get_env("ADO_JOB_DIR", required=False, default=".ado_cache/jobs")
+max_workers = int(ado_api.get_env("ADO_JOB_MAX_WORKERS", required=False, default="4"))
+
+# Finished jobs kept for result retrieval; older ones are dropped first
+MAX_FINISHED_JOBS = 50
+# Progress is written to the status file at most this often, in seconds
+PERSIST_INTERVAL = 1.0
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+INTERRUPTED = "interrupted"
+FINISHED = (DONE, FAILED, CANCELLED, INTERRUPTED)
+
+
+class JobCancelled(Exception):
+    """
+    Raised by Job.check_cancelled to stop a job early.
+    """
+
+
+def _utc_now():
+    return datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class Job:
+    """
+    One background job. label says what it runs (e.g. "t1_generate_tasks").
+    progress() and check_cancelled() are for the job function; the rest is
+    read by the tabs.
+    """
+
+    def __init__(self, label, job_id=None):
+        self.id = job_id or uuid.uuid4().hex[:12]
+        self.label = label
+        self.status = QUEUED
+        self.done = 0
+        self.total = None
+        self.message = ""
+        self.result = None
+        self.error = None
+        self.created_at = _utc_now()
+        self.started_at = None
+        self.finished_at = None
+        # Set once a tab has taken the result; until then forget() would lose it
+        self.collected = False
+        self._cancel = threading.Event()
+        self._future = None
+        self._lock = threading.Lock()
+        self._persisted_at = 0.0
+
+    @property
+    def finished(self):
+        return self.status in FINISHED
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    @property
+    def fraction(self):
+        if not self.total:
+            return 1.0 if self.finished else 0.0
+        return min(self.done / self.total, 1.0)
+
+    def progress(self, done, total=None, message=None):
+        with self._lock:
+            self.done = done
+            if total is not None:
+                self.total = total
+            if message is not None:
+                self.message = message
+        self._persist()
+
+    def check_cancelled(self):
+        if self.cancelled:
+            raise JobCancelled(f"Job {self.id} cancelled")
+
+    def cancel(self):
+        """
+        Asks the job to stop; a queued job never starts, a running one stops
+        at its next check.
+        """
+        self._cancel.set()
+        if self._future is not None and self._future.cancel():
+            self._finish(CANCELLED)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "id": self.id,
+                "label": self.label,
+                "status": self.status,
+                "done": self.done,
+                "total": self.total,
+                "message": self.message,
+                "error": self.error,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        job = cls(snapshot["label"], snapshot["id"])
+        for key in ("done", "total", "message", "error", "created_at", "started_at"):
+            setattr(job, key, snapshot.get(key))
+        job.status = snapshot["status"]
+        job.finished_at = snapshot.get("finished_at")
+        # Its result died with its process, so no tab is waiting for it
+        job.collected = True
+        if not job.finished:
+            # Its process is gone, so nothing will ever finish it
+            job.status = INTERRUPTED
+        return job
+
+    def _start(self):
+        with self._lock:
+            self.status = RUNNING
+            self.started_at = _utc_now()
+        self._persist(force=True)
+
+    def _finish(self, status, result=None, error=None):
+        with self._lock:
+            if self.finished:
+                return
+            self.status = status
+            self.result = result
+            self.error = error
+            self.finished_at = _utc_now()
+        self._persist(force=True)
+
+    def _persist(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._persisted_at < PERSIST_INTERVAL:
+            return
+        self._persisted_at = now
+        snapshot = self.snapshot()
+        try:
+            os.makedirs(job_dir, exist_ok=True)
+            path = os.path.join(job_dir, f"{self.id}.json")
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(snapshot, f)
+            os.replace(path + ".tmp", path)
+        except OSError:
+            # The in-memory status is what the tabs poll; the file is a record
+            pass
+
+
+_jobs = OrderedDict()
+_lock = threading.Lock()
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="job"
+            )
+        return _executor
+
+
+def _run(job, func, args, kwargs):
+    if job.cancelled:
+        job._finish(CANCELLED)
+        return
+    job._start()
+    try:
+        result = func(job, *args, **kwargs)
+    except JobCancelled:
+        job._finish(CANCELLED)
+    except Exception as e:
+        job._finish(FAILED, error=str(e) or type(e).__name__)
+    else:
+        # A job that stopped early on request still returns what it did
+        job._finish(CANCELLED if job.cancelled else DONE, result=result)
+
+
+def submit(label, func, *args, **kwargs):
+    """
+    Runs func(job, *args, **kwargs) in the background and returns its Job
+    right away. Calls it makes keep the caller's call_metrics tags.
+    """
+    job = Job(label)
+    with _lock:
+        _jobs[job.id] = job
+        finished = [j for j in _jobs.values() if j.finished]
+        for old in finished[: max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+            del _jobs[old.id]
+    job._persist(force=True)
+    job._future = _get_executor().submit(
+        contextvars.copy_context().run, _run, job, func, args, kwargs
+    )
+    return job
+
+
+def get(job_id):
+    """
+    The job with job_id: live if this process runs or ran it, otherwise
+    rebuilt from its status file (without its result). None if unknown.
+    """
+    if not job_id:
+        return None
+    with _lock:
+        job = _jobs.get(job_id)
+    if job is not None:
+        return job
+    try:
+        with open(os.path.join(job_dir, f"{job_id}.json"), encoding="utf-8") as f:
+            return Job.from_snapshot(json.load(f))
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def list_jobs():
+    """
+    Every known job, newest first: this process's jobs plus those recorded
+    on disk by earlier ones.
+    """
+    with _lock:
+        jobs = {job.id: job for job in _jobs.values()}
+    for path in glob.glob(os.path.join(job_dir, "*.json")):
+        job_id = os.path.basename(path)[: -len(".json")]
+        if job_id not in jobs:
+            job = get(job_id)
+            if job is not None:
+                jobs[job_id] = job
+    return sorted(jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+
+def forget(job_id):
+    """
+    Drops a finished job and its status file once its result was collected.
+    """
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is not None and not job.finished:
+            return
+        _jobs.pop(job_id, None)
+    try:
+        os.remove(os.path.join(job_dir, f"{job_id}.json"))
+    except OSError:
+        pass
+
+
+def clear_finished():
+    """
+    Forgets every finished job whose result was collected, leaving those a
+    tab has yet to poll.
+    """
+    for job in list_jobs():
+        if job.finished and job.collected:
+            forget(job.id)
@@ -0,0 +1,1048 @@
+"""
+Local stand-in for the Azure DevOps REST endpoints ado_api uses.
+
+Serves a generated Feature > User Story/Bug > Task backlog over plain HTTP so
+throughput and latency changes to the client can be measured reproducibly
+without touching dev.azure.com. Latency, 429 throttling and ADO's 200-ID /
+200-sub-request limits are configurable.
+
+Endpoints: workitems/{id} (GET, PATCH, DELETE), workitems/${type} (POST),
+workitems?ids=, $batch, wiql (ad-hoc and saved queries),
+classificationnodes/Iterations and reporting/workitemrevisions.
+GET /_mock/stats returns request counters; POST /_mock/reset clears them.
+
+Usage:
+    python mock_ado_server.py --items 5000 --latency-ms 80 --throttle-rate 0.02
+    ADO_BASE_URL=http://127.0.0.1:8765 ADO_PAT_TOKEN=mock streamlit run webapp.py
+
+Or in-process from a benchmark:
+    with MockADOServer(MockDataset.generate(items=2000), latency_ms=50) as server:
+        ado_api.base_url = server.url
+"""
+
+import argparse
+import datetime
+import json
+import math
+import random
+import re
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+HIERARCHY_FORWARD = "System.LinkTypes.Hierarchy-Forward"
+HIERARCHY_REVERSE = "System.LinkTypes.Hierarchy-Reverse"
+
+# ADO's limits for workitems?ids= and $batch
+ID_LIMIT = 200
+BATCH_LIMIT = 200
+
+# Generated values
+PEOPLE = [
+    ("Ana Lima", "ana.lima@example.com"),
+    ("Ben Okafor", "ben.okafor@example.com"),
+    ("Chen Wei", "chen.wei@example.com"),
+    ("Dana Kowalski", "dana.kowalski@example.com"),
+    ("Eli Haddad", "eli.haddad@example.com"),
+]
+CMDB_APPS = ["PRICING ENGINE - PE", "MARKET DATA HUB - MDH", "CI INFORMATION HUB"]
+ACTIVITIES = ["Development", "Testing", "Design", "Documentation"]
+
+DEFAULT_SAVED_QUERY = (
+    "SELECT [System.Id] FROM WorkItems WHERE [System.WorkItemType] = 'User Story' "
+    "AND [System.State] <> 'Removed' ORDER BY [System.Id]"
+)
+
+
+def _iso(moment):
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+def _utc_now():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def _identity(person):
+    name, email = person
+    return {"displayName": name, "uniqueName": email, "id": email}
+
+
+class MockDataset:
+    """
+    In-memory work items, links, iterations and change log for the mock.
+    Items are stored as {"id", "rev", "fields"}; parent/child links are kept
+    separately and rendered as relations on request.
+    """
+
+    def __init__(self, organization="spglobal", project="Platts"):
+        self.organization = organization
+        self.project = project
+        self.base_url = "http://127.0.0.1"
+        self.items = {}
+        self.parent = {}  # child ID -> parent ID
+        self.children = {}  # parent ID -> [child IDs]
+        self.iterations = {"name": project, "id": 1, "children": []}
+        self.saved_query = DEFAULT_SAVED_QUERY
+        # Every create/update appends the item ID, for the revisions feed
+        self.changes = []
+        self.next_id = 100000
+        self.lock = threading.RLock()
+
+    @classmethod
+    def generate(
+        cls,
+        items=2000,
+        seed=1,
+        organization="spglobal",
+        project="Platts",
+        stories_per_feature=8,
+        tasks_per_story=4,
+    ):
+        """
+        Builds a reproducible backlog of about `items` work items: Features
+        with Stories (one in eight a Bug) and their Tasks, spread over a
+        dated Cycle > Sprint iteration tree.
+        """
+        dataset = cls(organization, project)
+        rng = random.Random(seed)
+        sprints = dataset._generate_iterations()
+        area_path = f"{project}\\Scrum"
+        base = datetime.datetime(2026, 1, 5, tzinfo=datetime.timezone.utc)
+
+        def fields(work_item_type, title, iteration_path, state):
+            created = base + datetime.timedelta(minutes=rng.randrange(60 * 24 * 120))
+            changed = created + datetime.timedelta(minutes=rng.randrange(60 * 24 * 30))
+            creator = _identity(rng.choice(PEOPLE))
+            values = {
+                "System.WorkItemType": work_item_type,
+                "System.Title": title,
+                "System.State": state,
+                "System.AreaPath": area_path,
+                "System.IterationPath": iteration_path,
+                "System.TeamProject": project,
+                "System.CreatedBy": creator,
+                "System.CreatedDate": _iso(created),
+                "System.ChangedBy": creator,
+                "System.ChangedDate": _iso(changed),
+                "System.Description": f"<div>{title} description.</div>",
+                "System.Tags": rng.choice(["", "backend", "ui; backend", "data"]),
+                "Custom.CMDBAppName": rng.choice(CMDB_APPS),
+            }
+            if rng.random() < 0.8:
+                values["System.AssignedTo"] = _identity(rng.choice(PEOPLE))
+            return values
+
+        def state():
+            return rng.choices(
+                ["New", "Active", "Resolved", "Closed", "Removed"], [4, 4, 2, 2, 1]
+            )[0]
+
+        feature_number = 0
+        while len(dataset.items) < items:
+            feature_number += 1
+            cycle = rng.choice(sprints)[0]
+            feature_id = dataset._add(
+                fields("Feature", f"Feature {feature_number}", cycle, state())
+            )
+            rank = 0.0
+            for story_number in range(1, stories_per_feature + 1):
+                if len(dataset.items) >= items:
+                    break
+                sprint = rng.choice([p for c, p in sprints if c == cycle])
+                is_bug = story_number % 8 == 0
+                work_item_type = "Bug" if is_bug else "User Story"
+                values = fields(
+                    work_item_type,
+                    f"{work_item_type} {feature_number}.{story_number}",
+                    sprint,
+                    state(),
+                )
+                rank += rng.randrange(1, 4) * 1000.0
+                values["Microsoft.VSTS.Common.StackRank"] = rank
+                values["Microsoft.VSTS.Scheduling.StoryPoints"] = rng.choice(
+                    [1, 2, 3, 5, 8]
+                )
+                values["Microsoft.VSTS.Common.AcceptanceCriteria"] = (
+                    "<ul><li>Works as described</li></ul>"
+                )
+                if is_bug:
+                    values["Custom.FoundbyTestCase"] = rng.choice(["YES", "NO"])
+                    values["Custom.IdentifiedBy"] = "User Reported"
+                story_id = dataset._add(values, feature_id)
+                for task_number in range(1, tasks_per_story + 1):
+                    if len(dataset.items) >= items:
+                        break
+                    values = fields(
+                        "Task",
+                        f"Task {feature_number}.{story_number}.{task_number}",
+                        sprint,
+                        rng.choice(["New", "Active", "Closed"]),
+                    )
+                    estimate = float(rng.choice([1, 2, 4, 8]))
+                    values["Microsoft.VSTS.Scheduling.OriginalEstimate"] = estimate
+                    values["Microsoft.VSTS.Scheduling.RemainingWork"] = estimate
+                    values["Microsoft.VSTS.Common.Activity"] = rng.choice(ACTIVITIES)
+                    dataset._add(values, story_id)
+        return dataset
+
+    def _generate_iterations(self, cycles=4, sprints_per_cycle=5):
+        # Project > Scrum > 26.01 .. 26.04 > Sprint 1 .. Sprint 5, two weeks each
+        scrum = {"name": "Scrum", "id": 2, "children": []}
+        self.iterations["children"].append(scrum)
+        start = datetime.date(2026, 1, 5)
+        node_id = 10
+        paths = []
+        for cycle in range(1, cycles + 1):
+            cycle_name = f"26.{cycle:02d}"
+            cycle_start = start
+            cycle_node = {"name": cycle_name, "id": node_id, "children": []}
+            node_id += 1
+            for sprint in range(1, sprints_per_cycle + 1):
+                finish = start + datetime.timedelta(days=13)
+                cycle_node["children"].append(
+                    {
+                        "name": f"Sprint {sprint}",
+                        "id": node_id,
+                        "attributes": {
+                            "startDate": f"{start.isoformat()}T00:00:00Z",
+                            "finishDate": f"{finish.isoformat()}T00:00:00Z",
+                        },
+                    }
+                )
+                node_id += 1
+                paths.append(
+                    (
+                        f"{self.project}\\Scrum\\{cycle_name}",
+                        f"{self.project}\\Scrum\\{cycle_name}\\Sprint {sprint}",
+                    )
+                )
+                start = finish + datetime.timedelta(days=1)
+            cycle_finish = start - datetime.timedelta(days=1)
+            cycle_node["attributes"] = {
+                "startDate": f"{cycle_start.isoformat()}T00:00:00Z",
+                "finishDate": f"{cycle_finish.isoformat()}T00:00:00Z",
+            }
+            scrum["children"].append(cycle_node)
+        return paths
+
+    def _add(self, fields, parent_id=None):
+        work_item_id = self.next_id
+        self.next_id += 1
+        fields["System.Id"] = work_item_id
+        fields["System.Rev"] = 1
+        self.items[work_item_id] = {"id": work_item_id, "rev": 1, "fields": fields}
+        if parent_id is not None:
+            self._link(parent_id, work_item_id)
+        self.changes.append(work_item_id)
+        return work_item_id
+
+    def _link(self, parent_id, child_id):
+        self.parent[child_id] = parent_id
+        self.children.setdefault(parent_id, []).append(child_id)
+
+    # --- Rendering ---
+
+    def api_url(self, work_item_id):
+        return f"{self.base_url}/{self.organization}/_apis/wit/workItems/{work_item_id}"
+
+    def payload(self, work_item_id, fields=None, expand=None):
+        """
+        The REST representation of one item. Like ADO, _links is only
+        returned when fields are not projected.
+        """
+        item = self.items[work_item_id]
+        if fields:
+            values = {f: item["fields"][f] for f in fields if f in item["fields"]}
+        else:
+            values = dict(item["fields"])
+        body = {
+            "id": work_item_id,
+            "rev": item["rev"],
+            "fields": values,
+            "url": self.api_url(work_item_id),
+        }
+        if expand in ("relations", "all"):
+            relations = []
+            if work_item_id in self.parent:
+                relations.append(
+                    {
+                        "rel": HIERARCHY_REVERSE,
+                        "url": self.api_url(self.parent[work_item_id]),
+                        "attributes": {"isLocked": False, "name": "Parent"},
+                    }
+                )
+            for child_id in self.children.get(work_item_id, []):
+                relations.append(
+                    {
+                        "rel": HIERARCHY_FORWARD,
+                        "url": self.api_url(child_id),
+                        "attributes": {"isLocked": False, "name": "Child"},
+                    }
+                )
+            body["relations"] = relations
+        if not fields:
+            body["_links"] = {
+                "html": {
+                    "href": f"{self.base_url}/{self.organization}/{self.project}"
+                    f"/_workitems/edit/{work_item_id}"
+                }
+            }
+        return body
+
+    # --- Mutations ---
+
+    def apply_patch(self, work_item_id, patch_document):
+        """
+        Applies a JSON Patch document (fields and parent relations) to an
+        item and bumps its Rev.
+        """
+        item = self.items[work_item_id]
+        self._apply_ops(work_item_id, patch_document)
+        item["rev"] += 1
+        item["fields"]["System.Rev"] = item["rev"]
+        item["fields"]["System.ChangedDate"] = _iso(_utc_now())
+        self.changes.append(work_item_id)
+
+    def _apply_ops(self, work_item_id, patch_document):
+        item = self.items[work_item_id]
+        for op in patch_document:
+            path = op.get("path", "")
+            if path.startswith("/fields/"):
+                field = path[len("/fields/") :]
+                if op.get("op") == "remove":
+                    item["fields"].pop(field, None)
+                elif field in ("System.AssignedTo", "System.ChangedBy"):
+                    item["fields"][field] = _identity_from_value(op.get("value"))
+                else:
+                    item["fields"][field] = op.get("value")
+            elif path.startswith("/relations") and op.get("op") == "add":
+                relation = op.get("value") or {}
+                if relation.get("rel") == HIERARCHY_REVERSE:
+                    parent_id = _id_from_url(relation.get("url"))
+                    if parent_id not in self.items:
+                        raise MockError(400, f"Parent work item {parent_id} not found")
+                    self._link(parent_id, work_item_id)
+
+    def create(self, work_item_type, patch_document):
+        now = _iso(_utc_now())
+        work_item_id = self._add(
+            {
+                "System.WorkItemType": work_item_type,
+                "System.State": "New",
+                "System.TeamProject": self.project,
+                "System.CreatedDate": now,
+                "System.ChangedDate": now,
+            }
+        )
+        try:
+            self._apply_ops(work_item_id, patch_document)
+        except MockError:
+            self.delete(work_item_id)
+            raise
+        return work_item_id
+
+    def delete(self, work_item_id):
+        del self.items[work_item_id]
+        parent_id = self.parent.pop(work_item_id, None)
+        if parent_id is not None:
+            self.children[parent_id].remove(work_item_id)
+        for child_id in self.children.pop(work_item_id, []):
+            self.parent.pop(child_id, None)
+
+    # --- Iterations ---
+
+    def iteration_node(self, relative_path="", depth=0):
+        node = self.iterations
+        for name in [p for p in relative_path.split("/") if p]:
+            matches = [
+                child
+                for child in node.get("children", [])
+                if child["name"].lower() == name.lower()
+            ]
+            if not matches:
+                return None
+            node = matches[0]
+        return _trim_tree(node, depth)
+
+
+def _trim_tree(node, depth):
+    trimmed = {k: v for k, v in node.items() if k != "children"}
+    trimmed["hasChildren"] = bool(node.get("children"))
+    if depth > 0 and node.get("children"):
+        trimmed["children"] = [_trim_tree(c, depth - 1) for c in node["children"]]
+    return trimmed
+
+
+def _identity_from_value(value):
+    # Patches send "Name <email>" or a bare name/email string
+    if isinstance(value, dict) or not value:
+        return value
+    match = re.match(r"^(.*?)\s*<([^>]+)>$", str(value))
+    if match:
+        return {"displayName": match.group(1), "uniqueName": match.group(2)}
+    return {"displayName": str(value), "uniqueName": str(value)}
+
+
+def _id_from_url(url):
+    try:
+        return int(str(url).rstrip("/").rsplit("/", 1)[-1])
+    except ValueError:
+        return None
+
+
+class MockError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# --- WIQL ---
+
+_WIQL_RE = re.compile(
+    r"^\s*SELECT\s+.+?\s+FROM\s+(\w+)"
+    r"(?:\s+WHERE\s+(.+?))?"
+    r"(?:\s+ORDER\s+BY\s+(.+?))?"
+    r"(?:\s+MODE\s*\(\s*(\w+)\s*\))?\s*$",
+    re.IGNORECASE | re.DOTALL,
+)
+_CLAUSE_RE = re.compile(
+    r"^\s*(?:\[(Source|Target)\]\.)?\[([^\]]+)\]\s*"
+    r"(NOT\s+IN|IN|NOT\s+UNDER|UNDER|<>|>=|<=|=|>|<)\s*(.+?)\s*$",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+def _split_top_level(text, separator_re):
+    """
+    Splits text on separator_re outside quotes and parentheses.
+    """
+    parts = []
+    depth = 0
+    in_quote = False
+    start = 0
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if ch == "'":
+            in_quote = not in_quote
+        elif not in_quote and ch == "(":
+            depth += 1
+        elif not in_quote and ch == ")":
+            depth -= 1
+        elif not in_quote and depth == 0:
+            match = separator_re.match(text, i)
+            if match:
+                parts.append(text[start:i])
+                start = i = match.end()
+                continue
+        i += 1
+    parts.append(text[start:])
+    return [p.strip() for p in parts if p.strip()]
+
+
+_AND_RE = re.compile(r"\s+AND\s+", re.IGNORECASE)
+_COMMA_RE = re.compile(r"\s*,\s*")
+
+
+def _parse_literal(text, project):
+    text = text.strip()
+    if text.startswith("'") and text.endswith("'"):
+        return text[1:-1].replace("''", "'")
+    if text.lower() == "@project":
+        return project
+    try:
+        return int(text)
+    except ValueError:
+        try:
+            return float(text)
+        except ValueError:
+            return text
+
+
+def _parse_clauses(where, project):
+    clauses = []
+    for part in _split_top_level(where or "", _AND_RE):
+        match = _CLAUSE_RE.match(part)
+        if not match:
+            raise MockError(400, f"Unsupported WIQL clause: {part}")
+        prefix, field, operator, value = match.groups()
+        operator = " ".join(operator.upper().split())
+        if operator in ("IN", "NOT IN"):
+            inner = value.strip()[1:-1]
+            value = [
+                _parse_literal(v, project)
+                for v in _split_top_level(inner, _COMMA_RE)
+            ]
+        else:
+            value = _parse_literal(value, project)
+        clauses.append(((prefix or "").lower(), field, operator, value))
+    return clauses
+
+
+def _comparable(value):
+    if isinstance(value, dict):
+        value = value.get("uniqueName") or value.get("displayName")
+    if isinstance(value, str):
+        # Dates compare as ISO text to the second
+        if re.match(r"^\d{4}-\d{2}-\d{2}", value):
+            return value.replace(" ", "T")[:19]
+        return value.lower()
+    return value
+
+
+def _matches(item, field, operator, expected):
+    actual = item["id"] if field == "System.Id" else item["fields"].get(field)
+    if operator in ("IN", "NOT IN"):
+        found = _comparable(actual) in [_comparable(v) for v in expected]
+        return found if operator == "IN" else not found
+    if operator in ("UNDER", "NOT UNDER"):
+        path = str(actual or "").lower()
+        root = str(expected).lower().rstrip("\\")
+        under = path == root or path.startswith(root + "\\")
+        return under if operator == "UNDER" else not under
+    actual, expected = _comparable(actual), _comparable(expected)
+    if actual is None:
+        return operator == "<>"
+    try:
+        return {
+            "=": actual == expected,
+            "<>": actual != expected,
+            ">": actual > expected,
+            ">=": actual >= expected,
+            "<": actual < expected,
+            "<=": actual <= expected,
+        }[operator]
+    except TypeError:
+        return False
+
+
+def _filter(dataset, ids, clauses):
+    return [
+        i
+        for i in ids
+        if i in dataset.items
+        and all(_matches(dataset.items[i], *clause) for clause in clauses)
+    ]
+
+
+def run_wiql(dataset, query, top=None):
+    """
+    Evaluates the subset of WIQL the app sends: flat WorkItems queries with
+    AND-ed comparisons, IN/NOT IN and UNDER, and hierarchy WorkItemLinks
+    queries in MustContain, MayContain or Recursive mode.
+    """
+    match = _WIQL_RE.match(query or "")
+    if not match:
+        raise MockError(400, "Unsupported WIQL query")
+    source, where, order_by, mode = match.groups()
+    clauses = _parse_clauses(where, dataset.project)
+    with dataset.lock:
+        if source.lower() == "workitemlinks":
+            return _run_link_query(dataset, clauses, (mode or "MustContain"), top)
+        clauses = [clause[1:] for clause in clauses]
+        ids = _filter(dataset, sorted(dataset.items), clauses)
+        if order_by:
+            field, _, direction = order_by.strip().partition(" ")
+            field = field.strip("[]")
+            ids.sort(
+                key=lambda i: (
+                    str(_comparable(dataset.items[i]["fields"].get(field)) or "")
+                    if field != "System.Id"
+                    else i
+                ),
+                reverse=direction.strip().upper() == "DESC",
+            )
+        if top:
+            ids = ids[:top]
+        return {
+            "queryType": "flat",
+            "workItems": [{"id": i, "url": dataset.api_url(i)} for i in ids],
+        }
+
+
+def _run_link_query(dataset, clauses, mode, top):
+    link_type = HIERARCHY_FORWARD
+    source_clauses, target_clauses = [], []
+    for prefix, field, operator, value in clauses:
+        if field == "System.Links.LinkType":
+            link_type = value
+        elif prefix == "target":
+            target_clauses.append((field, operator, value))
+        else:
+            source_clauses.append((field, operator, value))
+
+    source_ids = sorted(dataset.items)
+    for field, operator, value in source_clauses:
+        if field == "System.Id" and operator in ("=", "IN"):
+            source_ids = value if operator == "IN" else [value]
+    source_ids = _filter(dataset, source_ids, source_clauses)
+
+    def linked(work_item_id):
+        if link_type == HIERARCHY_REVERSE:
+            parent_id = dataset.parent.get(work_item_id)
+            return [parent_id] if parent_id is not None else []
+        return list(dataset.children.get(work_item_id, []))
+
+    relations = []
+    recursive = mode.lower() == "recursive"
+    for source_id in source_ids:
+        rows = []
+        stack = [source_id]
+        while stack:
+            current = stack.pop(0)
+            for target_id in _filter(dataset, linked(current), target_clauses):
+                rows.append(
+                    {
+                        "rel": link_type,
+                        "source": {"id": current, "url": dataset.api_url(current)},
+                        "target": {"id": target_id, "url": dataset.api_url(target_id)},
+                    }
+                )
+                if recursive:
+                    stack.append(target_id)
+        if rows or mode.lower() == "maycontain":
+            relations.append(
+                {
+                    "rel": None,
+                    "source": None,
+                    "target": {"id": source_id, "url": dataset.api_url(source_id)},
+                }
+            )
+            relations.extend(rows)
+        if top and len(relations) >= top:
+            relations = relations[:top]
+            break
+    return {
+        "queryType": "tree" if recursive else "oneHop",
+        "workItemRelations": relations,
+    }
+
+
+# --- Request handling ---
+
+
+class MockBehaviour:
+    """
+    Latency and throttling knobs, shared by every request.
+    latency_dist: "fixed", "uniform" (latency_ms +/- spread fraction) or
+    "lognormal" (median latency_ms, sigma spread).
+    per_item_ms: extra latency per work item returned or written, so large
+    batches cost more than small ones like they do on ADO.
+    throttle_rate: chance of a 429 for any request or $batch sub-request.
+    rate_limit: requests per second above which every request gets a 429.
+    """
+
+    def __init__(
+        self,
+        latency_ms=50.0,
+        latency_dist="lognormal",
+        spread=0.5,
+        per_item_ms=0.5,
+        throttle_rate=0.0,
+        rate_limit=0.0,
+        retry_after=1.0,
+        id_limit=ID_LIMIT,
+        batch_limit=BATCH_LIMIT,
+        seed=None,
+    ):
+        self.latency_ms = latency_ms
+        self.latency_dist = latency_dist
+        self.spread = spread
+        self.per_item_ms = per_item_ms
+        self.throttle_rate = throttle_rate
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.id_limit = id_limit
+        self.batch_limit = batch_limit
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window = []  # request times in the last second, for rate_limit
+        self.counters = {}
+
+    def latency(self, item_count=0):
+        with self._lock:
+            if self.latency_dist == "fixed":
+                base = self.latency_ms
+            elif self.latency_dist == "uniform":
+                base = self.latency_ms * self._rng.uniform(
+                    1 - self.spread, 1 + self.spread
+                )
+            else:
+                base = self.latency_ms * math.exp(self._rng.gauss(0, self.spread))
+        return max(base + self.per_item_ms * item_count, 0.0) / 1000.0
+
+    def should_throttle(self, count_in_window=True):
+        with self._lock:
+            if count_in_window and self.rate_limit:
+                now = time.monotonic()
+                self._window = [t for t in self._window if now - t < 1.0]
+                self._window.append(now)
+                if len(self._window) > self.rate_limit:
+                    return True
+            return bool(self.throttle_rate) and self._rng.random() < self.throttle_rate
+
+    def throttle_headers(self):
+        return {
+            "Retry-After": f"{self.retry_after:g}",
+            "X-RateLimit-Resource": "WorkItemTracking",
+            "X-RateLimit-Delay": f"{self.retry_after:g}",
+        }
+
+    def count(self, key, amount=1):
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters)
+
+    def reset(self):
+        with self._lock:
+            self.counters = {}
+            self._window = []
+
+
+def dispatch(dataset, behaviour, method, raw_url, body):
+    """
+    Routes one REST call (or $batch sub-request) to the dataset.
+    Returns (status, body, item_count) or raises MockError.
+    """
+    parsed = urllib.parse.urlparse(raw_url)
+    params = {k.lower(): v[-1] for k, v in urllib.parse.parse_qs(parsed.query).items()}
+    path = urllib.parse.unquote(parsed.path)
+    marker = path.lower().find("/_apis/wit/")
+    if marker < 0:
+        raise MockError(404, f"Unknown resource {path}")
+    resource = path[marker + len("/_apis/wit/") :].strip("/")
+    parts = resource.split("/")
+    kind = parts[0].lower()
+
+    with dataset.lock:
+        if kind == "workitems" and len(parts) == 1 and method == "GET":
+            return _get_many(dataset, behaviour, params)
+        if kind == "workitems" and len(parts) == 2 and parts[1].startswith("$"):
+            if method not in ("POST", "PATCH"):
+                raise MockError(405, f"{method} not allowed")
+            work_item_id = dataset.create(parts[1][1:], body or [])
+            return 200, dataset.payload(work_item_id, expand="relations"), 1
+        if kind == "workitems" and len(parts) == 2:
+            work_item_id = _int_or_error(parts[1])
+            if work_item_id not in dataset.items:
+                raise MockError(404, f"Work item {work_item_id} does not exist.")
+            if method == "GET":
+                fields = params.get("fields")
+                return (
+                    200,
+                    dataset.payload(
+                        work_item_id,
+                        fields.split(",") if fields else None,
+                        params.get("$expand"),
+                    ),
+                    1,
+                )
+            if method == "PATCH":
+                dataset.apply_patch(work_item_id, body or [])
+                return 200, dataset.payload(work_item_id, expand="relations"), 1
+            if method == "DELETE":
+                dataset.delete(work_item_id)
+                return 200, {"id": work_item_id, "code": 200}, 1
+            raise MockError(405, f"{method} not allowed")
+        if kind == "$batch" and method == "POST":
+            return _run_batch(dataset, behaviour, body)
+        if kind == "wiql" and len(parts) == 1 and method == "POST":
+            data = run_wiql(dataset, (body or {}).get("query"), _top(params))
+            return 200, data, 0
+        if kind == "wiql" and len(parts) == 2 and method == "GET":
+            return 200, run_wiql(dataset, dataset.saved_query, _top(params)), 0
+        if kind == "classificationnodes" and len(parts) >= 2:
+            depth = int(params.get("$depth", 0))
+            node = dataset.iteration_node("/".join(parts[2:]), depth)
+            if node is None:
+                raise MockError(404, f"Iteration path {'/'.join(parts[2:])} not found")
+            return 200, node, 0
+        if resource.lower() == "reporting/workitemrevisions":
+            return _revisions(dataset, params)
+    raise MockError(404, f"Unknown resource {method} {resource}")
+
+
+def _int_or_error(text):
+    try:
+        return int(text)
+    except ValueError:
+        raise MockError(400, f"Invalid work item ID '{text}'")
+
+
+def _top(params):
+    return int(params["$top"]) if params.get("$top") else None
+
+
+def _get_many(dataset, behaviour, params):
+    ids = [_int_or_error(i) for i in params.get("ids", "").split(",") if i]
+    if len(ids) > behaviour.id_limit:
+        raise MockError(
+            400,
+            f"The maximum number of work items that can be requested is "
+            f"{behaviour.id_limit}.",
+        )
+    omit = params.get("errorpolicy", "").lower() == "omit"
+    missing = [i for i in ids if i not in dataset.items]
+    if missing and not omit:
+        raise MockError(404, f"Work item {missing[0]} does not exist.")
+    fields = params.get("fields")
+    fields = fields.split(",") if fields else None
+    value = [
+        dataset.payload(i, fields, params.get("$expand"))
+        if i in dataset.items
+        else None
+        for i in ids
+    ]
+    return 200, {"count": len(value), "value": value}, len(ids)
+
+
+def _run_batch(dataset, behaviour, body):
+    if not isinstance(body, list):
+        raise MockError(400, "A $batch body must be a list of requests")
+    if len(body) > behaviour.batch_limit:
+        raise MockError(
+            400,
+            f"The maximum number of requests in a batch is {behaviour.batch_limit}.",
+        )
+    value = []
+    for sub_request in body:
+        behaviour.count("batch_sub_requests")
+        if behaviour.should_throttle(count_in_window=False):
+            behaviour.count("throttled_sub_requests")
+            value.append(
+                {
+                    "code": 429,
+                    "headers": behaviour.throttle_headers(),
+                    "body": json.dumps({"message": "Request was throttled"}),
+                }
+            )
+            continue
+        try:
+            status, sub_body, _ = dispatch(
+                dataset,
+                behaviour,
+                sub_request.get("method", "GET").upper(),
+                sub_request.get("uri", ""),
+                sub_request.get("body"),
+            )
+        except MockError as e:
+            status, sub_body = e.status, {"message": e.message}
+        value.append(
+            {
+                "code": status,
+                "headers": {"Content-Type": "application/json; charset=utf-8"},
+                "body": json.dumps(sub_body),
+            }
+        )
+    return 200, {"count": len(value), "value": value}, len(body)
+
+
+def _revisions(dataset, params, page_size=200):
+    """
+    reporting/workitemrevisions with includeLatestOnly semantics: each page
+    carries the current state of the items changed in that part of the log.
+    """
+    start = int(params.get("continuationtoken") or 0)
+    if not params.get("continuationtoken") and params.get("startdatetime"):
+        since = _comparable(params["startdatetime"])
+        start = next(
+            (
+                position
+                for position, work_item_id in enumerate(dataset.changes)
+                if work_item_id in dataset.items
+                and _comparable(
+                    dataset.items[work_item_id]["fields"].get("System.ChangedDate")
+                )
+                >= since
+            ),
+            len(dataset.changes),
+        )
+    end = min(start + page_size, len(dataset.changes))
+    fields = params.get("fields")
+    fields = fields.split(",") if fields else None
+    seen = []
+    for work_item_id in dataset.changes[start:end]:
+        if work_item_id in dataset.items and work_item_id not in seen:
+            seen.append(work_item_id)
+    values = [dataset.payload(i, fields) for i in seen]
+    return (
+        200,
+        {
+            "values": values,
+            "continuationToken": str(end),
+            "isLastBatch": end >= len(dataset.changes),
+        },
+        len(values),
+    )
+
+
+class MockADOHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so the client's connection pooling behaves as against ADO
+    protocol_version = "HTTP/1.1"
+
+    def _handle(self, method):
+        server = self.server
+        behaviour = server.behaviour
+        length = int(self.headers.get("Content-Length") or 0)
+        raw_body = self.rfile.read(length) if length else b""
+        behaviour.count("requests")
+
+        if self.path.startswith("/_mock/"):
+            return self._mock_control(method)
+
+        if behaviour.should_throttle():
+            behaviour.count("throttled")
+            time.sleep(behaviour.latency())
+            return self._send(
+                429, {"message": "Request was throttled"}, behaviour.throttle_headers()
+            )
+
+        try:
+            body = json.loads(raw_body) if raw_body else None
+            status, data, item_count = dispatch(
+                server.dataset, behaviour, method, self.path, body
+            )
+        except MockError as e:
+            status, data, item_count = e.status, {"message": e.message}, 0
+        except ValueError as e:
+            status, data, item_count = 400, {"message": str(e)}, 0
+        except Exception as e:
+            # Answer rather than drop the keep-alive connection
+            status, data, item_count = 500, {"message": repr(e)}, 0
+        behaviour.count(f"status_{status}")
+        behaviour.count("items", item_count)
+        time.sleep(behaviour.latency(item_count))
+        self._send(status, data)
+
+    def _mock_control(self, method):
+        if method == "GET" and self.path.startswith("/_mock/stats"):
+            return self._send(200, self.server.behaviour.stats())
+        if method == "POST" and self.path.startswith("/_mock/reset"):
+            self.server.behaviour.reset()
+            return self._send(200, {})
+        return self._send(404, {"message": "Unknown mock control"})
+
+    def _send(self, status, data, headers=None):
+        payload = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PATCH(self):
+        self._handle("PATCH")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class MockADOServer:
+    """
+    Runs the mock on a background thread; port=0 picks a free port.
+    server.url is the value for ADO_BASE_URL / ado_api.base_url.
+    """
+
+    def __init__(
+        self, dataset=None, host="127.0.0.1", port=0, verbose=False, **behaviour
+    ):
+        self.dataset = dataset or MockDataset.generate()
+        self.behaviour = MockBehaviour(**behaviour)
+        self.httpd = ThreadingHTTPServer((host, port), MockADOHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.dataset = self.dataset
+        self.httpd.behaviour = self.behaviour
+        self.httpd.verbose = verbose
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+        self.dataset.base_url = self.url
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def stats(self):
+        return self.behaviour.stats()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--items", type=int, default=2000, help="Dataset size")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--organization", default="spglobal")
+    parser.add_argument("--project", default="Platts")
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument(
+        "--latency-dist", choices=["fixed", "uniform", "lognormal"], default="lognormal"
+    )
+    parser.add_argument("--latency-spread", type=float, default=0.5)
+    parser.add_argument("--per-item-ms", type=float, default=0.5)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--rate-limit", type=float, default=0.0, help="Requests/second, 0 = off"
+    )
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--id-limit", type=int, default=ID_LIMIT)
+    parser.add_argument("--batch-limit", type=int, default=BATCH_LIMIT)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    dataset = MockDataset.generate(
+        items=args.items,
+        seed=args.seed,
+        organization=args.organization,
+        project=args.project,
+    )
+    server = MockADOServer(
+        dataset,
+        host=args.host,
+        port=args.port,
+        verbose=args.verbose,
+        latency_ms=args.latency_ms,
+        latency_dist=args.latency_dist,
+        spread=args.latency_spread,
+        per_item_ms=args.per_item_ms,
+        throttle_rate=args.throttle_rate,
+        rate_limit=args.rate_limit,
+        retry_after=args.retry_after,
+        id_limit=args.id_limit,
+        batch_limit=args.batch_limit,
+        seed=args.seed,
+    )
+    print(f"Mock ADO serving {len(dataset.items)} work items at {server.url}")
+    print(f"  ADO_BASE_URL={server.url} ADO_ORGANIZATION={args.organization} "
+          f"ADO_PROJECT={args.project}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
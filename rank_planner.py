@@ -0,0 +1,181 @@
+"""
+Minimal-move stack rank planning for the Story Sorter.
+
+Given items in the order the user wants and their current ranks, keeps the
+longest run of items that are already in increasing rank order (a longest
+increasing subsequence) where they are and assigns new ranks only to the
+rest, slotted between their kept neighbours. Reordering a large feature
+where two stories moved then costs two PATCHes instead of one per item.
+
+Ranks are whole numbers written rank_gap apart, so later moves find free
+ranks between neighbours. When a gap is full, the kept run is chosen so
+that each moved item still finds a free rank, re-spacing as few items that
+were already in order as possible; rebalance_ranks re-spaces a whole list.
+"""
+
+import bisect
+import math
+import statistics
+
+import ado_api
+
+# Distance between ranks written at the end of a list or by a rebalance
+rank_gap = int(ado_api.get_env("ADO_RANK_GAP", required=False, default="1000"))
+
+
+def is_ranked(rank):
+    # Unranked items come back from ADO with no rank (0 in the record)
+    if isinstance(rank, bool) or not isinstance(rank, (int, float)):
+        return False
+    return not math.isnan(rank) and rank > 0
+
+
+def free_slots(low, high):
+    # Whole numbers strictly between low and high
+    return max(math.ceil(high) - math.floor(low) - 1, 0)
+
+
+def longest_increasing_run(ranks):
+    """
+    Indexes of a longest strictly increasing subsequence of ranks,
+    ignoring unranked entries (O(n log n) patience sort).
+    """
+    tails = []  # tails[k]: rank ending the best run of length k + 1
+    tail_indexes = []
+    previous = [None] * len(ranks)
+    for i, rank in enumerate(ranks):
+        if not is_ranked(rank):
+            continue
+        k = bisect.bisect_left(tails, rank)
+        if k == len(tails):
+            tails.append(rank)
+            tail_indexes.append(i)
+        else:
+            tails[k] = rank
+            tail_indexes[k] = i
+        previous[i] = tail_indexes[k - 1] if k else None
+
+    run = []
+    i = tail_indexes[-1] if tail_indexes else None
+    while i is not None:
+        run.append(i)
+        i = previous[i]
+    return run[::-1]
+
+
+def _spread(low, high, count, gap):
+    """
+    count increasing whole-number ranks after low: gap apart when high is
+    None (end of the list), otherwise spread evenly below high. None when
+    there are not enough free ranks.
+    """
+    if high is None:
+        return [math.floor(low) + gap * (j + 1) for j in range(count)]
+    spacing = (high - low) / (count + 1)
+    if spacing < 1:
+        return None
+    return [math.floor(low + spacing * (j + 1)) for j in range(count)]
+
+
+def _fits(low, high, count):
+    # Whether count moved items fit between kept neighbours ranked low and
+    # high (None: end of the list), as _spread places them
+    return high is None or high - low >= count + 1
+
+
+def _roomy_run(ranks):
+    """
+    Indexes of the most items that can keep their rank: increasing, with
+    enough free ranks between each kept pair for the items moved between
+    them. The plain longest increasing run when it leaves room everywhere
+    (O(n log n)); otherwise the best run is searched pairwise (O(n^2)).
+    """
+    keep = longest_increasing_run(ranks)
+    bounds = [(-1, 0)] + [(i, ranks[i]) for i in keep]
+    if all(
+        _fits(low, high, end - start - 1)
+        for (start, low), (end, high) in zip(bounds, bounds[1:])
+    ):
+        return keep
+
+    # best[i]: most kept items in a valid run ending at i (-1: list start)
+    best = {-1: 0}
+    previous = {-1: None}
+    for i, rank in enumerate(ranks):
+        if not is_ranked(rank):
+            continue
+        options = [
+            (count + 1, j)
+            for j, count in best.items()
+            if (ranks[j] if j >= 0 else 0) < rank
+            and _fits(ranks[j] if j >= 0 else 0, rank, i - j - 1)
+        ]
+        if options:
+            best[i], previous[i] = max(options)
+    # The open end has room for everything after the last kept item
+    i = max(best, key=lambda k: best[k])
+    run = []
+    while i is not None and i >= 0:
+        run.append(i)
+        i = previous[i]
+    return run[::-1]
+
+
+def plan_minimal_moves(ranks, gap=None):
+    """
+    ranks: current ranks in the desired display order.
+    Returns {"moves": {index: new rank}, "kept": count left untouched,
+    "rebalanced": items already in order that moved to make room}.
+    """
+    gap = gap or rank_gap
+    keep = _roomy_run(ranks)
+    # Kept items bound the runs that move; before the first one ranks start
+    # above 0 and after the last one they are open ended
+    anchors = [(-1, 0)] + [(i, ranks[i]) for i in keep] + [(len(ranks), None)]
+    moves = {}
+    for (start, low), (end, high) in zip(anchors, anchors[1:]):
+        moves.update(zip(range(start + 1, end), _spread(low, high, end - start - 1, gap)))
+
+    moves = {i: rank for i, rank in moves.items() if rank != ranks[i]}
+    # Moves beyond those an unbounded rank space would need were forced by
+    # full gaps
+    in_order = len(longest_increasing_run(ranks))
+    return {
+        "moves": moves,
+        "kept": len(ranks) - len(moves),
+        "rebalanced": max(len(moves) - (len(ranks) - in_order), 0),
+    }
+
+
+def rebalance_ranks(ranks, gap=None):
+    """
+    Re-spaces a list already in display order gap apart from its lowest
+    current rank. Returns {index: new rank} for the items whose rank
+    changes.
+    """
+    gap = gap or rank_gap
+    ranked = [rank for rank in ranks if is_ranked(rank)]
+    base = max(math.floor(min(ranked)), 1) if ranked else gap
+    return {
+        i: base + gap * i
+        for i, rank in enumerate(ranks)
+        if rank != base + gap * i
+    }
+
+
+def gap_stats(ranks):
+    """
+    How much room is left between the items' current ranks (in rank
+    order): free whole-number ranks per gap and how many adjacent pairs
+    have none left, so the next move between them forces a rebalance.
+    """
+    ranked = sorted(rank for rank in ranks if is_ranked(rank))
+    slots = [free_slots(low, high) for low, high in zip(ranked, ranked[1:])]
+    return {
+        "items": len(ranks),
+        "unranked": len(ranks) - len(ranked),
+        "min_free": min(slots) if slots else None,
+        "median_free": statistics.median(slots) if slots else None,
+        "exhausted": sum(1 for count in slots if count == 0),
+        "pairs": len(slots),
+    }
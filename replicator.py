@@ -0,0 +1,198 @@
+"""
+Story Replicator engine used by Tab 7.
+
+Copies a User Story and its Tasks into several sprints. The whole plan is
+built up front; each sprint is one unit (create the story, then its tasks in
+one $batch call) and the units run concurrently, so ten sprints take about
+two round trips of wall time instead of one call per item.
+"""
+
+import ado_api
+import call_metrics
+
+
+def story_copy_data(source_story, target_path):
+    return {
+        "Title": source_story["Title"],
+        "Description": source_story["Description"],
+        "Acceptance Criteria": source_story["Acceptance Criteria"],
+        "Story Points": source_story.get("Story Points", 0),
+        "Assigned To": source_story.get("Assigned To", ""),
+        "Iteration Path": target_path,
+        "Area Path": source_story["Area Path"],  # Keep same area
+        "CMDB App Name": source_story.get("CMDB App Name", ""),
+    }
+
+
+def task_copy_data(task, source_story, target_path):
+    return {
+        "Title": task["Title"],
+        "Description": task["Description"],
+        "Original Estimate": task.get("Original Estimate", 0),
+        "Remaining Work": task.get("Original Estimate", 0),
+        "Assigned To": task.get("Assigned To", ""),
+        "Activity": task.get("Activity", "Development"),
+        "Iteration Path": target_path,
+        "Area Path": source_story["Area Path"],
+    }
+
+
+def build_replication_plan(source_story, source_tasks, targets):
+    """
+    targets: list of (sprint name, iteration path).
+    Returns one unit per sprint: {"sprint", "path", "story", "tasks"} where
+    story / tasks hold the item data to create.
+    """
+    return [
+        {
+            "sprint": name,
+            "path": path,
+            "story": story_copy_data(source_story, path),
+            "tasks": [task_copy_data(t, source_story, path) for t in source_tasks],
+        }
+        for name, path in targets
+    ]
+
+
+def replicate_unit(parent, unit):
+    """
+    Creates one sprint's story and then its tasks under it.
+    Never raises; failures are recorded in the returned result:
+    {"sprint", "path", "story_id", "task_ids", "failed_tasks", "error"}
+    """
+    result = {
+        "sprint": unit["sprint"],
+        "path": unit["path"],
+        "story_id": None,
+        "task_ids": [],
+        "failed_tasks": [],
+        "error": None,
+    }
+    try:
+        created = ado_api.create_child_work_item(parent, unit["story"], "User Story")
+    except Exception as e:
+        result["error"] = f"Story not created: {e}"
+        return result
+
+    story = ado_api.parse_work_item(created)
+    result["story_id"] = story["ID"]
+    if not unit["tasks"]:
+        return result
+    try:
+        task_results = ado_api.create_work_items_bulk(
+            [(story, task_data, "Task") for task_data in unit["tasks"]], max_workers=1
+        )
+    except Exception as e:
+        task_results = [
+            {"index": i, "ok": False, "id": None, "error": str(e)}
+            for i in range(len(unit["tasks"]))
+        ]
+    for task_result in task_results:
+        if task_result["ok"]:
+            result["task_ids"].append(task_result["id"])
+        else:
+            result["failed_tasks"].append(
+                {
+                    "Title": unit["tasks"][task_result["index"]]["Title"],
+                    "error": task_result["error"],
+                }
+            )
+    if result["failed_tasks"]:
+        result["error"] = f"{len(result['failed_tasks'])} task(s) not created"
+    return result
+
+
+def replication_status(result):
+    if result.get("cancelled"):
+        return "cancelled"
+    if result["story_id"] is None:
+        return "failed"
+    if result["failed_tasks"]:
+        return "partial"
+    return "complete"
+
+
+@call_metrics.traced
+def replicate_story(
+    source_story,
+    source_tasks,
+    parent,
+    targets,
+    max_workers=ado_api.batch_max_workers,
+    on_sprint_done=None,
+    should_stop=None,
+):
+    """
+    Replicates source_story and source_tasks under parent into every target
+    sprint (see build_replication_plan), max_workers sprints at a time.
+    on_sprint_done(index, result) is called from the calling thread as each
+    sprint finishes. Sprints not started once should_stop() returns True are
+    skipped and reported as cancelled.
+    Returns the report from build_rollback_report.
+    """
+    if not parent:
+        raise ValueError("Cannot duplicate without a Parent Feature to attach to.")
+    plan = build_replication_plan(source_story, source_tasks, targets)
+
+    def replicate(unit):
+        if should_stop and should_stop():
+            return {
+                "sprint": unit["sprint"],
+                "path": unit["path"],
+                "story_id": None,
+                "task_ids": [],
+                "failed_tasks": [],
+                "error": "Cancelled before it started",
+                "cancelled": True,
+            }
+        return replicate_unit(parent, unit)
+
+    results = ado_api.run_concurrently(
+        replicate,
+        plan,
+        max_workers,
+        on_result=on_sprint_done,
+    )
+    return build_rollback_report(results)
+
+
+def build_rollback_report(results):
+    """
+    Summarizes per-sprint results. "created_ids" lists everything that was
+    created, tasks before their stories, i.e. the order to delete them in to
+    undo the run.
+    """
+    for result in results:
+        result["status"] = replication_status(result)
+    created_ids = [i for result in results for i in result["task_ids"]]
+    created_ids += [r["story_id"] for r in results if r["story_id"] is not None]
+    return {
+        "sprints": results,
+        "complete": sum(1 for r in results if r["status"] == "complete"),
+        "partial": sum(1 for r in results if r["status"] == "partial"),
+        "failed": sum(1 for r in results if r["status"] == "failed"),
+        "cancelled": sum(1 for r in results if r["status"] == "cancelled"),
+        "created_ids": created_ids,
+    }
+
+
+@call_metrics.traced
+def rollback(report, max_workers=ado_api.batch_max_workers):
+    """
+    Deletes (to the recycle bin) everything a replication run created.
+    Returns {work_item_id: error} for the deletions that failed.
+    """
+    errors = {}
+
+    def delete(work_item_id):
+        try:
+            ado_api.delete_work_item(work_item_id)
+        except Exception as e:
+            errors[work_item_id] = str(e)
+
+    # Tasks first so no story is deleted while children still point at it
+    task_ids = [i for r in report["sprints"] for i in r["task_ids"]]
+    story_ids = [r["story_id"] for r in report["sprints"] if r["story_id"]]
+    ado_api.run_concurrently(delete, task_ids, max_workers)
+    ado_api.run_concurrently(delete, story_ids, max_workers)
+    return errors
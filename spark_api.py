@@ -3,6 +3,7 @@ import json
 import requests
 import re
 from dotenv import load_dotenv
+import call_metrics
 
 # Load environment variables from a .env file if present
 # load_dotenv() is now called inside get_spark_config
@@ -76,6 +77,17 @@ def get_spark_config():
     return api_key, url
 
 
+def _post_completion(url, headers, payload):
+    # Every Spark call goes through here so it shows up in call_metrics
+    with call_metrics.metrics.timed("spark", "chat/completions", "POST") as call:
+        call["sent"] = call_metrics.body_size(payload)
+        response = requests.request("POST", url, headers=headers, data=payload)
+        call["status"] = response.status_code
+        call["received"] = len(response.content)
+    return response
+
+
+@call_metrics.traced
 def generate_tasks(user_story_content, system_prompt=DEFAULT_TASK_GEN_PROMPT):
     api_key, url = get_spark_config()
 
@@ -87,7 +99,11 @@ def generate_tasks(user_story_content, system_prompt=DEFAULT_TASK_GEN_PROMPT):
                     "role": "system",
                     "content": system_prompt,
                 },
-                {"role": "user", "content": json.dumps(user_story_content)},
+                {
+                    "role": "user",
+                    # Work item records are Mappings, not dicts
+                    "content": json.dumps(user_story_content, default=dict),
+                },
             ],
             "temperature": 0.2,
             "n": 1,
@@ -99,7 +115,7 @@ def generate_tasks(user_story_content, system_prompt=DEFAULT_TASK_GEN_PROMPT):
     )
 
     headers = {"api-key": f"{api_key}", "Content-Type": "application/json"}
-    response = requests.request("POST", url, headers=headers, data=payload)
+    response = _post_completion(url, headers, payload)
 
     if response.status_code != 200:
         raise Exception(f"Spark API Error: {response.status_code} - {response.text}")
@@ -128,6 +144,7 @@ def generate_tasks(user_story_content, system_prompt=DEFAULT_TASK_GEN_PROMPT):
         raise Exception(f"Failed to parse JSON from Spark response: {response_content}")
 
 
+@call_metrics.traced
 def suggest_stories(
     feature, existing_stories, system_prompt=DEFAULT_STORY_SUGGEST_PROMPT
 ):
@@ -164,7 +181,7 @@ def suggest_stories(
     )
 
     headers = {"api-key": f"{api_key}", "Content-Type": "application/json"}
-    response = requests.request("POST", url, headers=headers, data=payload)
+    response = _post_completion(url, headers, payload)
 
     if response.status_code != 200:
         raise Exception(f"Spark API Error: {response.status_code} - {response.text}")
@@ -193,6 +210,7 @@ def suggest_stories(
         raise Exception(f"Failed to parse JSON from Spark response: {response_content}")
 
 
+@call_metrics.traced
 def review_plan(feature, user_stories, system_prompt=DEFAULT_PLAN_REVIEW_PROMPT):
     api_key, url = get_spark_config()
 
@@ -229,7 +247,7 @@ def review_plan(feature, user_stories, system_prompt=DEFAULT_PLAN_REVIEW_PROMPT)
     )
 
     headers = {"api-key": f"{api_key}", "Content-Type": "application/json"}
-    response = requests.request("POST", url, headers=headers, data=payload)
+    response = _post_completion(url, headers, payload)
 
     if response.status_code != 200:
         raise Exception(f"Spark API Error: {response.status_code} - {response.text}")
@@ -265,6 +283,7 @@ def strip_html(text):
     return re.sub(clean, "", text)
 
 
+@call_metrics.traced
 def generate_feature_details(
     feature, user_stories, system_prompt=DEFAULT_FEATURE_DETAILS_PROMPT
 ):
@@ -303,7 +322,7 @@ def generate_feature_details(
     )
 
     headers = {"api-key": f"{api_key}", "Content-Type": "application/json"}
-    response = requests.request("POST", url, headers=headers, data=payload)
+    response = _post_completion(url, headers, payload)
 
     if response.status_code != 200:
         raise Exception(f"Spark API Error: {response.status_code} - {response.text}")
@@ -332,6 +351,7 @@ def generate_feature_details(
         raise Exception(f"Failed to parse JSON from Spark response: {response_content}")
 
 
+@call_metrics.traced
 def chat_completion(messages):
     api_key, url = get_spark_config()
 
@@ -350,7 +370,7 @@ def chat_completion(messages):
     )
 
     headers = {"api-key": f"{api_key}", "Content-Type": "application/json"}
-    response = requests.request("POST", url, headers=headers, data=payload)
+    response = _post_completion(url, headers, payload)
 
     if response.status_code != 200:
         raise Exception(f"Spark API Error: {response.status_code} - {response.text}")
@@ -359,6 +379,7 @@ def chat_completion(messages):
     return response_json["choices"][0]["message"]["content"]
 
 
+@call_metrics.traced
 def extract_stories_from_chat(chat_history, system_prompt=DEFAULT_CHAT_EXTRACT_PROMPT):
     api_key, url = get_spark_config()
 
@@ -391,7 +412,7 @@ def extract_stories_from_chat(chat_history, system_prompt=DEFAULT_CHAT_EXTRACT_P
     )
 
     headers = {"api-key": f"{api_key}", "Content-Type": "application/json"}
-    response = requests.request("POST", url, headers=headers, data=payload)
+    response = _post_completion(url, headers, payload)
 
     if response.status_code != 200:
         raise Exception(f"Spark API Error: {response.status_code} - {response.text}")
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# ado_api reads its settings at import time
+os.environ.setdefault("ADO_PAT_TOKEN", "test")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,58 @@
+import random
+
+import rank_planner
+
+
+def apply_moves(ranks, plan):
+    return [plan["moves"].get(i, rank) for i, rank in enumerate(ranks)]
+
+
+def assert_increasing(ranks):
+    assert all(low < high for low, high in zip(ranks, ranks[1:]))
+
+
+def test_items_in_order_are_not_moved():
+    plan = rank_planner.plan_minimal_moves([1000, 2000, 3000])
+    assert plan["moves"] == {}
+    assert plan["kept"] == 3
+
+
+def test_moved_item_takes_a_free_rank_between_neighbours():
+    plan = rank_planner.plan_minimal_moves([1000, 3000, 2000], gap=1000)
+    assert plan["moves"] == {1: 1500}
+
+
+def test_full_gap_moves_only_one_item():
+    # Keeping 1, 2, 3, 4 leaves no rank between 3 and 4 for the 5; keeping
+    # 1, 2, 3, 5 and moving the 4 after it needs one write
+    ranks = [1, 2, 3, 5, 4]
+    plan = rank_planner.plan_minimal_moves(ranks, gap=1000)
+    assert plan["moves"] == {4: 1005}
+    assert plan["rebalanced"] == 0
+    assert_increasing(apply_moves(ranks, plan))
+
+
+def test_full_gaps_re_space_as_few_items_as_possible():
+    ranks = [2, 1, 3, 4]
+    plan = rank_planner.plan_minimal_moves(ranks, gap=1000)
+    assert len(plan["moves"]) == 2
+    assert plan["rebalanced"] == 1
+    assert_increasing(apply_moves(ranks, plan))
+
+
+def test_unranked_items_get_ranks():
+    ranks = [0, 0, 1000]
+    plan = rank_planner.plan_minimal_moves(ranks, gap=1000)
+    assert set(plan["moves"]) == {0, 1}
+    assert_increasing(apply_moves(ranks, plan))
+
+
+def test_planned_ranks_follow_display_order():
+    rng = random.Random(7)
+    for _ in range(50):
+        ranks = rng.sample(range(1, 60), 30)
+        plan = rank_planner.plan_minimal_moves(ranks, gap=10)
+        assert_increasing(apply_moves(ranks, plan))
+        assert len(plan["moves"]) >= len(ranks) - len(
+            rank_planner.longest_increasing_run(ranks)
+        )
@@ -1,15 +1,28 @@
 import os
+import datetime
+import uuid
 import streamlit as st
 import pandas as pd
 import ado_api
 import spark_api
+import rank_planner
+import replicator
+import bulk_journal
+import call_metrics
+import dry_run
+import jobs
 import json
-import time
 import urllib.parse
 from streamlit_quill import st_quill
 
 st.set_page_config(page_title="ADO Automation", layout="wide")
 
+# Times this script run and tags every ADO/Spark call made during it
+script_run = call_metrics.metrics.start_run()
+
+# How often a tab polls its running background job, in seconds
+JOB_POLL_SECONDS = 1.5
+
 st.title("ADO Automation Assistant")
 st.markdown("Automate your Azure DevOps workflows with AI.")
 
@@ -25,6 +38,351 @@ def reset_session_state(prefix):
     st.rerun()
 
 
+def stream_query_stories(query_id, top):
+    """
+    Streams a saved query's stories onto the page as they are hydrated
+    and returns them as a WorkItemList.
+    """
+    stats = {}
+    loaded = []
+    live = st.empty()
+    for story in ado_api.stream_query_work_items(
+        query_id, profile="full", top=top or None, stats=stats
+    ):
+        loaded.append(story)
+        # Redraw once per hydrated chunk rather than per story
+        if len(loaded) == stats["hydrated"]:
+            live.text(
+                f"Loaded {len(loaded)} stories...\n"
+                + "\n".join(f"- {s['ID']}: {s['Title']}" for s in loaded[-10:])
+            )
+    live.empty()
+    if stats.get("first_item_seconds") is not None:
+        st.caption(
+            f"Query {stats['query_seconds']:.2f}s · first story "
+            f"{stats['first_item_seconds']:.2f}s · {stats['items']} stories in "
+            f"{stats['total_seconds']:.2f}s ({stats['chunks']} batches)"
+        )
+    return ado_api.WorkItemList(loaded, stats.get("missing_ids", []))
+
+
+def journal_owner():
+    """
+    Who this session's bulk journals belong to: the signed-in user when the
+    app has authentication, otherwise an ID kept in the page URL, so it
+    survives browser reloads and server restarts.
+    """
+    if st.user.is_logged_in and st.user.get("email"):
+        return st.user.email
+    owner = st.query_params.get("owner")
+    if not owner:
+        owner = uuid.uuid4().hex[:12]
+        st.query_params["owner"] = owner
+    return owner
+
+
+def resume_unfinished_run(label, stale_after=None, job_key=None):
+    """
+    Offers to resume or discard this user's last interrupted bulk run
+    journaled under label (see bulk_journal). A run started before
+    stale_after (a UTC timestamp, e.g. when its items were re-fetched) was
+    planned from old data and can only be discarded. Nothing is offered
+    while the tab's background job in st.session_state[job_key] runs.
+    """
+    if job_key and st.session_state.get(job_key):
+        return
+    journal = bulk_journal.find_unfinished(label, owner=journal_owner())
+    if journal is None:
+        return
+    summary = journal.summary()
+    st.warning(
+        f"A bulk run started {summary['started_at']} did not finish: "
+        f"{summary['done']}/{summary['total']} done, {summary['pending']} pending."
+    )
+    stale = stale_after is not None and summary["started_at"] < stale_after
+    if stale:
+        st.caption(
+            "The items were fetched again since this run started; resuming "
+            "would overwrite newer values, so it can only be discarded."
+        )
+    col_resume, col_discard = st.columns(2)
+    if col_resume.button("Resume", key=f"{label}_resume", disabled=stale):
+        progress_bar = st.progress(0)
+        try:
+            results = bulk_journal.resume(
+                journal,
+                on_progress=lambda done, total: progress_bar.progress(done / total),
+            )
+        except ado_api.ADOAuthenticationError as e:
+            st.error(f"Authentication Error: {e}")
+            return
+        failed = [r for r in results if not r["ok"]]
+        resumed = sum(1 for r in results if r["resumed"])
+        if failed:
+            st.error(f"Run completed with {len(failed)} failed operation(s).")
+            for r in failed:
+                st.write(f"Operation {r['index'] + 1}: {r['error']}")
+        else:
+            st.success(
+                f"Run completed: {len(results) - resumed} sent now, "
+                f"{resumed} already done."
+            )
+    if col_discard.button("Discard", key=f"{label}_discard"):
+        journal.finish(discarded=True)
+        st.rerun()
+
+
+def show_dry_run(plan, noun):
+    """
+    Shows a dry-run plan (see dry_run): how many calls the real run makes,
+    how long it should take and the patch documents it would send.
+    Returns an error line per operation that failed validation.
+    """
+    st.info(
+        f"Dry run: {plan['valid']} of {len(plan['operations'])} {noun} pass "
+        f"validation. The real run makes {plan['api_calls']} API call(s) "
+        f"({plan['batches']} $batch) and should take about "
+        f"{plan['estimated_seconds']}s ({plan['latency']} latency)."
+    )
+    with st.expander("Patch documents"):
+        st.json(
+            [
+                {"Title": op["title"], "Patch": op["patch"]}
+                for op in plan["operations"][:50]
+            ],
+            expanded=False,
+        )
+        if len(plan["operations"]) > 50:
+            st.caption(f"First 50 of {len(plan['operations'])} shown.")
+    return [
+        f"Would fail '{op['title']}': {'; '.join(op['issues'])}"
+        for op in plan["operations"]
+        if op["issues"]
+    ]
+
+
+def save_story_ranks(stories, moves, owner=None, on_progress=None, job_id=None):
+    """
+    Writes {index in stories: new rank} to ADO as one journaled bulk update,
+    filling the required fields ADO rejects a rank change without, and
+    updates the local records. Returns (items updated, error lines).
+    """
+    indexes = sorted(moves)
+    rank_updates = []
+    for i in indexes:
+        story = stories[i]
+        rank_field = story.get("Stack Rank Field", "Microsoft.VSTS.Common.StackRank")
+
+        updates = {rank_field: moves[i]}
+
+        # Ensure CMDB App Name is present if missing (required field)
+        if not story.get("CMDB App Name"):
+            updates["Custom.CMDBAppName"] = "CI INFORMATION HUB DIRECT CONNECT - IHDC"
+
+        # Handle Bug-specific required fields
+        if story.get("Work Item Type") == "Bug":
+            if not story.get("Found by Test Case"):
+                # Defaulting to "NO" as requested
+                updates["Custom.FoundbyTestCase"] = "NO"
+            if not story.get("Identified By"):
+                updates["Custom.IdentifiedBy"] = "User Reported"
+
+        rank_updates.append((story["ID"], updates))
+
+    # One $batch round trip per 200 items; only throttled if ADO asks
+    results = bulk_journal.update_work_items(
+        "t5_rank_updates",
+        rank_updates,
+        on_progress=on_progress,
+        owner=owner,
+        job_id=job_id,
+    )
+    updates_count = 0
+    errors = []
+    for result in results:
+        story = stories[indexes[result["index"]]]
+        updates = rank_updates[result["index"]][1]
+        if not result["ok"]:
+            errors.append(f"Failed to update {story['ID']}: {result['error']}")
+            continue
+        updates_count += 1
+        # Update local state too
+        story["Stack Rank"] = moves[indexes[result["index"]]]
+        if "Custom.CMDBAppName" in updates:
+            story["CMDB App Name"] = updates["Custom.CMDBAppName"]
+        if "Custom.FoundbyTestCase" in updates:
+            story["Found by Test Case"] = updates["Custom.FoundbyTestCase"]
+        if "Custom.IdentifiedBy" in updates:
+            story["Identified By"] = updates["Custom.IdentifiedBy"]
+    return updates_count, errors
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def poll_job(state_key, on_finished):
+    job = jobs.get(st.session_state.get(state_key))
+    if job is None:
+        st.session_state.pop(state_key, None)
+        st.rerun()
+    if not job.finished:
+        st.progress(job.fraction, text=job.message or f"{job.label} {job.status}...")
+        if st.button("Cancel", key=f"{state_key}_cancel", disabled=job.cancelled):
+            job.cancel()
+        return
+
+    notes = []
+    if job.status == jobs.FAILED:
+        notes.append(("error", f"Job failed: {job.error}"))
+    elif job.status == jobs.INTERRUPTED:
+        notes.append(("warning", "Job was interrupted before it finished."))
+    elif job.status == jobs.CANCELLED:
+        notes.append(("warning", "Job cancelled."))
+    if job.result is not None:
+        result_notes = on_finished(job.result)
+        if job.status == jobs.CANCELLED:
+            # A cancelled job only returns what it did before it stopped
+            result_notes = [n for n in result_notes if n[0] != "success"]
+        notes += result_notes
+    st.session_state[f"{state_key}_notes"] = notes
+    del st.session_state[state_key]
+    job.collected = True
+    jobs.forget(job.id)
+    st.rerun()
+
+
+def show_job(state_key, on_finished):
+    """
+    Shows the background job whose ID is in st.session_state[state_key]
+    (see jobs) with its progress and a Cancel button, refreshed in a
+    fragment while the rest of the page stays usable. When it ends,
+    on_finished(result) stores the result in session state and returns
+    [(st function name, text)] to show after the page reruns; success
+    notes are dropped when the job was cancelled.
+    """
+    for level, text in st.session_state.pop(f"{state_key}_notes", []):
+        getattr(st, level)(text)
+    if st.session_state.get(state_key):
+        poll_job(state_key, on_finished)
+
+
+def generate_tasks_job(job, stories, system_prompt):
+    tasks_map = {}
+    errors = []
+    for i, story in enumerate(stories):
+        if job.cancelled:
+            break
+        job.progress(i, len(stories), f"Generating tasks for {story['ID']}...")
+        try:
+            tasks_response = spark_api.generate_tasks(
+                story, system_prompt=system_prompt
+            )
+            if "tasks" in tasks_response:
+                tasks = tasks_response["tasks"]
+                # Auto-assign story owner and set Remaining Work
+                story_assignee = story.get("Assigned To", "")
+                if story_assignee == "Unassigned":
+                    story_assignee = ""
+
+                for t in tasks:
+                    if story_assignee:
+                        t["Assigned To"] = story_assignee
+                    # Set Remaining Work = Original Estimate
+                    t["Remaining Work"] = t.get("Original Estimate", 0)
+
+                tasks_map[story["ID"]] = tasks
+            else:
+                errors.append(f"Unexpected response format for story {story['ID']}.")
+        except Exception as e:
+            errors.append(f"Error generating tasks for {story['ID']}: {e}")
+        job.progress(i + 1, len(stories))
+    return {"tasks": tasks_map, "errors": errors}
+
+
+def create_tasks_job(job, create_ops, owner):
+    def on_progress(done, total):
+        job.progress(done, total, f"Created {done} of {total} tasks...")
+        # Stops between $batch calls; the journal lets the run be resumed
+        job.check_cancelled()
+
+    results = bulk_journal.create_work_items(
+        "t1_create_tasks",
+        create_ops,
+        on_progress=on_progress,
+        owner=owner,
+        job_id=job.id,
+    )
+    errors = []
+    for result in results:
+        story, task, _ = create_ops[result["index"]]
+        if not result["ok"]:
+            errors.append(
+                f"Failed '{task['Title']}' (Story {story['ID']}): {result['error']}"
+            )
+    return {"created": len(results) - len(errors), "errors": errors}
+
+
+def rebalance_ranks_job(job, stories, moves, owner):
+    def on_progress(done, total):
+        job.progress(done, total, f"Rebalanced {done} of {total} ranks...")
+        # Stops between $batch calls; the journal lets the run be resumed
+        job.check_cancelled()
+
+    job.progress(0, len(moves), f"Rebalancing {len(moves)} ranks...")
+    # Works on copies; the tab applies the saved fields when it collects them
+    stories = [dict(story) for story in stories]
+    updates_count, errors = save_story_ranks(
+        stories, moves, owner, on_progress, job.id
+    )
+    saved_fields = ("Stack Rank", "CMDB App Name", "Found by Test Case", "Identified By")
+    return {
+        "fields": {
+            stories[i]["ID"]: {key: stories[i].get(key) for key in saved_fields}
+            for i in moves
+        },
+        "updated": updates_count,
+        "errors": errors,
+    }
+
+
+def generate_feature_details_job(job, features, system_prompt):
+    details_map = {}
+    errors = []
+    for i, (f_id, data) in enumerate(features):
+        if job.cancelled:
+            break
+        job.progress(i, len(features), f"Generating details for {f_id}...")
+        try:
+            details_map[f_id] = spark_api.generate_feature_details(
+                data["feature"], data["stories"], system_prompt=system_prompt
+            )
+        except Exception as e:
+            errors.append(f"Error generating details for {f_id}: {e}")
+        job.progress(i + 1, len(features))
+    return {"details": details_map, "errors": errors}
+
+
+def replicate_story_job(job, source_story, source_tasks, parent, targets):
+    finished = []
+
+    def on_sprint_done(index, result):
+        finished.append(result["sprint"])
+        job.progress(
+            len(finished),
+            len(targets),
+            f"Finished {result['sprint']} ({len(finished)}/{len(targets)} sprints)",
+        )
+
+    job.progress(0, len(targets), f"Duplicating to {len(targets)} sprints in parallel...")
+    # Sprints already started finish so the report can roll them back
+    return replicator.replicate_story(
+        source_story,
+        source_tasks,
+        parent,
+        targets,
+        on_sprint_done=on_sprint_done,
+        should_stop=lambda: job.cancelled,
+    )
+
+
 @st.dialog("Edit System Prompt")
 def prompt_editor(session_key, default_val):
     st.markdown("Edit the system prompt used for this task.")
@@ -91,9 +449,20 @@ js = """
 """
 st.iframe(f"data:text/html,{urllib.parse.quote(js)}", height=1)
 
+# Sidebar: ADO connection pool stats
+with st.sidebar.expander("ADO Connection Stats", expanded=False):
+    st.json(ado_api.get_client().stats())
+    st.caption("Throttling")
+    st.json(ado_api.retry_policy.stats())
+    st.caption("Work Item Cache")
+    st.json(ado_api.work_item_cache.stats())
+    if st.button("Clear Cache", key="sidebar_clear_cache"):
+        ado_api.work_item_cache.clear()
+
 
 # --- Tab 1: Task Generator ---
 with tabs[1]:
+    call_metrics.set_tags(tab=TABS[1])
     col_h, col_reset, col_btn = st.columns([0.85, 0.1, 0.05])
     with col_h:
         st.header("Task Generator")
@@ -112,8 +481,12 @@ with tabs[1]:
         st.session_state.t1_user_stories = []
     if "t1_generated_tasks_map" not in st.session_state:
         st.session_state.t1_generated_tasks_map = {}
+    if "t1_existing_tasks" not in st.session_state:
+        st.session_state.t1_existing_tasks = {}
 
     # Step 1: Fetch User Story
+    resume_unfinished_run("t1_create_tasks", job_key="t1_create_job")
+
     st.subheader("1. Fetch User Stories")
     col1, col2 = st.columns([3, 1], vertical_alignment="bottom")
     with col1:
@@ -123,12 +496,16 @@ with tabs[1]:
         )
     with col2:
         t1_fetch_btn = st.button("Fetch Stories", key="t1_fetch")
+    t1_top = st.number_input(
+        "Max query results (0 = all)", min_value=0, value=0, step=50, key="t1_top"
+    )
 
     if t1_fetch_btn and t1_user_story_ids:
         try:
             with st.spinner("Fetching User Stories..."):
                 input_val = t1_user_story_ids.strip()
                 ids = []
+                streamed = ado_api.WorkItemList()
 
                 # Logic to determine if input is a URL, Query ID, or list of Story IDs
                 if input_val.lower().startswith("http"):
@@ -153,8 +530,9 @@ with tabs[1]:
                     if query_id:
                         st.info(f"Executing Query: {query_id}")
                         try:
-                            ids = ado_api.execute_query(query_id)
-                            if not ids:
+                            streamed = stream_query_stories(query_id, t1_top)
+                            ids = [s["ID"] for s in streamed]
+                            if not streamed and not streamed.missing_ids:
                                 st.warning(
                                     "Query executed successfully but returned no results."
                                 )
@@ -175,7 +553,8 @@ with tabs[1]:
                 ):
                     # Assume it is a raw Query GUID
                     st.info(f"Executing Query ID: {input_val}")
-                    ids = ado_api.execute_query(input_val)
+                    streamed = stream_query_stories(input_val, t1_top)
+                    ids = [s["ID"] for s in streamed]
                 else:
                     # Assume comma-separated User Story IDs
                     ids = [
@@ -184,10 +563,23 @@ with tabs[1]:
                         if x.strip()
                     ]
 
-                if ids:
-                    stories = ado_api.get_work_items_batch(ids)
+                if ids or streamed.missing_ids:
+                    # Existing Tasks in a fixed number of calls; streamed stories are not fetched again
+                    tree = ado_api.prefetch_tree(
+                        ids, depth=1, child_types=("Task",), known_items=streamed
+                    )
+                    stories = tree.roots()
+                    stories.missing_ids += streamed.missing_ids
                     st.session_state.t1_user_stories = stories
+                    st.session_state.t1_existing_tasks = {
+                        story["ID"]: tree.children(story["ID"]) for story in stories
+                    }
                     st.success(f"Fetched {len(stories)} stories.")
+                    if stories.missing_ids:
+                        st.warning(
+                            f"{len(stories.missing_ids)} IDs were not found or not accessible: "
+                            f"{', '.join(map(str, stories.missing_ids))}"
+                        )
                     # Reset generated tasks when new stories are fetched
                     st.session_state.t1_generated_tasks_map = {}
                 else:
@@ -208,46 +600,39 @@ with tabs[1]:
                 st.markdown(story["Description"], unsafe_allow_html=True)
                 st.markdown(f"**Acceptance Criteria:**")
                 st.markdown(story["Acceptance Criteria"], unsafe_allow_html=True)
+                existing_tasks = st.session_state.t1_existing_tasks.get(story["ID"], [])
+                if existing_tasks:
+                    st.markdown(f"**Existing Tasks ({len(existing_tasks)}):**")
+                    for task in existing_tasks:
+                        st.text(f"- {task['ID']}: {task['Title']} ({task['State']})")
                 if "Web URL" in story:
                     st.link_button("Open in ADO ↗", story["Web URL"])
 
         # Step 2: Generate Tasks
         st.subheader("2. Generate Tasks")
-        if st.button("Generate Tasks for ALL Stories", key="t1_gen"):
-            progress_bar = st.progress(0)
-            status_text = st.empty()
+        if st.button(
+            "Generate Tasks for ALL Stories",
+            key="t1_gen",
+            disabled=bool(st.session_state.get("t1_gen_job")),
+        ):
+            # Use custom prompt if set
+            sys_prompt = st.session_state.get(
+                "t1_gen_prompt", spark_api.DEFAULT_TASK_GEN_PROMPT
+            )
+            st.session_state.t1_gen_job = jobs.submit(
+                "t1_generate_tasks",
+                generate_tasks_job,
+                list(st.session_state.t1_user_stories),
+                sys_prompt,
+            ).id
 
-            for i, story in enumerate(st.session_state.t1_user_stories):
-                status_text.text(f"Generating tasks for {story['ID']}...")
-                try:
-                    # Use custom prompt if set
-                    sys_prompt = st.session_state.get(
-                        "t1_gen_prompt", spark_api.DEFAULT_TASK_GEN_PROMPT
-                    )
-                    tasks_response = spark_api.generate_tasks(
-                        story, system_prompt=sys_prompt
-                    )
-                    if "tasks" in tasks_response:
-                        tasks = tasks_response["tasks"]
-                        # Auto-assign story owner and set Remaining Work
-                        story_assignee = story.get("Assigned To", "")
-                        if story_assignee == "Unassigned":
-                            story_assignee = ""
-
-                        for t in tasks:
-                            if story_assignee:
-                                t["Assigned To"] = story_assignee
-                            # Set Remaining Work = Original Estimate
-                            t["Remaining Work"] = t.get("Original Estimate", 0)
-
-                        st.session_state.t1_generated_tasks_map[story["ID"]] = tasks
-                    else:
-                        st.error(f"Unexpected response format for story {story['ID']}.")
-                except Exception as e:
-                    st.error(f"Error generating tasks for {story['ID']}: {e}")
-                progress_bar.progress((i + 1) / len(st.session_state.t1_user_stories))
+        def t1_tasks_generated(result):
+            st.session_state.t1_generated_tasks_map.update(result["tasks"])
+            notes = [("error", err) for err in result["errors"]]
+            notes.append(("success", "Task generation complete!"))
+            return notes
 
-            st.success("Task generation complete!")
+        show_job("t1_gen_job", t1_tasks_generated)
 
     # Step 3: Review and Edit Tasks
     if st.session_state.t1_generated_tasks_map:
@@ -260,24 +645,17 @@ with tabs[1]:
                 st.markdown(f"#### Tasks for {story['ID']}: {story['Title']}")
 
                 tasks = st.session_state.t1_generated_tasks_map[story["ID"]]
-                df = pd.DataFrame(tasks)
-
-                required_columns = [
-                    "Title",
-                    "Description",
-                    "Original Estimate",
-                    "Remaining Work",
-                    "Assigned To",
-                    "Activity",
-                ]
-                for col in required_columns:
-                    if col not in df.columns:
-                        df[col] = "Development" if col == "Activity" else ""
-
-                df = df[
-                    required_columns
-                    + [c for c in df.columns if c not in required_columns]
-                ]
+                df = ado_api.rows_to_frame(
+                    tasks,
+                    {
+                        "Title": "",
+                        "Description": "",
+                        "Original Estimate": "",
+                        "Remaining Work": "",
+                        "Assigned To": "",
+                        "Activity": "Development",
+                    },
+                )
 
                 # Unique key for each editor
                 editor_key = f"t1_editor_{story['ID']}"
@@ -291,56 +669,46 @@ with tabs[1]:
         st.subheader("4. Upload to ADO")
         t1_dry_run = st.checkbox("Dry Run", value=True, key="t1_dry")
 
-        if st.button("Create Tasks in ADO (All Stories)", key="t1_create"):
-            total_tasks = sum(len(tasks) for tasks in t1_final_tasks_map.values())
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            success_count = 0
-            errors = []
-            processed_count = 0
-
+        if st.button(
+            "Create Tasks in ADO (All Stories)",
+            key="t1_create",
+            disabled=bool(st.session_state.get("t1_create_job")),
+        ):
+            # Flatten into one create list; create_ops[i] maps result i back to its story/task row
+            create_ops = []
             for story in st.session_state.t1_user_stories:
-                story_id = story["ID"]
-                if story_id in t1_final_tasks_map:
-                    tasks_to_create = t1_final_tasks_map[story_id]
-
-                    for task in tasks_to_create:
-                        processed_count += 1
-                        status_text.text(
-                            f"Processing: {task['Title']} (Story {story_id})"
-                        )
-                        try:
-                            if not t1_dry_run:
-                                ado_api.create_task(story, task)
-                            else:
-                                time.sleep(0.2)
-                            success_count += 1
-                        except ado_api.ADOAuthenticationError as e:
-                            st.error(f"Authentication Error: {e}")
-                            break  # Stop processing if token is invalid
-                        except Exception as e:
-                            errors.append(
-                                f"Failed '{task['Title']}' (Story {story_id}): {e}"
-                            )
-
-                        if total_tasks > 0:
-                            progress_bar.progress(processed_count / total_tasks)
+                for task in t1_final_tasks_map.get(story["ID"], []):
+                    create_ops.append((story, task, "Task"))
+
+            if t1_dry_run:
+                progress_bar = st.progress(0)
+                plan = dry_run.simulate_creates(create_ops)
+                errors = show_dry_run(plan, "tasks")
+                progress_bar.progress(1.0)
+                if errors:
+                    st.error(f"Completed with {len(errors)} errors.")
+                    for err in errors:
+                        st.write(err)
+                else:
+                    st.success(f"Dry run: {plan['valid']} tasks would be created.")
+            elif create_ops:
+                st.session_state.t1_create_job = jobs.submit(
+                    "t1_create_tasks", create_tasks_job, create_ops, journal_owner()
+                ).id
+
+        def t1_tasks_created(result):
+            if result["errors"]:
+                return [("error", f"Completed with {len(result['errors'])} errors.")] + [
+                    ("write", err) for err in result["errors"]
+                ]
+            return [("success", f"Created {result['created']} tasks!")]
 
-            if errors:
-                st.error(f"Completed with {len(errors)} errors.")
-                for err in errors:
-                    st.write(err)
-            else:
-                msg = (
-                    f"Dry run: {success_count} tasks would be created."
-                    if t1_dry_run
-                    else f"Created {success_count} tasks!"
-                )
-                st.success(msg)
+        show_job("t1_create_job", t1_tasks_created)
 
 # --- Tab 2: User Story Suggestion ---
 # --- Tab 2: User Story Suggestion ---
 with tabs[0]:
+    call_metrics.set_tags(tab=TABS[0])
     col_h, col_reset, col_btn = st.columns([0.85, 0.1, 0.05])
     with col_h:
         st.header("User Story Suggestion")
@@ -361,6 +729,8 @@ with tabs[0]:
         st.session_state.t2_suggested_stories = None
 
     # Step 1: Fetch Feature
+    resume_unfinished_run("t2_create_stories")
+
     st.subheader("1. Fetch Feature")
     col1, col2 = st.columns([3, 1], vertical_alignment="bottom")
     with col1:
@@ -371,30 +741,11 @@ with tabs[0]:
     if t2_fetch_btn and t2_feature_id:
         try:
             with st.spinner("Fetching Feature and Children..."):
-                feature = ado_api.get_work_item(t2_feature_id)
+                feature, stories = ado_api.get_feature_with_children(
+                    t2_feature_id, child_profile="full"
+                )
                 st.session_state.t2_feature = feature
-
-                # Get children
-                child_ids = []
-                if "Relations" in feature:
-                    for rel in feature["Relations"]:
-                        if rel["rel"] == "System.LinkTypes.Hierarchy-Forward":
-                            # Extract ID from URL
-                            child_id = rel["url"].split("/")[-1]
-                            child_ids.append(child_id)
-
-                if child_ids:
-                    children = ado_api.get_work_items_batch(child_ids)
-                    # Filter for User Stories only? Or keep all children?
-                    # Usually Features have User Stories.
-                    st.session_state.t2_existing_stories = [
-                        c
-                        for c in children
-                        if c["Work Item Type"] == "User Story"
-                        and c["State"] != "Removed"
-                    ]
-                else:
-                    st.session_state.t2_existing_stories = []
+                st.session_state.t2_existing_stories = list(stories)
 
                 st.success(
                     f"Fetched: {feature['Title']} with {len(st.session_state.t2_existing_stories)} stories."
@@ -447,33 +798,22 @@ with tabs[0]:
     if st.session_state.t2_suggested_stories:
         st.subheader("3. Review and Edit Suggestions")
 
-        df_stories = pd.DataFrame(st.session_state.t2_suggested_stories)
-        req_cols_stories = [
-            "Title",
-            "Description",
-            "Acceptance Criteria",
-            "Story Points",
-            "Assigned To",
-            "CMDB App Name",
-        ]
-        for col in req_cols_stories:
-            if col not in df_stories.columns:
-                if col == "CMDB App Name":
-                    val = (
-                        st.session_state.t2_feature.get("CMDB App Name", "")
-                        if st.session_state.t2_feature
-                        else ""
-                    )
-                    if not val:
-                        val = "CI INFORMATION HUB DIRECT CONNECT - IHDC"
-                    df_stories[col] = val
-                else:
-                    df_stories[col] = ""
-
-        df_stories = df_stories[
-            req_cols_stories
-            + [c for c in df_stories.columns if c not in req_cols_stories]
-        ]
+        default_cmdb = (
+            st.session_state.t2_feature.get("CMDB App Name", "")
+            if st.session_state.t2_feature
+            else ""
+        ) or "CI INFORMATION HUB DIRECT CONNECT - IHDC"
+        df_stories = ado_api.rows_to_frame(
+            st.session_state.t2_suggested_stories,
+            {
+                "Title": "",
+                "Description": "",
+                "Acceptance Criteria": "",
+                "Story Points": "",
+                "Assigned To": "",
+                "CMDB App Name": default_cmdb,
+            },
+        )
         t2_edited_df = st.data_editor(
             df_stories, num_rows="dynamic", width="stretch", key="t2_editor"
         )
@@ -489,22 +829,40 @@ with tabs[0]:
             success_count = 0
             errors = []
 
-            for i, story_data in enumerate(stories_to_create):
-                status_text.text(f"Processing: {story_data['Title']}")
+            if t2_dry_run:
+                plan = dry_run.simulate_creates(
+                    [
+                        (st.session_state.t2_feature, story_data, "User Story")
+                        for story_data in stories_to_create
+                    ]
+                )
+                errors = show_dry_run(plan, "stories")
+                success_count = plan["valid"]
+                progress_bar.progress(1.0)
+            elif stories_to_create:
+                status_text.text(f"Creating {len(stories_to_create)} stories in ADO...")
                 try:
-                    if not t2_dry_run:
-                        ado_api.create_child_work_item(
-                            st.session_state.t2_feature, story_data, "User Story"
-                        )
-                    else:
-                        time.sleep(0.5)
-                    success_count += 1
+                    results = bulk_journal.create_work_items(
+                        "t2_create_stories",
+                        [
+                            (st.session_state.t2_feature, story_data, "User Story")
+                            for story_data in stories_to_create
+                        ],
+                        on_progress=lambda done, total: progress_bar.progress(
+                            done / total
+                        ),
+                        owner=journal_owner(),
+                    )
+                    for result in results:
+                        if result["ok"]:
+                            success_count += 1
+                        else:
+                            story_data = stories_to_create[result["index"]]
+                            errors.append(
+                                f"Failed '{story_data['Title']}': {result['error']}"
+                            )
                 except ado_api.ADOAuthenticationError as e:
                     st.error(f"Authentication Error: {e}")
-                    break
-                except Exception as e:
-                    errors.append(f"Failed '{story_data['Title']}': {e}")
-                progress_bar.progress((i + 1) / len(stories_to_create))
 
             if errors:
                 st.error(f"Completed with {len(errors)} errors.")
@@ -520,6 +878,7 @@ with tabs[0]:
 
 # --- Tab 3: Plan Review ---
 with tabs[2]:
+    call_metrics.set_tags(tab=TABS[2])
     col_h, col_reset, col_btn = st.columns([0.85, 0.1, 0.05])
     with col_h:
         st.header("Plan Review")
@@ -550,27 +909,9 @@ with tabs[2]:
     if t3_fetch_btn and t3_feature_id:
         try:
             with st.spinner("Fetching Feature and Stories..."):
-                feature = ado_api.get_work_item(t3_feature_id)
+                feature, stories = ado_api.get_feature_with_children(t3_feature_id)
                 st.session_state.t3_feature = feature
-
-                # Get children
-                child_ids = []
-                if "Relations" in feature:
-                    for rel in feature["Relations"]:
-                        if rel["rel"] == "System.LinkTypes.Hierarchy-Forward":
-                            child_id = rel["url"].split("/")[-1]
-                            child_ids.append(child_id)
-
-                if child_ids:
-                    children = ado_api.get_work_items_batch(child_ids)
-                    st.session_state.t3_stories = [
-                        c
-                        for c in children
-                        if c["Work Item Type"] == "User Story"
-                        and c["State"] != "Removed"
-                    ]
-                else:
-                    st.session_state.t3_stories = []
+                st.session_state.t3_stories = list(stories)
 
                 st.success(
                     f"Fetched: {feature['Title']} with {len(st.session_state.t3_stories)} stories."
@@ -591,43 +932,32 @@ with tabs[2]:
             # Sort by Iteration Path
             sorted_stories = sorted(
                 st.session_state.t3_stories,
-                key=lambda x: x.get("Iteration Path", "").replace(
-                    "IP Iteration", "~IP Iteration"
-                ),
+                key=lambda x: ado_api.iteration_sort_key(x.get("Iteration Path", "")),
             )
 
-            df_plan = pd.DataFrame(sorted_stories)
-            # Handle missing columns if any
             cols_to_show = ["ID", "Title", "State", "Iteration Path"]
-            for c in cols_to_show:
-                if c not in df_plan.columns:
-                    df_plan[c] = ""
+            df_plan = ado_api.records_to_frame(sorted_stories, cols_to_show)
 
-            st.dataframe(df_plan[cols_to_show], width="stretch")
+            st.dataframe(df_plan, width="stretch")
         else:
             st.info("No user stories found for this feature.")
             # Debug info
             if "t3_stories" in st.session_state and not st.session_state.t3_stories:
                 st.write("Debug Info:")
-                if "Relations" in feature:
-                    st.write(f"Total Relations: {len(feature['Relations'])}")
-                    child_rels = [
-                        r
-                        for r in feature["Relations"]
-                        if r["rel"] == "System.LinkTypes.Hierarchy-Forward"
-                    ]
-                    st.write(f"Child Relations: {len(child_rels)}")
-                    if child_rels:
-                        child_ids = [r["url"].split("/")[-1] for r in child_rels]
-                        st.write(f"Child IDs: {child_ids}")
-                        try:
-                            children = ado_api.get_work_items_batch(child_ids)
-                            types = [c["Work Item Type"] for c in children]
-                            st.write(f"Child Types: {types}")
-                        except Exception as e:
-                            st.write(f"Error fetching children details: {e}")
-                else:
-                    st.write("No Relations found in feature object.")
+                try:
+                    # Same link query without the type/state filters
+                    _, children = ado_api.get_feature_with_children(
+                        feature["ID"], child_types=None, exclude_states=None
+                    )
+                    st.write(f"Child Relations: {len(children)}")
+                    if children:
+                        st.write(f"Child IDs: {[c['ID'] for c in children]}")
+                        types = [
+                            f"{c['Work Item Type']} ({c['State']})" for c in children
+                        ]
+                        st.write(f"Child Types: {types}")
+                except Exception as e:
+                    st.write(f"Error fetching children details: {e}")
 
         # Step 2: Review Plan
         st.subheader("2. Review Plan with Spark")
@@ -686,6 +1016,7 @@ with tabs[2]:
 
 # --- Tab 4: Feature Details ---
 with tabs[3]:
+    call_metrics.set_tags(tab=TABS[3])
     col_h, col_reset, col_btn = st.columns([0.85, 0.1, 0.05])
     with col_h:
         st.header("Feature Details Generator")
@@ -726,29 +1057,12 @@ with tabs[3]:
                 if ids:
                     st.session_state.t4_features = {}
                     for f_id in ids:
-                        feature = ado_api.get_work_item(f_id)
-
-                        # Get children
-                        child_ids = []
-                        if "Relations" in feature:
-                            for rel in feature["Relations"]:
-                                if rel["rel"] == "System.LinkTypes.Hierarchy-Forward":
-                                    child_id = rel["url"].split("/")[-1]
-                                    child_ids.append(child_id)
-
-                        stories = []
-                        if child_ids:
-                            children = ado_api.get_work_items_batch(child_ids)
-                            stories = [
-                                c
-                                for c in children
-                                if c["Work Item Type"] == "User Story"
-                                and c["State"] != "Removed"
-                            ]
-
+                        feature, stories = ado_api.get_feature_with_children(
+                            f_id, child_profile="full"
+                        )
                         st.session_state.t4_features[f_id] = {
                             "feature": feature,
-                            "stories": stories,
+                            "stories": list(stories),
                             "generated_details": None,
                         }
                     st.success(f"Fetched {len(st.session_state.t4_features)} features.")
@@ -760,36 +1074,43 @@ with tabs[3]:
     # Step 2: Generate Details
     if st.session_state.t4_features:
         st.subheader("2. Generate Details")
-        if st.button("Generate Details for ALL Features", key="t4_gen"):
-            progress_bar = st.progress(0)
-            for i, (f_id, data) in enumerate(st.session_state.t4_features.items()):
-                try:
-                    sys_prompt = st.session_state.get(
-                        "t4_details_prompt", spark_api.DEFAULT_FEATURE_DETAILS_PROMPT
-                    )
-                    details = spark_api.generate_feature_details(
-                        data["feature"], data["stories"], system_prompt=sys_prompt
-                    )
-                    st.session_state.t4_features[f_id]["generated_details"] = details
-
-                    # Update session state for text areas immediately
-                    st.session_state[f"t4_desc_{f_id}"] = details.get("description", "")
-                    st.session_state[f"t4_dep_{f_id}"] = details.get(
-                        "external_dependencies", ""
-                    )
-                    st.session_state[f"t4_nfr_{f_id}"] = details.get(
-                        "non_functional_requirements", ""
-                    )
-                    st.session_state[f"t4_ac_{f_id}"] = details.get(
-                        "acceptance_criteria", ""
-                    )
+        if st.button(
+            "Generate Details for ALL Features",
+            key="t4_gen",
+            disabled=bool(st.session_state.get("t4_gen_job")),
+        ):
+            sys_prompt = st.session_state.get(
+                "t4_details_prompt", spark_api.DEFAULT_FEATURE_DETAILS_PROMPT
+            )
+            st.session_state.t4_gen_job = jobs.submit(
+                "t4_generate_details",
+                generate_feature_details_job,
+                list(st.session_state.t4_features.items()),
+                sys_prompt,
+            ).id
+
+        def t4_details_generated(result):
+            for f_id, details in result["details"].items():
+                if f_id not in st.session_state.t4_features:
+                    continue
+                st.session_state.t4_features[f_id]["generated_details"] = details
+
+                # Update session state for text areas immediately
+                st.session_state[f"t4_desc_{f_id}"] = details.get("description", "")
+                st.session_state[f"t4_dep_{f_id}"] = details.get(
+                    "external_dependencies", ""
+                )
+                st.session_state[f"t4_nfr_{f_id}"] = details.get(
+                    "non_functional_requirements", ""
+                )
+                st.session_state[f"t4_ac_{f_id}"] = details.get(
+                    "acceptance_criteria", ""
+                )
+            notes = [("error", err) for err in result["errors"]]
+            notes.append(("success", "Generation complete!"))
+            return notes
 
-                except Exception as e:
-                    st.error(f"Error generating details for {f_id}: {e}")
-                progress_bar.progress((i + 1) / len(st.session_state.t4_features))
-            st.success("Generation complete!")
-            time.sleep(1)
-            st.rerun()
+        show_job("t4_gen_job", t4_details_generated)
 
         # Step 3: Review and Edit
         st.subheader("3. Review and Edit")
@@ -885,20 +1206,43 @@ with tabs[3]:
             progress_bar = st.progress(0)
             success_count = 0
             errors = []
+            # Only fields that differ from the fetched feature are sent
+            t4_changes = {
+                f_id: ado_api.changed_fields(
+                    st.session_state.t4_features[f_id]["feature"], updates
+                )
+                for f_id, updates in t4_updates_map.items()
+            }
+            t4_skipped = [f_id for f_id, changes in t4_changes.items() if not changes]
+            t4_changed = {
+                f_id: changes for f_id, changes in t4_changes.items() if changes
+            }
 
-            for i, (f_id, updates) in enumerate(t4_updates_map.items()):
-                try:
-                    if not t4_dry_run:
-                        ado_api.update_work_item(f_id, updates)
-                    else:
-                        time.sleep(0.5)
-                    success_count += 1
-                except ado_api.ADOAuthenticationError as e:
-                    st.error(f"Authentication Error: {e}")
-                    break
-                except Exception as e:
-                    errors.append(f"Failed {f_id}: {e}")
-                progress_bar.progress((i + 1) / len(t4_updates_map))
+            if t4_dry_run:
+                plan = dry_run.simulate_updates(list(t4_changed.items()), bulk=False)
+                errors = show_dry_run(plan, "features")
+                success_count = plan["valid"]
+                progress_bar.progress(1.0)
+            else:
+                for i, f_id in enumerate(t4_changed):
+                    try:
+                        response = ado_api.update_work_item(
+                            f_id,
+                            t4_updates_map[f_id],
+                            current=st.session_state.t4_features[f_id]["feature"],
+                        )
+                        # Later saves diff against what was just written
+                        st.session_state.t4_features[f_id]["feature"] = (
+                            ado_api.parse_work_item(response)
+                        )
+                        success_count += 1
+                    except ado_api.ADOAuthenticationError as e:
+                        st.error(f"Authentication Error: {e}")
+                        break
+                    except Exception as e:
+                        errors.append(f"Failed {f_id}: {e}")
+                    progress_bar.progress((i + 1) / len(t4_changed))
+                progress_bar.progress(1.0)
 
             if errors:
                 st.error(f"Completed with {len(errors)} errors.")
@@ -911,10 +1255,23 @@ with tabs[3]:
                     else f"Updated {success_count} features!"
                 )
                 st.success(msg)
+            for f_id, changes in t4_changed.items():
+                st.caption(
+                    f"{f_id}: "
+                    + ", ".join(
+                        ado_api.FIELD_RECORD_KEYS.get(field, field) for field in changes
+                    )
+                )
+            if t4_skipped:
+                st.info(
+                    f"Skipped {len(t4_skipped)} unchanged features: "
+                    + ", ".join(map(str, t4_skipped))
+                )
 
 # --- Tab 5: Story Sorter ---
 # --- Tab 5: Story Sorter ---
 with tabs[4]:
+    call_metrics.set_tags(tab=TABS[4])
     col_h, col_reset = st.columns([0.9, 0.1])
     with col_h:
         st.header("Item Sorter (Stories & Bugs)")
@@ -928,6 +1285,12 @@ with tabs[4]:
     if "t5_stories" not in st.session_state:
         st.session_state.t5_stories = []
 
+    resume_unfinished_run(
+        "t5_rank_updates",
+        stale_after=st.session_state.get("t5_fetched_at"),
+        job_key="t5_rebalance_job",
+    )
+
     # Step 1: Fetch
     st.subheader("1. Fetch Feature")
     col1, col2 = st.columns([3, 1], vertical_alignment="bottom")
@@ -939,26 +1302,15 @@ with tabs[4]:
     if t5_fetch_btn and t5_feature_id:
         try:
             with st.spinner("Fetching Feature and Stories..."):
-                feature = ado_api.get_work_item(t5_feature_id)
+                feature, stories = ado_api.get_feature_with_children(
+                    t5_feature_id, child_types=("User Story", "Bug")
+                )
                 st.session_state.t5_feature = feature
-
-                child_ids = []
-                if "Relations" in feature:
-                    for rel in feature["Relations"]:
-                        if rel["rel"] == "System.LinkTypes.Hierarchy-Forward":
-                            child_id = rel["url"].split("/")[-1]
-                            child_ids.append(child_id)
-
-                if child_ids:
-                    children = ado_api.get_work_items_batch(child_ids)
-                    st.session_state.t5_stories = [
-                        c
-                        for c in children
-                        if c["Work Item Type"] in ["User Story", "Bug"]
-                        and c["State"] != "Removed"
-                    ]
-                else:
-                    st.session_state.t5_stories = []
+                st.session_state.t5_stories = list(stories)
+                # Older rank journals were planned from the ranks this replaces
+                st.session_state.t5_fetched_at = datetime.datetime.now(
+                    datetime.timezone.utc
+                ).strftime("%Y-%m-%dT%H:%M:%SZ")
 
                 st.session_state.t5_msg = f"Fetched: {feature['Title']} with {len(st.session_state.t5_stories)} items."
 
@@ -997,14 +1349,11 @@ with tabs[4]:
             display_stories = sorted(
                 st.session_state.t5_stories,
                 key=lambda x: (
-                    x.get("Iteration Path", "").replace(
-                        "IP Iteration", "~IP Iteration"
-                    ),
+                    ado_api.iteration_sort_key(x.get("Iteration Path", "")),
                     x["Title"],
                 ),
             )
 
-        df = pd.DataFrame(display_stories)
         cols_to_show = [
             "ID",
             "Work Item Type",
@@ -1014,11 +1363,61 @@ with tabs[4]:
             "Stack Rank",
             "Iteration Path",
         ]
-        for c in cols_to_show:
-            if c not in df.columns:
-                df[c] = ""
+        df = ado_api.records_to_frame(display_stories, cols_to_show)
+
+        st.dataframe(df, width="stretch")
 
-        st.dataframe(df[cols_to_show], width="stretch")
+        # Room left between the current ranks for future moves
+        t5_stats = rank_planner.gap_stats(
+            [s.get("Stack Rank", 0) for s in st.session_state.t5_stories]
+        )
+        with st.expander("Rank gaps"):
+            col_a, col_b, col_c, col_d = st.columns(4)
+            col_a.metric("Min free ranks", t5_stats["min_free"])
+            col_b.metric("Median free ranks", t5_stats["median_free"])
+            col_c.metric(
+                "Full gaps", f"{t5_stats['exhausted']} / {t5_stats['pairs']}"
+            )
+            col_d.metric("Unranked", t5_stats["unranked"])
+            st.caption(
+                f"New ranks are written {rank_planner.rank_gap} apart. A move "
+                "into a full gap moves as few other items as it can to make room."
+            )
+            if t5_stats["exhausted"] or t5_stats["unranked"]:
+                # Re-space the current ADO order, unranked items last
+                t5_by_rank = sorted(
+                    st.session_state.t5_stories,
+                    key=lambda x: (
+                        not rank_planner.is_ranked(x.get("Stack Rank", 0)),
+                        x.get("Stack Rank", 0),
+                    ),
+                )
+                t5_rebalance = rank_planner.rebalance_ranks(
+                    [s.get("Stack Rank", 0) for s in t5_by_rank]
+                )
+                if st.button(
+                    f"Rebalance ranks ({len(t5_rebalance)} items)",
+                    key="t5_rebalance",
+                    disabled=bool(st.session_state.get("t5_rebalance_job")),
+                ):
+                    st.session_state.t5_rebalance_job = jobs.submit(
+                        "t5_rebalance_ranks",
+                        rebalance_ranks_job,
+                        t5_by_rank,
+                        t5_rebalance,
+                        journal_owner(),
+                    ).id
+
+        def t5_ranks_rebalanced(result):
+            for story in st.session_state.t5_stories:
+                story.update(result["fields"].get(story["ID"], {}))
+            if result["errors"]:
+                return [
+                    ("error", f"Completed with {len(result['errors'])} errors.")
+                ] + [("write", err) for err in result["errors"]]
+            return [("success", f"Rebalanced {result['updated']} ranks in ADO.")]
+
+        show_job("t5_rebalance_job", t5_ranks_rebalanced)
 
         # Reorder in ADO
         if sort_criteria != "Default":
@@ -1026,87 +1425,36 @@ with tabs[4]:
             st.markdown(
                 f"This will update the Backlog Priority/Stack Rank of the stories in ADO to match the **{sort_criteria}** order shown above."
             )
-            if st.button("Save Sorted Order to ADO", key="t5_reorder"):
+            # Items already in relative order keep their rank; only the rest move
+            t5_plan = rank_planner.plan_minimal_moves(
+                [s.get("Stack Rank", 0) for s in display_stories]
+            )
+            if not t5_plan["moves"]:
+                st.info("ADO already has the items in this order.")
+            else:
+                st.info(
+                    f"{len(t5_plan['moves'])} items will be updated "
+                    f"({t5_plan['kept']} of {len(display_stories)} keep their rank)."
+                )
+                if t5_plan["rebalanced"]:
+                    st.warning(
+                        f"Some moves land in full gaps, so {t5_plan['rebalanced']} "
+                        "items already in order are re-spaced to make room."
+                    )
+            if t5_plan["moves"] and st.button(
+                "Save Sorted Order to ADO", key="t5_reorder"
+            ):
                 with st.spinner("Updating Story Orders in ADO..."):
                     try:
-                        # 1. Collect current ranks
-                        current_ranks = [
-                            s.get("Stack Rank", 0) for s in st.session_state.t5_stories
-                        ]
-                        # 2. Sort ranks to get available slots (low numbers = top)
-                        available_ranks = sorted(current_ranks)
-
-                        # 3. Handle duplicates/zeros
-                        if not available_ranks:
-                            available_ranks = [
-                                i + 1 for i in range(len(st.session_state.t5_stories))
-                            ]
-
-                        start_rank = available_ranks[0]
-                        if start_rank <= 0:
-                            start_rank = 1
-
-                        base_rank = available_ranks[0] if available_ranks else 1
-                        if base_rank == 0:
-                            base_rank = 1
-
-                        final_ranks = [
-                            base_rank + i for i in range(len(display_stories))
-                        ]
-
-                        updates_count = 0
-                        errors = []
-
-                        for i, story in enumerate(display_stories):
-                            new_rank = final_ranks[i]
-                            rank_field = story.get(
-                                "Stack Rank Field", "Microsoft.VSTS.Common.StackRank"
-                            )
-
-                            updates = {rank_field: new_rank}
-
-                            # Ensure CMDB App Name is present if missing (required field)
-                            if not story.get("CMDB App Name"):
-                                updates["Custom.CMDBAppName"] = (
-                                    "CI INFORMATION HUB DIRECT CONNECT - IHDC"
-                                )
-
-                            # Handle Bug-specific required fields
-                            if story.get("Work Item Type") == "Bug":
-                                if not story.get("Found by Test Case"):
-                                    # Defaulting to "NO" as requested
-                                    updates["Custom.FoundbyTestCase"] = "NO"
-                                if not story.get("Identified By"):
-                                    updates["Custom.IdentifiedBy"] = "User Reported"
-
-                            try:
-                                ado_api.update_work_item(story["ID"], updates)
-                                updates_count += 1
-                                # Update local state too
-                                story["Stack Rank"] = new_rank
-                                if "Custom.CMDBAppName" in updates:
-                                    story["CMDB App Name"] = updates[
-                                        "Custom.CMDBAppName"
-                                    ]
-                                if "Custom.FoundbyTestCase" in updates:
-                                    story["Found by Test Case"] = updates[
-                                        "Custom.FoundbyTestCase"
-                                    ]
-                                if "Custom.IdentifiedBy" in updates:
-                                    story["Identified By"] = updates[
-                                        "Custom.IdentifiedBy"
-                                    ]
-                            except Exception as e:
-                                errors.append(f"Failed to update {story['ID']}: {e}")
-
-                            time.sleep(0.1)  # throttling
-
+                        updates_count, errors = save_story_ranks(
+                            display_stories, t5_plan["moves"], journal_owner()
+                        )
                         if errors:
                             st.error(f"Completed with {len(errors)} errors.")
                             for e in errors:
                                 st.write(e)
                         else:
-                            st.session_state.t5_success = f"Successfully reordered {updates_count} stories in ADO based on {sort_criteria}!"
+                            st.session_state.t5_success = f"Successfully reordered {len(display_stories)} stories in ADO based on {sort_criteria} ({updates_count} rank updates)!"
                             st.rerun()
 
                     except Exception as e:
@@ -1115,6 +1463,7 @@ with tabs[4]:
 # --- Tab 6: Bulk Create (Chat) ---
 # --- Tab 6: Bulk Create (Chat) ---
 with tabs[5]:
+    call_metrics.set_tags(tab=TABS[5])
     col_h, col_reset = st.columns([0.9, 0.1])
     with col_h:
         st.header("Bulk Create via Chat")
@@ -1129,6 +1478,8 @@ with tabs[5]:
     if "t6_extracted_stories" not in st.session_state:
         st.session_state.t6_extracted_stories = []
 
+    resume_unfinished_run("t6_create_stories")
+
     # Chat Interface
     st.subheader("1. Chat")
 
@@ -1221,25 +1572,16 @@ with tabs[5]:
     if st.session_state.t6_extracted_stories:
         st.subheader("3. Review and Create")
 
-        df_t6 = pd.DataFrame(st.session_state.t6_extracted_stories)
-
-        # Ensure columns exist
-        cols = [
-            "Title",
-            "Description",
-            "Acceptance Criteria",
-            "Story Points",
-            "CMDB App Name",
-        ]
-        for c in cols:
-            if c not in df_t6.columns:
-                if c == "CMDB App Name":
-                    df_t6[c] = "CI INFORMATION HUB DIRECT CONNECT - IHDC"
-                else:
-                    df_t6[c] = ""
-
-        # Reorder columns
-        df_t6 = df_t6[cols + [c for c in df_t6.columns if c not in cols]]
+        df_t6 = ado_api.rows_to_frame(
+            st.session_state.t6_extracted_stories,
+            {
+                "Title": "",
+                "Description": "",
+                "Acceptance Criteria": "",
+                "Story Points": "",
+                "CMDB App Name": "CI INFORMATION HUB DIRECT CONNECT - IHDC",
+            },
+        )
 
         t6_edited_df = st.data_editor(
             df_t6, num_rows="dynamic", width="stretch", key="t6_editor"
@@ -1258,7 +1600,7 @@ with tabs[5]:
             parent_item = None
             if t6_parent_id:
                 try:
-                    parent_item = ado_api.get_work_item(t6_parent_id)
+                    parent_item = ado_api.get_work_item(t6_parent_id, profile="list")
                 except Exception as e:
                     st.error(f"Invalid Parent Feature ID: {e}")
                     stories_to_create = []  # Skip loop
@@ -1269,29 +1611,49 @@ with tabs[5]:
 
             created_ids = []
             total = len(stories_to_create)
-            for i, story_data in enumerate(stories_to_create):
-                status_text.text(f"Processing: {story_data.get('Title', 'Unknown')}")
 
+            if total > 0:
                 # Configure Parent Object with correct Iteration
                 effective_parent = parent_item.copy()
                 if t6_iteration.strip():
                     effective_parent["Iteration Path"] = t6_iteration.strip()
 
+            if t6_dry_run and total > 0:
+                plan = dry_run.simulate_creates(
+                    [
+                        (effective_parent, story_data, "User Story")
+                        for story_data in stories_to_create
+                    ]
+                )
+                errors = show_dry_run(plan, "stories")
+                success_count = plan["valid"]
+                progress_bar.progress(1.0)
+            elif total > 0 and not t6_dry_run:
+                status_text.text(f"Creating {total} stories in ADO...")
                 try:
-                    if not t6_dry_run:
-                        created_item = ado_api.create_child_work_item(
-                            effective_parent, story_data, "User Story"
-                        )
-                        if created_item and isinstance(created_item, dict) and "id" in created_item:
-                            created_ids.append(str(created_item["id"]))
-                    else:
-                        time.sleep(0.5)
-                    success_count += 1
+                    results = bulk_journal.create_work_items(
+                        "t6_create_stories",
+                        [
+                            (effective_parent, story_data, "User Story")
+                            for story_data in stories_to_create
+                        ],
+                        on_progress=lambda done, total: progress_bar.progress(
+                            done / total
+                        ),
+                        owner=journal_owner(),
+                    )
+                    for result in results:
+                        if result["ok"]:
+                            success_count += 1
+                            if result["id"]:
+                                created_ids.append(str(result["id"]))
+                        else:
+                            story_data = stories_to_create[result["index"]]
+                            errors.append(
+                                f"Failed {story_data.get('Title')}: {result['error']}"
+                            )
                 except Exception as e:
-                    errors.append(f"Failed {story_data.get('Title')}: {e}")
-
-                if total > 0:
-                    progress_bar.progress((i + 1) / total)
+                    errors.append(f"Failed to create stories: {e}")
 
             if errors:
                 st.error(f"Completed with {len(errors)} errors.")
@@ -1314,6 +1676,7 @@ with tabs[5]:
 # --- Tab 7: Story Replicator ---
 # --- Tab 7: Story Replicator ---
 with tabs[6]:
+    call_metrics.set_tags(tab=TABS[6])
     col_h, col_reset = st.columns([0.9, 0.1])
     with col_h:
         st.header("Story Replicator")
@@ -1342,55 +1705,30 @@ with tabs[6]:
     if t7_fetch_btn and t7_story_id:
         try:
             with st.spinner("Fetching Story, Parent, and Tasks..."):
-                # Fetch Story
-                story = ado_api.get_work_item(t7_story_id.strip())
-                if story["Work Item Type"] != "User Story":
+                # Story, its parent Feature and its Tasks in one prefetch
+                tree = ado_api.prefetch_tree(
+                    [t7_story_id.strip()],
+                    depth=1,
+                    include_parents=True,
+                    child_types=("Task",),
+                )
+                story = tree.get(int(t7_story_id.strip()))
+                if story is None:
+                    st.error("User Story not found or not accessible.")
+                elif story["Work Item Type"] != "User Story":
                     st.error("The ID provided is not a User Story.")
                 else:
                     st.session_state.t7_source_story = story
-
-                    # Fetch Parent (Feature)
-                    parent_feature = None
-                    child_task_ids = []
-
-                    if "Relations" in story:
-                        for rel in story["Relations"]:
-                            if rel["rel"] == "System.LinkTypes.Hierarchy-Reverse":
-                                # Parent
-                                parent_url = rel["url"]
-                                parent_id = parent_url.split("/")[-1]
-                                try:
-                                    parent_feature = ado_api.get_work_item(parent_id)
-                                except:
-                                    pass  # Could not fetch parent
-                            elif rel["rel"] == "System.LinkTypes.Hierarchy-Forward":
-                                # Child
-                                child_id = rel["url"].split("/")[-1]
-                                child_task_ids.append(child_id)
-
+                    parent_feature = tree.parent(story["ID"])
                     st.session_state.t7_parent_feature = parent_feature
-
-                    # Fetch Tasks
-                    if child_task_ids:
-                        tasks = ado_api.get_work_items_batch(child_task_ids)
-                        st.session_state.t7_source_tasks = [
-                            t
-                            for t in tasks
-                            if t["Work Item Type"] == "Task" and t["State"] != "Removed"
-                        ]
-                    else:
-                        st.session_state.t7_source_tasks = []
+                    st.session_state.t7_source_tasks = tree.children(story["ID"])
 
                     # Auto-detect Cycle from Story Iteration
                     current_iter = story.get("Iteration Path", "")
                     if current_iter:
-                        if "Sprint" in current_iter or "Iter" in current_iter:
-                            parts = current_iter.split("\\")
-                            if len(parts) > 1:
-                                inferred_cycle = "\\".join(parts[:-1])
-                                st.session_state.t7_cycle = inferred_cycle
-                        else:
-                            st.session_state.t7_cycle = current_iter
+                        st.session_state.t7_cycle = ado_api.infer_iteration_cycle(
+                            current_iter
+                        )
 
                     msg = f"Fetched Story: {story['Title']}"
                     if parent_feature:
@@ -1414,11 +1752,19 @@ with tabs[6]:
             )
         with col_cyc2:
             t7_fetch_sprints_btn = st.button("Fetch Sprints", key="t7_fetch_sprints")
+        t7_refresh_iterations = st.checkbox(
+            "Reload iterations from ADO",
+            value=False,
+            key="t7_refresh_iterations",
+            help="Iterations are cached; reload after sprints were added or renamed.",
+        )
 
         if t7_fetch_sprints_btn and t7_cycle_path:
             with st.spinner("Fetching Sprints..."):
                 try:
-                    sprints = ado_api.get_iterations_by_path(t7_cycle_path)
+                    sprints = ado_api.get_iterations_by_path(
+                        t7_cycle_path, refresh=t7_refresh_iterations
+                    )
                     st.session_state.t7_sprints = sprints
                     if not sprints:
                         st.warning("No sprints found for this path.")
@@ -1447,7 +1793,11 @@ with tabs[6]:
             st.subheader("3. Replicate")
             t7_dry_run = st.checkbox("Dry Run", value=True, key="t7_dry")
 
-            if st.button("Duplicate Story & Tasks", key="t7_duplicate"):
+            if st.button(
+                "Duplicate Story & Tasks",
+                key="t7_duplicate",
+                disabled=bool(st.session_state.get("t7_job")),
+            ):
                 selected_rows = t7_selected_sprints_df[
                     t7_selected_sprints_df["Select"] == True
                 ]
@@ -1455,96 +1805,159 @@ with tabs[6]:
                 if selected_rows.empty:
                     st.warning("Please select at least one sprint.")
                 else:
-                    progress_bar = st.progress(0)
-                    status_text = st.empty()
-                    success_count = 0
-                    errors = []
                     total_ops = len(selected_rows)
 
                     source_story = st.session_state.t7_source_story
                     source_tasks = st.session_state.t7_source_tasks
                     parent = st.session_state.t7_parent_feature
+                    targets = [
+                        (row.Name, row.Path) for row in selected_rows.itertuples()
+                    ]
 
                     if not parent:
                         st.warning(
                             "Proceeding without a Parent Feature link (none found on source)."
                         )
 
-                    for i, row in enumerate(selected_rows.itertuples()):
-                        target_path = row.Path
-                        target_name = row.Name
-                        status_text.text(f"Duplicating to {target_name}...")
-
-                        try:
-                            # 1. Create Story
-                            story_data = {
-                                "Title": source_story["Title"],
-                                "Description": source_story["Description"],
-                                "Acceptance Criteria": source_story[
-                                    "Acceptance Criteria"
-                                ],
-                                "Story Points": source_story.get("Story Points", 0),
-                                "Assigned To": source_story.get("Assigned To", ""),
-                                "Iteration Path": target_path,
-                                "Area Path": source_story[
-                                    "Area Path"
-                                ],  # Keep same area
-                                "CMDB App Name": source_story.get("CMDB App Name", ""),
-                            }
-
-                            if not t7_dry_run:
-                                # We need a parent to use create_child_work_item efficiently
-                                # If we have a parent, use it.
-                                if parent:
-                                    new_story = ado_api.create_child_work_item(
-                                        parent, story_data, "User Story"
-                                    )
-                                else:
-                                    raise Exception(
-                                        "Cannot duplicate without a Parent Feature to attach to."
-                                    )
-
-                                # 2. Create Tasks
-                                for task in source_tasks:
-                                    task_data = {
-                                        "Title": task["Title"],
-                                        "Description": task["Description"],
-                                        "Original Estimate": task.get(
-                                            "Original Estimate", 0
-                                        ),
-                                        "Remaining Work": task.get(
-                                            "Original Estimate", 0
-                                        ),
-                                        "Assigned To": task.get("Assigned To", ""),
-                                        "Activity": task.get("Activity", "Development"),
-                                        "Iteration Path": target_path,
-                                        "Area Path": source_story["Area Path"],
-                                    }
-                                    ado_api.create_child_work_item(
-                                        new_story, task_data, "Task"
-                                    )
-
-                            else:
-                                time.sleep(0.5)
-
-                            success_count += 1
-                        except Exception as e:
-                            errors.append(f"Failed in {target_name}: {e}")
-
-                        progress_bar.progress((i + 1) / total_ops)
-
-                    if errors:
-                        st.error(f"Completed with {len(errors)} errors.")
-                        for e in errors:
-                            st.write(e)
-                    else:
-                        msg = (
-                            f"Dry run: Replicated to {success_count} sprints."
-                            if t7_dry_run
-                            else f"Successfully replicated to {success_count} sprints!"
+                    if t7_dry_run:
+                        progress_bar = st.progress(0)
+                        plan = dry_run.simulate_replication(
+                            source_story, source_tasks, parent, targets
                         )
-                        st.success(msg)
+                        plan_errors = show_dry_run(plan, "stories and tasks")
+                        progress_bar.progress(1.0)
+                        if plan_errors:
+                            st.error(f"{len(plan_errors)} items would fail.")
+                            for err in plan_errors:
+                                st.write(err)
+                        else:
+                            st.success(
+                                f"Dry run: would replicate to {total_ops} sprints."
+                            )
+                    else:
+                        st.session_state.t7_report = None
+                        st.session_state.t7_job = jobs.submit(
+                            "t7_replicate",
+                            replicate_story_job,
+                            source_story,
+                            source_tasks,
+                            parent,
+                            targets,
+                        ).id
+
+            def t7_replicated(report):
+                st.session_state.t7_report = report
+                return []
+
+            show_job("t7_job", t7_replicated)
+
+            # Replication report (kept across reruns for the rollback button)
+            report = st.session_state.get("t7_report")
+            if report:
+                if report["partial"] or report["failed"] or report["cancelled"]:
+                    st.error(
+                        f"Completed with errors: {report['complete']} complete, "
+                        f"{report['partial']} partial, {report['failed']} failed, "
+                        f"{report['cancelled']} cancelled."
+                    )
+                    st.dataframe(
+                        pd.DataFrame(
+                            [
+                                {
+                                    "Sprint": r["sprint"],
+                                    "Status": r["status"],
+                                    "Story ID": r["story_id"],
+                                    "Tasks Created": len(r["task_ids"]),
+                                    "Tasks Failed": len(r["failed_tasks"]),
+                                    "Error": r["error"] or "",
+                                }
+                                for r in report["sprints"]
+                            ]
+                        ),
+                        hide_index=True,
+                        width="stretch",
+                    )
+                    for r in report["sprints"]:
+                        for failed in r["failed_tasks"]:
+                            st.write(
+                                f"{r['sprint']} - {failed['Title']}: {failed['error']}"
+                            )
+                    if report["created_ids"] and st.button(
+                        f"Roll back {len(report['created_ids'])} created items",
+                        key="t7_rollback",
+                        help="Deletes everything this run created (to the recycle bin).",
+                    ):
+                        with st.spinner("Rolling back..."):
+                            rollback_errors = replicator.rollback(report)
+                        st.session_state.t7_report = None
+                        if rollback_errors:
+                            st.error(
+                                "Could not delete: "
+                                + ", ".join(
+                                    f"{i} ({e})" for i, e in rollback_errors.items()
+                                )
+                            )
+                        else:
+                            st.success("Rolled back all created items.")
+                else:
+                    st.success(
+                        f"Successfully replicated to {report['complete']} sprints!"
+                    )
 
+# Sidebar: background jobs of every session, including ones cut short by a restart
+with st.sidebar.expander("Background Jobs", expanded=False):
+    job_list = jobs.list_jobs()
+    if job_list:
+        st.dataframe(
+            pd.DataFrame(
+                [
+                    {
+                        "Job": job.label,
+                        "Status": job.status,
+                        "Progress": f"{job.done}/{job.total or '?'}",
+                        "Started": job.started_at or job.created_at,
+                        "Error": job.error or "",
+                    }
+                    for job in job_list
+                ]
+            ),
+            hide_index=True,
+        )
+    else:
+        st.caption("No background jobs.")
+    if st.button("Clear Finished Jobs", key="sidebar_clear_jobs"):
+        # Jobs whose tab has not collected the result yet are kept
+        jobs.clear_finished()
+        st.rerun()
+
+# Sidebar: outbound call diagnostics, rendered last so it covers this run
+call_metrics.set_tags(tab="")
+run_timing = call_metrics.metrics.finish_run(script_run)
+with st.sidebar.expander("Call Diagnostics", expanded=False):
+    st.caption(
+        f"Last run {run_timing['seconds']}s: ADO {run_timing['ado']}s, "
+        f"Spark {run_timing['spark']}s, other {run_timing['other']}s"
+    )
+    metrics_group = st.selectbox(
+        "Group by", ["function", "tab", "endpoint"], key="sidebar_metrics_group"
+    )
+    metrics_rows = call_metrics.metrics.summary(("service", metrics_group))
+    if metrics_rows:
+        st.dataframe(pd.DataFrame(metrics_rows), hide_index=True)
+        st.caption("Slowest recent calls")
+        st.dataframe(
+            pd.DataFrame(call_metrics.metrics.slowest(10)).drop(columns=["at"]),
+            hide_index=True,
+        )
+        st.caption("Latency histogram")
+        st.dataframe(
+            pd.DataFrame(
+                call_metrics.metrics.histogram(), columns=["Latency", "Calls"]
+            ),
+            hide_index=True,
+        )
+    if st.button("Reset Metrics", key="sidebar_reset_metrics"):
+        call_metrics.metrics.reset()
 
 if __name__ == "__main__":
     # run streamlit command
@@ -0,0 +1,212 @@
+"""
+Persistent on-disk work item store backing ado_api's in-memory cache.
+
+Parsed work item records are kept in SQLite so every Streamlit session and
+server process on the same machine (and the next restart) can reuse them.
+The database runs in WAL mode, so several processes can read while one
+writes.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS work_items (
+    id INTEGER NOT NULL,
+    shape TEXT NOT NULL,
+    rev INTEGER NOT NULL,
+    record TEXT NOT NULL,
+    relations TEXT,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (id, shape)
+);
+CREATE INDEX IF NOT EXISTS idx_work_items_accessed ON work_items (accessed_at);
+CREATE INDEX IF NOT EXISTS idx_work_items_fetched ON work_items (fetched_at);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+# SQLite caps the number of bound parameters per statement
+SQL_PARAM_LIMIT = 500
+
+
+class WorkItemStore:
+    """
+    SQLite table of work item records keyed by (ID, fetch shape).
+    Stores the normalized record and its raw relations separately, the
+    System.Rev it was fetched at, and fetch/access times for eviction.
+    """
+
+    def __init__(self, path, max_age=14 * 24 * 3600, max_bytes=200 * 1024 * 1024):
+        self.path = path
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._writes = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+        self.evict()
+
+    def _connect(self):
+        # sqlite3 connections cannot be shared between threads, so keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _shape_key(shape):
+        return json.dumps(list(shape))
+
+    def get_many(self, ids, shape):
+        """
+        Returns {id: (fetched_at, record)} for the ids found in the store.
+        fetched_at is a wall-clock timestamp (time.time()).
+        """
+        shape_key = self._shape_key(shape)
+        found = {}
+        conn = self._connect()
+        for start in range(0, len(ids), SQL_PARAM_LIMIT):
+            chunk = list(ids[start : start + SQL_PARAM_LIMIT])
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT id, record, relations, fetched_at FROM work_items "
+                f"WHERE shape = ? AND id IN ({placeholders})",
+                [shape_key] + chunk,
+            ).fetchall()
+            for item_id, record_json, relations_json, fetched_at in rows:
+                record = json.loads(record_json)
+                if relations_json is not None:
+                    record["Relations"] = json.loads(relations_json)
+                found[item_id] = (fetched_at, record)
+        if found:
+            with conn:
+                conn.executemany(
+                    "UPDATE work_items SET accessed_at = ? WHERE id = ? AND shape = ?",
+                    [(time.time(), item_id, shape_key) for item_id in found],
+                )
+        return found
+
+    def put_many(self, shape, records):
+        shape_key = self._shape_key(shape)
+        now = time.time()
+        rows = []
+        for record in records:
+            record = dict(record)
+            relations = record.pop("Relations", None)
+            record_json = json.dumps(record)
+            relations_json = json.dumps(relations) if relations is not None else None
+            size = len(record_json) + len(relations_json or "")
+            rows.append(
+                (
+                    record["ID"],
+                    shape_key,
+                    record.get("Rev", 0),
+                    record_json,
+                    relations_json,
+                    now,
+                    now,
+                    size,
+                )
+            )
+        if not rows:
+            return
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO work_items "
+                "(id, shape, rev, record, relations, fetched_at, accessed_at, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        with self._lock:
+            self._writes += len(rows)
+            run_eviction = self._writes >= 1000
+            if run_eviction:
+                self._writes = 0
+        if run_eviction:
+            self.evict()
+
+    def delete(self, ids):
+        ids = list(ids)
+        conn = self._connect()
+        with conn:
+            for start in range(0, len(ids), SQL_PARAM_LIMIT):
+                chunk = ids[start : start + SQL_PARAM_LIMIT]
+                placeholders = ",".join("?" * len(chunk))
+                conn.execute(
+                    f"DELETE FROM work_items WHERE id IN ({placeholders})", chunk
+                )
+
+    def clear(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM work_items")
+
+    def evict(self):
+        """
+        Drops records older than max_age, then the least recently used
+        records until the store is under max_bytes.
+        """
+        conn = self._connect()
+        with conn:
+            if self.max_age:
+                conn.execute(
+                    "DELETE FROM work_items WHERE fetched_at < ?",
+                    (time.time() - self.max_age,),
+                )
+            if self.max_bytes:
+                total = conn.execute(
+                    "SELECT COALESCE(SUM(size), 0) FROM work_items"
+                ).fetchone()[0]
+                if total > self.max_bytes:
+                    # Walk from least recently used, summing sizes until enough is freed
+                    excess = total - self.max_bytes
+                    freed = 0
+                    victims = []
+                    for item_id, shape_key, size in conn.execute(
+                        "SELECT id, shape, size FROM work_items ORDER BY accessed_at"
+                    ):
+                        victims.append((item_id, shape_key))
+                        freed += size
+                        if freed >= excess:
+                            break
+                    conn.executemany(
+                        "DELETE FROM work_items WHERE id = ? AND shape = ?", victims
+                    )
+
+    def get_sync_state(self, key):
+        row = self._connect().execute(
+            "SELECT value FROM sync_state WHERE key = ?", (key,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set_sync_state(self, key, value):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sync_state (key, value, updated_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time()),
+            )
+
+    def stats(self):
+        conn = self._connect()
+        entries, total = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM work_items"
+        ).fetchone()
+        return {"path": self.path, "entries": entries, "bytes": total}